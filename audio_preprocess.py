@@ -0,0 +1,162 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+# =========================
+# CONFIGURATION
+# =========================
+
+PREPROCESS_WORKERS = 4         # Processes used for decode/trim/re-encode
+FFMPEG_BIN = "ffmpeg"
+FFMPEG_TIMEOUT = 180           # Seconds per recording
+
+SILENCE_THRESHOLD_DB = -45     # Anything quieter counts as silence
+LEADING_SILENCE_SEC = 0.3      # Leading silence longer than this is trimmed
+MAX_PAUSE_SEC = 1.5            # Pauses longer than this are shortened...
+KEEP_PAUSE_SEC = 0.5           # ...down to this much silence
+TARGET_SAMPLE_RATE = 16000     # Speech band is fully covered at 16 kHz
+TARGET_BITRATE = "32k"         # Mono speech bitrate
+
+# Gemini bills audio input at a fixed rate per second of audio
+AUDIO_TOKENS_PER_SECOND = 32
+
+_pool = None
+
+# =========================
+# FFMPEG STAGE
+# =========================
+
+def ffmpeg_available():
+    """Returns True if the ffmpeg binary is on PATH."""
+    return shutil.which(FFMPEG_BIN) is not None
+
+def _parse_timestamp(value):
+    hours, minutes, seconds = value.split(":")
+    return round(int(hours) * 3600 + int(minutes) * 60 + float(seconds), 2)
+
+def _parse_durations(stderr):
+    """Reads input Duration and final output time= from ffmpeg's log."""
+    before = after = None
+    match = re.search(r"Duration: (\d+:\d+:\d+\.\d+)", stderr)
+    if match:
+        before = _parse_timestamp(match.group(1))
+    times = re.findall(r"time=(\d+:\d+:\d+\.\d+)", stderr)
+    if times:
+        after = _parse_timestamp(times[-1])
+    return before, after
+
+def preprocess_audio(audio_bytes):
+    """
+    Decodes a recording, trims leading/trailing silence and long pauses,
+    downmixes to mono and re-encodes as low-bitrate MP3.
+    Returns (audio_bytes, mime_type, info). On any failure the original
+    bytes are returned unchanged and info["status"] says why.
+    Runs in a worker process, so it must stay a top-level function.
+    """
+    info = {
+        "status": "OK",
+        "original_bytes": len(audio_bytes),
+        "processed_bytes": len(audio_bytes),
+        "original_sec": None,
+        "processed_sec": None,
+    }
+
+    silence_filter = (
+        f"silenceremove=start_periods=1:start_threshold={SILENCE_THRESHOLD_DB}dB"
+        f":start_silence={LEADING_SILENCE_SEC}"
+        f":stop_periods=-1:stop_threshold={SILENCE_THRESHOLD_DB}dB"
+        f":stop_duration={MAX_PAUSE_SEC}:stop_silence={KEEP_PAUSE_SEC}"
+    )
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-nostdin",
+        "-i", "pipe:0",
+        "-af", silence_filter,
+        "-ac", "1",
+        "-ar", str(TARGET_SAMPLE_RATE),
+        "-c:a", "libmp3lame", "-b:a", TARGET_BITRATE,
+        "-f", "mp3", "pipe:1",
+    ]
+
+    try:
+        proc = subprocess.run(cmd, input=audio_bytes, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except FileNotFoundError:
+        info["status"] = "SKIPPED (ffmpeg not installed)"
+        return audio_bytes, "audio/mpeg", info
+    except subprocess.TimeoutExpired:
+        info["status"] = f"SKIPPED (ffmpeg timed out after {FFMPEG_TIMEOUT}s)"
+        return audio_bytes, "audio/mpeg", info
+
+    stderr = proc.stderr.decode("utf-8", errors="ignore")
+    info["original_sec"], info["processed_sec"] = _parse_durations(stderr)
+
+    if proc.returncode != 0 or not proc.stdout:
+        last_line = stderr.strip().splitlines()[-1] if stderr.strip() else "no output"
+        info["status"] = f"SKIPPED (ffmpeg exit {proc.returncode}: {last_line})"
+        info["processed_sec"] = info["original_sec"]
+        return audio_bytes, "audio/mpeg", info
+
+    info["processed_bytes"] = len(proc.stdout)
+    return proc.stdout, "audio/mpeg", info
+
+# =========================
+# PROCESS POOL
+# =========================
+
+def get_pool():
+    """Returns the shared preprocessing process pool (created on first use)."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS)
+    return _pool
+
+def preprocess_in_pool(audio_bytes):
+    """Runs preprocess_audio on the shared process pool and waits for the result."""
+    return get_pool().submit(preprocess_audio, audio_bytes).result()
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+def estimated_audio_tokens(seconds):
+    """Estimates Gemini audio input tokens for a duration in seconds."""
+    return int(seconds * AUDIO_TOKENS_PER_SECOND) if seconds else None
+
+# =========================
+# SEGMENT CUTTING
+# =========================
+
+def measure_duration(audio_bytes):
+    """Returns the duration of a recording in seconds via a stream-copy pass, or None."""
+    cmd = [FFMPEG_BIN, "-hide_banner", "-nostdin", "-i", "pipe:0", "-c", "copy", "-f", "null", "-"]
+    try:
+        proc = subprocess.run(cmd, input=audio_bytes, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    before, after = _parse_durations(proc.stderr.decode("utf-8", errors="ignore"))
+    return after or before
+
+def cut_segment(audio_bytes, start_sec, length_sec):
+    """
+    Cuts [start_sec, start_sec + length_sec) out of an MP3 without re-encoding.
+    Raises ValueError if ffmpeg fails.
+    """
+    cmd = [
+        FFMPEG_BIN, "-hide_banner", "-nostdin",
+        "-i", "pipe:0",
+        "-ss", str(start_sec), "-t", str(length_sec),
+        "-c", "copy", "-f", "mp3", "pipe:1",
+    ]
+    try:
+        proc = subprocess.run(cmd, input=audio_bytes, capture_output=True, timeout=FFMPEG_TIMEOUT)
+    except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+        raise ValueError(f"Could not cut segment at {start_sec}s: {e}")
+    if proc.returncode != 0 or not proc.stdout:
+        raise ValueError(f"Could not cut segment at {start_sec}s (ffmpeg exit {proc.returncode})")
+    return proc.stdout
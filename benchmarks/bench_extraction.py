@@ -0,0 +1,76 @@
+# =========================
+# EXTRACTION MODE BENCHMARK
+# =========================
+#
+# Runs the text-table and structured-JSON extraction modes side by side on the
+# same archived transcripts and compares output tokens, latency and completeness.
+# Calls the model (needs Vertex AI credentials).
+#
+#   python benchmarks/bench_extraction.py --limit 10
+
+import os
+import re
+import sys
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quality import analyze_transcript
+from src import extract_variable_analysis, EXPECTED_VARIABLES
+
+TRANSCRIPT_RE = re.compile(r"TRANSCRIPT\n-+\n(.*?)\n-+\nEnd of Transcript for Call (\d+)", re.S)
+MODES = ["table", "structured"]
+
+
+def run_mode(mode, transcript):
+    """Returns (latency_sec, output_tokens, variables_found, error)."""
+    usage = {}
+    parse_info = {}
+    start = time.time()
+    try:
+        variables = extract_variable_analysis(transcript, usage=usage, parse_info=parse_info, mode=mode)
+        error = None
+    except Exception as e:
+        variables, error = [], str(e)
+    latency = time.time() - start
+    return latency, usage.get("extraction", {}).get("output_tokens", 0), len(variables), error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare table vs structured extraction.")
+    parser.add_argument("path", nargs="?", default=os.path.join(ROOT, "output", "call_transcripts_100.txt"))
+    parser.add_argument("--limit", type=int, default=10, help="Number of transcripts to run")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        blocks = TRANSCRIPT_RE.findall(f.read())
+
+    # Only transcripts that passed the quality check make sense to extract from
+    samples = [(idx, text) for text, idx in blocks if analyze_transcript(text)["is_good"]][:args.limit]
+    print(f"Running {len(samples)} transcripts through {MODES}\n")
+
+    totals = {mode: {"latency": 0.0, "tokens": 0, "complete": 0, "errors": 0} for mode in MODES}
+    for idx, text in samples:
+        line = f"Call {idx:>4}:"
+        for mode in MODES:
+            latency, tokens, found, error = run_mode(mode, text)
+            t = totals[mode]
+            t["latency"] += latency
+            t["tokens"] += tokens
+            t["complete"] += found >= EXPECTED_VARIABLES
+            t["errors"] += error is not None
+            line += f"  {mode}: {latency:5.1f}s {tokens:5d} tok {found:2d}/{EXPECTED_VARIABLES}"
+        print(line)
+
+    n = len(samples) or 1
+    print(f"\n{'Mode':<12} {'avg latency':>12} {'avg out tok':>12} {'complete':>10} {'errors':>8}")
+    for mode in MODES:
+        t = totals[mode]
+        print(f"{mode:<12} {t['latency'] / n:>11.1f}s {t['tokens'] / n:>12.0f} "
+              f"{t['complete']:>6}/{len(samples):<3} {t['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
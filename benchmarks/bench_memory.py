@@ -0,0 +1,127 @@
+# =========================
+# MEMORY BENCHMARK
+# =========================
+#
+# Replays recorded calls (see bench_throughput.py record) through process_queue
+# at growing workloads and samples RSS while they run. In streaming mode
+# (results folded into reports.StatsAggregator and dropped once persisted) RSS
+# should stay flat from 100 to 10,000 calls; "keep" mode holds every result like
+# the old all_results list, for comparison. Exits 1 if streaming RSS grows by
+# more than FLAT_TOLERANCE_MB between the smallest and largest workload.
+#
+#   python benchmarks/bench_memory.py
+#   python benchmarks/bench_memory.py --workloads 100 1000 --modes stream
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from replay import FIXTURES_DIR, FixtureStore, install_replay, replay_calls
+from memory_guard import current_rss_mb
+
+WORKLOADS = [100, 1000, 10000]
+MODES = ["stream", "keep"]
+FIXTURE_SET = os.path.join(FIXTURES_DIR, "default")
+LATENCY_SCALE = 0.001          # Memory, not speed, is measured: replay almost instantly
+SAMPLE_SEC = 0.05              # RSS sampling interval
+FLAT_TOLERANCE_MB = 30         # Allowed streaming RSS growth from the smallest to the largest workload
+
+RESULT_MARK = "BENCH_RESULT "
+
+
+def run_workload(n, mode, fixture_set, latency_scale):
+    """Replays n calls in one mode; returns RSS before, peak during and after the run."""
+    import src
+    import search_index
+    from reports import StatsAggregator
+
+    store = FixtureStore(fixture_set)
+    install_replay(src, store, latency_scale)
+    calls = replay_calls(store, n)
+
+    out = tempfile.mkdtemp(prefix="bench_memory_")
+    search_index.DB_PATH = os.path.join(out, "search.db")
+    start_rss = current_rss_mb()
+    peak = [start_rss]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(SAMPLE_SEC):
+            peak[0] = max(peak[0], current_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    stats = StatsAggregator()
+    started = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            kept = src.process_queue(
+                calls, os.path.join(out, "transcripts.txt"), os.path.join(out, "summary.txt"),
+                os.path.join(out, "processed.txt"), results_dir=os.path.join(out, "results"),
+                aggregator=stats, keep_results=(mode == "keep"),
+            )
+            stats.write(os.path.join(out, "summary_stats.txt"))
+    finally:
+        done.set()
+        sampler.join()
+        shutil.rmtree(out, ignore_errors=True)
+
+    return {
+        "calls": stats.score_count,
+        "kept_results": len(kept),
+        "elapsed_sec": round(time.perf_counter() - started, 1),
+        "start_rss_mb": round(start_rss, 1),
+        "peak_rss_mb": round(peak[0], 1),
+        "growth_mb": round(peak[0] - start_rss, 1),
+    }
+
+
+def _run_child(n, mode, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", str(n), "--mode", mode,
+           "--fixtures", args.fixtures, "--latency-scale", str(args.latency_scale)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    raise RuntimeError(f"{n}-call {mode} workload failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS of the pipeline across workload sizes.")
+    parser.add_argument("--workloads", type=int, nargs="+", default=WORKLOADS)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--fixtures", default=FIXTURE_SET, help="Fixture set directory")
+    parser.add_argument("--latency-scale", type=float, default=LATENCY_SCALE)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, default="stream", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_MARK + json.dumps(run_workload(args.child, args.mode, args.fixtures, args.latency_scale)))
+        sys.exit(0)
+
+    growth = {mode: [] for mode in args.modes}
+    print(f"{'Mode':<8} {'Calls':>7} {'Start MB':>9} {'Peak MB':>9} {'Growth MB':>10} {'Time s':>8}")
+    for mode in args.modes:
+        for n in sorted(args.workloads):
+            m = _run_child(n, mode, args)
+            growth[mode].append(m["growth_mb"])
+            print(f"{mode:<8} {m['calls']:>7} {m['start_rss_mb']:>9} {m['peak_rss_mb']:>9} "
+                  f"{m['growth_mb']:>10} {m['elapsed_sec']:>8}")
+
+    if "stream" in growth and len(growth["stream"]) > 1:
+        drift = growth["stream"][-1] - growth["stream"][0]
+        flat = drift <= FLAT_TOLERANCE_MB
+        print(f"[MEMORY] Streaming RSS growth {min(args.workloads)} -> {max(args.workloads)} calls: "
+              f"{drift:+.1f} MB ({'flat' if flat else 'NOT flat'}, tolerance {FLAT_TOLERANCE_MB} MB)")
+        sys.exit(0 if flat else 1)
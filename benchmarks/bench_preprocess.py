@@ -0,0 +1,105 @@
+# =========================
+# AUDIO PREPROCESSING BENCHMARK
+# =========================
+#
+# Compares original vs preprocessed recordings on local files.
+#
+#   python benchmarks/bench_preprocess.py recordings/*.mp3
+#   python benchmarks/bench_preprocess.py recordings/*.mp3 --with-model
+#
+# Without --with-model only the local stage is measured (preprocessing time,
+# duration/size reduction, estimated audio tokens). With --with-model each
+# version is also transcribed so the real latency, audio tokens and
+# check_transcript_quality outcome can be compared side by side.
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_preprocess import preprocess_audio, ffmpeg_available, estimated_audio_tokens
+
+
+def transcribe_bytes(audio_bytes, mime_type):
+    """Transcribes raw bytes. Returns (latency_sec, audio_tokens, quality_reason)."""
+    from vertexai.generative_models import Part
+    from prompts import TRANSCRIPTION_PROMPT
+    from src import call_gemini, check_transcript_quality
+
+    usage = {}
+    parts = [Part.from_text(TRANSCRIPTION_PROMPT), Part.from_data(audio_bytes, mime_type=mime_type)]
+    start = time.time()
+    try:
+        transcript = call_gemini(parts=parts, stage="transcription", usage=usage)
+    except Exception as e:
+        return round(time.time() - start, 2), None, f"ERROR: {e}"
+    latency = round(time.time() - start, 2)
+
+    _, reason = check_transcript_quality(transcript)
+    return latency, usage.get("transcription", {}).get("audio_tokens"), reason
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark audio preprocessing on local recordings.")
+    parser.add_argument("files", nargs="+", help="Local audio files")
+    parser.add_argument("--with-model", action="store_true", help="Also transcribe both versions with Gemini")
+    args = parser.parse_args()
+
+    if not ffmpeg_available():
+        print("[ERROR] ffmpeg not found on PATH — nothing to benchmark.")
+        sys.exit(1)
+
+    rows = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            original = f.read()
+
+        start = time.time()
+        processed, mime_type, info = preprocess_audio(original)
+        prep_sec = round(time.time() - start, 2)
+
+        row = {"file": os.path.basename(path), "prep_sec": prep_sec, **info}
+        if args.with_model:
+            row["orig_latency"], row["orig_tokens"], row["orig_quality"] = transcribe_bytes(original, "audio/mpeg")
+            row["prep_latency"], row["prep_tokens"], row["prep_quality"] = transcribe_bytes(processed, mime_type)
+        else:
+            row["orig_tokens"] = estimated_audio_tokens(info["original_sec"])
+            row["prep_tokens"] = estimated_audio_tokens(info["processed_sec"])
+        rows.append(row)
+
+        print(f"{row['file']:<30} {info['original_sec']}s -> {info['processed_sec']}s  "
+              f"{info['original_bytes']} -> {info['processed_bytes']} bytes  "
+              f"tokens {row['orig_tokens']} -> {row['prep_tokens']}  prep {prep_sec}s  [{info['status']}]")
+        if args.with_model:
+            print(f"{'':<30} latency {row['orig_latency']}s -> {row['prep_latency']}s  "
+                  f"quality {row['orig_quality']} -> {row['prep_quality']}")
+
+    # Totals
+    print(f"\n{'='*60}")
+    before_sec = sum(r["original_sec"] or 0 for r in rows)
+    after_sec = sum(r["processed_sec"] or 0 for r in rows)
+    before_bytes = sum(r["original_bytes"] for r in rows)
+    after_bytes = sum(r["processed_bytes"] for r in rows)
+    print(f"Files            : {len(rows)}")
+    print(f"Audio duration   : {before_sec:.1f}s -> {after_sec:.1f}s "
+          f"({(1 - after_sec / before_sec) * 100 if before_sec else 0:.1f}% shorter)")
+    print(f"Upload size      : {before_bytes} -> {after_bytes} bytes "
+          f"({(1 - after_bytes / before_bytes) * 100 if before_bytes else 0:.1f}% smaller)")
+    print(f"Preprocess time  : {sum(r['prep_sec'] for r in rows):.1f}s total")
+
+    if args.with_model:
+        before_lat = sum(r["orig_latency"] for r in rows)
+        after_lat = sum(r["prep_latency"] for r in rows)
+        before_tok = sum(r["orig_tokens"] or 0 for r in rows)
+        after_tok = sum(r["prep_tokens"] or 0 for r in rows)
+        orig_ok = sum(1 for r in rows if r["orig_quality"] == "OK")
+        prep_ok = sum(1 for r in rows if r["prep_quality"] == "OK")
+        print(f"Transcribe time  : {before_lat:.1f}s -> {after_lat:.1f}s")
+        print(f"Audio tokens     : {before_tok} -> {after_tok}")
+        print(f"Quality check OK : {orig_ok}/{len(rows)} -> {prep_ok}/{len(rows)}")
+
+
+if __name__ == "__main__":
+    main()
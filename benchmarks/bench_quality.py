@@ -0,0 +1,101 @@
+# =========================
+# TRANSCRIPT QUALITY MICRO-BENCHMARK
+# =========================
+#
+# Times the single-pass analyzer against the original Counter-based check on
+# every transcript in an archived transcripts file.
+#
+#   python benchmarks/bench_quality.py
+#   python benchmarks/bench_quality.py output/call_transcripts.txt --rounds 50
+
+import os
+import re
+import sys
+import time
+import argparse
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quality import TranscriptQualityAnalyzer, analyze_transcript
+
+TRANSCRIPT_RE = re.compile(r"TRANSCRIPT\n-+\n(.*?)\n-+\nEnd of Transcript for Call (\d+)", re.S)
+STREAM_CHUNK = 64   # Characters per simulated streaming chunk
+
+
+def legacy_check(transcript):
+    """The original check_transcript_quality, kept here as the baseline."""
+    if not transcript or len(transcript.strip()) < 20:
+        return False, "EMPTY_TRANSCRIPT"
+    words = transcript.split()
+    if len(words) > 20:
+        most_common_word, most_common_count = Counter(words).most_common(1)[0]
+        if most_common_count / len(words) > 0.5:
+            return False, f"HALLUCINATED_REPEAT ('{most_common_word}' repeated {most_common_count}/{len(words)} times)"
+    has_agent = "Agent:" in transcript or "agent:" in transcript.lower()
+    has_customer = "Customer:" in transcript or "customer:" in transcript.lower()
+    if not has_agent and not has_customer:
+        return False, "NO_DIARIZATION (no Agent:/Customer: labels found)"
+    return True, "OK"
+
+
+def stream_check(transcript):
+    """Feeds a transcript in small chunks, as during streaming. Returns the abort reason or None."""
+    analyzer = TranscriptQualityAnalyzer()
+    for i in range(0, len(transcript), STREAM_CHUNK):
+        reason = analyzer.feed(transcript[i:i + STREAM_CHUNK])
+        if reason:
+            return reason
+    return None
+
+
+def legacy_stream_check(transcript):
+    """What streaming would cost with the original check: re-scan the whole prefix per chunk."""
+    for i in range(STREAM_CHUNK, len(transcript) + STREAM_CHUNK, STREAM_CHUNK):
+        legacy_check(transcript[:i])
+
+
+def time_it(fn, transcripts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in transcripts:
+            fn(text)
+    return (time.perf_counter() - start) / (rounds * len(transcripts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript quality checks.")
+    parser.add_argument("path", nargs="?", default=os.path.join(ROOT, "output", "call_transcripts_100.txt"))
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        blocks = TRANSCRIPT_RE.findall(f.read())
+    transcripts = [text for text, _ in blocks]
+    total_chars = sum(len(t) for t in transcripts)
+    print(f"Transcripts : {len(transcripts)} ({total_chars / 1024:.0f} KB) from {args.path}\n")
+
+    legacy_us = time_it(legacy_check, transcripts, args.rounds)
+    full_us = time_it(analyze_transcript, transcripts, args.rounds)
+    stream_us = time_it(stream_check, transcripts, args.rounds)
+    legacy_stream_us = time_it(legacy_stream_check, transcripts, max(args.rounds // 10, 1))
+
+    print(f"{'Check':<32} {'us/transcript':>14}")
+    print(f"{'legacy Counter check':<32} {legacy_us:>14.1f}")
+    print(f"{'analyzer (complete)':<32} {full_us:>14.1f}")
+    print(f"{f'analyzer (streamed, {STREAM_CHUNK}-char chunks)':<32} {stream_us:>14.1f}")
+    print(f"{'legacy re-check per chunk':<32} {legacy_stream_us:>14.1f}")
+
+    # Detection comparison
+    print("\nFlagged transcripts:")
+    for text, index in blocks:
+        legacy_ok, legacy_reason = legacy_check(text)
+        analysis = analyze_transcript(text)
+        if not legacy_ok or not analysis["is_good"]:
+            new_reason = "; ".join(analysis["reasons"]) or "OK"
+            print(f"  Call {index:>4}: legacy={legacy_reason[:50]:<50} analyzer={new_reason[:70]}")
+
+
+if __name__ == "__main__":
+    main()
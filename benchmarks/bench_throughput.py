@@ -0,0 +1,259 @@
+# =========================
+# END-TO-END THROUGHPUT BENCHMARK
+# =========================
+#
+# Records a handful of real calls once (downloads + Gemini responses), then
+# replays them through the real process_queue / call_gemini / writers at
+# 10, 100 and 1,000-call workloads. Reports calls per minute, per-stage latency
+# and peak memory, and fails on regressions against the stored baseline.
+#
+#   python benchmarks/bench_throughput.py record calls_4.xlsx --limit 10   # live, needs Vertex AI
+#   python benchmarks/bench_throughput.py run                              # replay, no network
+#   python benchmarks/bench_throughput.py run --workloads 10 100 --update-baseline
+#
+# Each workload runs in a fresh process so peak RSS is per workload.
+# Exit status: 0 OK, 1 regressions, 3 SKIPPED (no baseline recorded with this
+# config and these workloads). Baselines depend on the recorded fixtures, so
+# none is committed: record fixtures, then run once with --update-baseline.
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from itertools import islice
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from replay import FIXTURES_DIR, FixtureStore, install_recorders, install_replay, replay_calls
+
+WORKLOADS = [10, 100, 1000]
+FIXTURE_SET = os.path.join(FIXTURES_DIR, "default")
+BASELINE_FILE = os.path.join(ROOT, "benchmarks", "baselines", "throughput.json")
+LATENCY_SCALE = 0.05           # Replay at 5% of recorded latency so 1,000 calls finish in minutes
+SEED = 0
+
+# Regression thresholds (relative to the baseline)
+MAX_THROUGHPUT_DROP = 0.10     # calls/min may fall by at most 10%
+MAX_MEMORY_GROWTH = 0.20       # peak RSS may grow by at most 20%
+MAX_STAGE_SLOWDOWN = 0.25      # per-stage p50 may grow by at most 25% ...
+MIN_STAGE_MS = 5.0             # ... for stages slow enough to measure reliably
+
+RESULT_MARK = "BENCH_RESULT "
+EXIT_SKIPPED = 3               # Nothing to compare against: not a pass
+
+# =========================
+# STAGE TIMING
+# =========================
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+def instrument(src, timings):
+    """Wraps src's stage functions to record (stage, seconds) for every invocation."""
+    def timed(fn, stage_of):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings.append((stage_of(kwargs), time.perf_counter() - start))
+        return wrapper
+
+    src.fetch_audio = timed(src.fetch_audio, lambda kw: "download")
+    src.call_gemini = timed(src.call_gemini, lambda kw: kw.get("stage") or "model")
+    for name in ("save_result", "save_transcript", "save_summary_report"):
+        setattr(src, name, timed(getattr(src, name), lambda kw: "write"))
+
+def stage_stats(timings):
+    stages = {}
+    for stage, seconds in timings:
+        stages.setdefault(stage, []).append(seconds * 1000)
+    return {stage: {"count": len(ms), "p50_ms": round(_percentile(ms, 0.5), 2),
+                    "p95_ms": round(_percentile(ms, 0.95), 2)}
+            for stage, ms in sorted(stages.items())}
+
+# =========================
+# WORKLOAD (child process)
+# =========================
+
+def run_workload(n, fixture_set, latency_scale, workers):
+    """Replays an n-call workload through process_queue. Returns the metrics dict."""
+    import src
+    import search_index
+
+    workers = workers or src.BATCH_SIZE
+    store = FixtureStore(fixture_set)
+    model, session = install_replay(src, store, latency_scale, SEED)
+    timings = []
+    instrument(src, timings)
+
+    out = tempfile.mkdtemp(prefix="bench_throughput_")
+    search_index.DB_PATH = os.path.join(out, "search.db")
+    try:
+        calls = replay_calls(store, n)
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            results = src.process_queue(
+                calls, os.path.join(out, "transcripts.txt"), os.path.join(out, "summary.txt"),
+                os.path.join(out, "processed.txt"), max_workers=workers, results_dir=os.path.join(out, "results"),
+            )
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+    errors = sum(1 for r in results if r.summary.call_type == "ERROR")
+    return {
+        "calls": len(results),
+        "errors": errors,
+        "fixture_misses": model.misses + session.misses,
+        "elapsed_sec": round(elapsed, 3),
+        "calls_per_min": round(len(results) / elapsed * 60, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "stages": stage_stats(timings),
+    }
+
+# =========================
+# RECORD
+# =========================
+
+def record(sheet, limit, fixture_set, workers):
+    """Runs the first `limit` calls of a sheet live and records every download and model exchange."""
+    import src
+    import search_index
+
+    workers = workers or src.BATCH_SIZE
+    store = FixtureStore(fixture_set)
+    install_recorders(src, store)
+    calls = list(islice(src.load_calls(sheet), limit))
+    out = tempfile.mkdtemp(prefix="bench_record_")
+    search_index.DB_PATH = os.path.join(out, "search.db")
+    try:
+        results = src.process_queue(
+            calls, os.path.join(out, "transcripts.txt"), os.path.join(out, "summary.txt"),
+            os.path.join(out, "processed.txt"), max_workers=workers, results_dir=os.path.join(out, "results"),
+        )
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+    errors = sum(1 for r in results if r.summary.call_type == "ERROR")
+    print(f"[RECORD] {len(results)} calls ({errors} ERROR): {len(store.downloads)} downloads, "
+          f"{len(store.model)} model responses in {fixture_set}")
+
+# =========================
+# BASELINE
+# =========================
+
+def compare(name, metrics, base):
+    """Returns regression messages for one workload."""
+    problems = []
+    if metrics["calls_per_min"] < base["calls_per_min"] * (1 - MAX_THROUGHPUT_DROP):
+        problems.append(f"{name}: {metrics['calls_per_min']} calls/min vs baseline {base['calls_per_min']}")
+    if metrics["peak_rss_mb"] > base["peak_rss_mb"] * (1 + MAX_MEMORY_GROWTH):
+        problems.append(f"{name}: peak RSS {metrics['peak_rss_mb']} MB vs baseline {base['peak_rss_mb']} MB")
+    if metrics["errors"] > base["errors"]:
+        problems.append(f"{name}: {metrics['errors']} ERROR calls vs baseline {base['errors']}")
+    for stage, stats in metrics["stages"].items():
+        base_stage = base["stages"].get(stage)
+        if base_stage and base_stage["p50_ms"] >= MIN_STAGE_MS \
+                and stats["p50_ms"] > base_stage["p50_ms"] * (1 + MAX_STAGE_SLOWDOWN):
+            problems.append(f"{name}: {stage} p50 {stats['p50_ms']} ms vs baseline {base_stage['p50_ms']} ms")
+    return problems
+
+def _run_child(n, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "child", str(n), "--fixtures", args.fixtures,
+           "--latency-scale", str(args.latency_scale)]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    raise RuntimeError(f"{n}-call workload failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+
+def run(args):
+    config = {"latency_scale": args.latency_scale, "workers": args.workers,
+              "model_fixtures": len(FixtureStore(args.fixtures).model)}
+    results = {}
+    for n in args.workloads:
+        print(f"[BENCH] {n}-call workload...")
+        metrics = results[str(n)] = _run_child(n, args)
+        print(f"  {metrics['calls']} calls in {metrics['elapsed_sec']}s -> {metrics['calls_per_min']} calls/min, "
+              f"peak RSS {metrics['peak_rss_mb']} MB, {metrics['errors']} ERROR, "
+              f"{metrics['fixture_misses']} fixture misses")
+        for stage, stats in metrics["stages"].items():
+            print(f"    {stage:<14} n={stats['count']:<6} p50={stats['p50_ms']:>9.1f} ms  p95={stats['p95_ms']:>9.1f} ms")
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        baseline = {"config": config, "workloads": {**baseline.get("workloads", {}), **results}} \
+            if baseline.get("config") == config else {"config": config, "workloads": results}
+        os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"[BENCH] Baseline updated: {BASELINE_FILE}")
+        return 0
+
+    if not baseline:
+        print(f"[BENCH] SKIPPED: no baseline at {BASELINE_FILE}; run with --update-baseline to store one")
+        return EXIT_SKIPPED
+    if baseline["config"] != config:
+        print(f"[BENCH] SKIPPED: baseline was recorded with {baseline['config']}, not {config}")
+        return EXIT_SKIPPED
+    missing = [n for n in results if n not in baseline["workloads"]]
+    if len(missing) == len(results):
+        print(f"[BENCH] SKIPPED: baseline has no {', '.join(missing)}-call workloads")
+        return EXIT_SKIPPED
+
+    problems = []
+    for n, metrics in results.items():
+        if n in baseline["workloads"]:
+            problems += compare(f"{n} calls", metrics, baseline["workloads"][n])
+    if missing:
+        print(f"[BENCH] Not in the baseline (not compared): {', '.join(missing)}-call workloads")
+    for problem in problems:
+        print(f"[REGRESSION] {problem}")
+    print(f"[BENCH] {'FAILED' if problems else 'OK'}: {len(problems)} regressions against {BASELINE_FILE}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record/replay end-to-end throughput benchmark.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Run real calls once and record their traffic as fixtures")
+    rec.add_argument("sheet")
+    rec.add_argument("--limit", type=int, default=10)
+
+    bench = sub.add_parser("run", help="Replay workloads and compare against the baseline")
+    bench.add_argument("--workloads", type=int, nargs="+", default=WORKLOADS)
+    bench.add_argument("--latency-scale", type=float, default=LATENCY_SCALE)
+    bench.add_argument("--update-baseline", action="store_true")
+
+    child = sub.add_parser("child")
+    child.add_argument("calls", type=int)
+    child.add_argument("--latency-scale", type=float, default=LATENCY_SCALE)
+
+    for p in (rec, bench, child):
+        p.add_argument("--fixtures", default=FIXTURE_SET, help="Fixture set directory")
+        p.add_argument("--workers", type=int, default=None, help="Concurrent calls (default: src.BATCH_SIZE)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.sheet, args.limit, args.fixtures, args.workers)
+    elif args.command == "child":
+        print(RESULT_MARK + json.dumps(run_workload(args.calls, args.fixtures, args.latency_scale, args.workers)))
+    else:
+        sys.exit(run(args))
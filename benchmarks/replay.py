@@ -0,0 +1,307 @@
+# =========================
+# RECORD / REPLAY HARNESS
+# =========================
+#
+# Records the pipeline's external traffic (recording downloads and Gemini
+# generate_content calls) into a fixture store once, then replays it with the
+# recorded latencies so process_queue, call_gemini and the writers can be
+# benchmarked without network access, credentials or cost.
+#
+# Used by bench_throughput.py; install_recorders / install_replay patch a
+# loaded `src` module in place.
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from types import SimpleNamespace
+from urllib.parse import urlsplit, parse_qsl
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from identity import canonical_call_id
+
+FIXTURES_DIR = os.path.join(ROOT, "benchmarks", "fixtures")   # Recorded audio is customer data: never commit it
+INDEX_FILE = "fixtures.jsonl"
+LATENCY_JITTER = 0.25          # Sigma of the log-normal factor applied to each recorded latency
+
+
+class FixtureMissing(KeyError):
+    """A replayed request has no recorded response (the pipeline sent something new)."""
+
+# =========================
+# REQUEST KEYS
+# =========================
+
+def content_key(contents):
+    """Stable key for generate_content input: prompt text and inline audio bytes, hashed."""
+    digest = hashlib.sha1()
+    for part in contents if isinstance(contents, list) else [contents]:
+        if isinstance(part, str):
+            digest.update(part.encode("utf-8"))
+            continue
+        to_dict = getattr(part, "to_dict", None)
+        digest.update(json.dumps(to_dict(), sort_keys=True).encode("utf-8") if to_dict else repr(part).encode("utf-8"))
+    return digest.hexdigest()
+
+def download_key(url):
+    """Fixture key of a recording URL; replay workloads name their fixture explicitly."""
+    params = dict(parse_qsl(urlsplit(url).query))
+    return params.get("fixture") or canonical_call_id(url)
+
+# =========================
+# FIXTURE STORE
+# =========================
+
+class FixtureStore:
+    """
+    One directory per fixture set: fixtures.jsonl (one entry per request) and
+    audio/<key>.bin for downloaded recordings.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.downloads = {}
+        self.model = {}
+        self._lock = threading.Lock()
+        index = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index):
+            with open(index, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    (self.downloads if entry["kind"] == "download" else self.model)[entry["key"]] = entry
+
+    def _append(self, entry):
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def record_download(self, url, status_code, content, latency):
+        key = canonical_call_id(url)
+        with self._lock:
+            os.makedirs(os.path.join(self.path, "audio"), exist_ok=True)
+            with open(os.path.join(self.path, "audio", f"{key}.bin"), "wb") as f:
+                f.write(content)
+            entry = {"kind": "download", "key": key, "status_code": status_code, "bytes": len(content),
+                     "latency": round(latency, 4)}
+            self.downloads[key] = entry
+            self._append(entry)
+
+    def record_model(self, key, chunks, usage, latency, first_chunk=None, streamed=False):
+        entry = {"kind": "model", "key": key, "chunks": chunks, "usage": usage, "latency": round(latency, 4),
+                 "first_chunk": round(first_chunk, 4) if first_chunk is not None else None, "streamed": streamed}
+        with self._lock:
+            # A retried request is recorded again; the latest recording wins on load
+            self.model[key] = entry
+            self._append(entry)
+
+    def audio(self, key):
+        with open(os.path.join(self.path, "audio", f"{key}.bin"), "rb") as f:
+            return f.read()
+
+# =========================
+# RESPONSE SHAPES
+# =========================
+
+def _usage_fields(response):
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return None
+    audio = sum(getattr(d, "token_count", 0) or 0 for d in getattr(meta, "prompt_tokens_details", None) or []
+                if "AUDIO" in str(getattr(d, "modality", "")).upper())
+    return {"prompt": getattr(meta, "prompt_token_count", 0) or 0,
+            "output": getattr(meta, "candidates_token_count", 0) or 0,
+            "thinking": getattr(meta, "thoughts_token_count", 0) or 0,
+            "total": getattr(meta, "total_token_count", 0) or 0,
+            "audio": audio}
+
+def _usage_metadata(fields):
+    if fields is None:
+        return None
+    return SimpleNamespace(
+        prompt_token_count=fields["prompt"], candidates_token_count=fields["output"],
+        thoughts_token_count=fields.get("thinking", 0),
+        total_token_count=fields["total"],
+        prompt_tokens_details=[SimpleNamespace(modality="AUDIO", token_count=fields["audio"])] if fields["audio"] else [],
+    )
+
+def _chunk_text(chunk):
+    try:
+        return chunk.text
+    except ValueError:
+        return None
+
+
+class ReplayChunk:
+    """A response or stream chunk: .text (ValueError when it has none) and .usage_metadata."""
+
+    def __init__(self, text, usage_metadata=None):
+        self._text = text
+        self.usage_metadata = usage_metadata
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("response has no text")
+        return self._text
+
+# =========================
+# RECORDERS
+# =========================
+
+class RecordingModel:
+    """Wraps a GenerativeModel and records every generate_content exchange."""
+
+    def __init__(self, model, store):
+        self.model = model
+        self.store = store
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        key = content_key(contents)
+        start = time.perf_counter()
+        response = self.model.generate_content(contents, generation_config=generation_config, stream=stream)
+        if not stream:
+            self.store.record_model(key, [response.text], _usage_fields(response), time.perf_counter() - start)
+            return response
+        return self._record_stream(key, response, start)
+
+    def _record_stream(self, key, responses, start):
+        chunks, usage, first = [], None, None
+        try:
+            for chunk in responses:
+                if first is None:
+                    first = time.perf_counter() - start
+                chunks.append(_chunk_text(chunk))
+                usage = _usage_fields(chunk) or usage
+                yield chunk
+        finally:
+            # Recorded even when the caller cancels mid-stream (the replay then cancels at the same point)
+            self.store.record_model(key, chunks, usage, time.perf_counter() - start, first, streamed=True)
+            close = getattr(responses, "close", None)
+            if close:
+                close()
+
+
+class RecordingSession:
+    """Wraps a requests.Session and records every GET of a recording."""
+
+    def __init__(self, session, store):
+        self.session = session
+        self.store = store
+
+    def get(self, url, **kwargs):
+        start = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        self.store.record_download(url, response.status_code, response.content, time.perf_counter() - start)
+        return response
+
+# =========================
+# REPLAYERS
+# =========================
+
+class _Latency:
+    """Deterministic per-occurrence latency: the recorded value times a seeded log-normal factor."""
+
+    def __init__(self, scale, seed):
+        self.scale = scale
+        self.seed = seed
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key, recorded):
+        with self._lock:
+            n = self._seen.get(key, 0)
+            self._seen[key] = n + 1
+        rng = random.Random(f"{self.seed}:{key}:{n}")
+        return max(recorded, 0.0) * self.scale * math.exp(rng.gauss(0.0, LATENCY_JITTER))
+
+
+class ReplayModel:
+    """Answers generate_content from the fixture store, sleeping the (scaled) recorded latency."""
+
+    def __init__(self, store, latency):
+        self.store = store
+        self.latency = latency
+        self.misses = 0
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        key = content_key(contents)
+        entry = self.store.model.get(key)
+        if entry is None:
+            self.misses += 1
+            raise FixtureMissing(f"no recorded model response for request {key[:12]}")
+        total = self.latency(key, entry["latency"])
+        meta = _usage_metadata(entry["usage"])
+        if not stream:
+            time.sleep(total)
+            return ReplayChunk("".join(c for c in entry["chunks"] if c), meta)
+        return self._stream(entry, total, meta)
+
+    def _stream(self, entry, total, meta):
+        chunks = entry["chunks"] or [None]
+        first = total * (entry["first_chunk"] / entry["latency"]) if entry["first_chunk"] and entry["latency"] else 0.0
+        time.sleep(first)
+        gap = (total - first) / max(len(chunks) - 1, 1)
+        for i, text in enumerate(chunks):
+            if i:
+                time.sleep(gap)
+            yield ReplayChunk(text, meta if i == len(chunks) - 1 else None)
+
+
+class ReplaySession:
+    """Serves recording downloads from the fixture store."""
+
+    def __init__(self, store, latency):
+        self.store = store
+        self.latency = latency
+        self._audio = {}
+        self._lock = threading.Lock()
+        self.misses = 0
+
+    def get(self, url, **kwargs):
+        key = download_key(url)
+        entry = self.store.downloads.get(key)
+        if entry is None:
+            self.misses += 1
+            return SimpleNamespace(status_code=404, content=b"<html>no fixture</html>")
+        with self._lock:
+            if key not in self._audio:
+                self._audio[key] = self.store.audio(key)
+        time.sleep(self.latency(key, entry["latency"]))
+        return SimpleNamespace(status_code=entry["status_code"], content=self._audio[key])
+
+# =========================
+# INSTALL
+# =========================
+
+def install_recorders(src, store):
+    src.model = RecordingModel(src.model, store)
+    src.http_session = RecordingSession(src.http_session, store)
+
+def install_replay(src, store, latency_scale=1.0, seed=0):
+    """Replaces src's model client and HTTP session with replayers. Returns (model, session)."""
+    latency = _Latency(latency_scale, seed)
+    src.model = ReplayModel(store, latency)
+    src.http_session = ReplaySession(store, latency)
+    return src.model, src.http_session
+
+def replay_calls(store, n):
+    """A workload of n calls cycling through the recorded recordings (distinct call IDs, shared fixtures)."""
+    keys = sorted(k for k, e in store.downloads.items() if e["status_code"] == 200)
+    if not keys:
+        raise ValueError(f"No recorded downloads in {store.path}; record fixtures first")
+    calls = []
+    for i in range(n):
+        key = keys[i % len(keys)]
+        calls.append({
+            "index": i + 1,
+            "call_id": f"{key}-{i + 1}",
+            "audio_url": f"http://replay.local/recording?callId={key}-{i + 1}&fixture={key}",
+            "meta": {},
+        })
+    return calls
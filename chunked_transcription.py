@@ -0,0 +1,145 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+from difflib import SequenceMatcher
+
+# =========================
+# CONFIGURATION
+# =========================
+
+LONG_CALL_THRESHOLD_SEC = 480  # Calls longer than this are transcribed in segments
+SEGMENT_SEC = 240              # Segment length (bounds per-request output size and latency)
+SEGMENT_OVERLAP_SEC = 20       # Audio shared by neighbouring segments for stitching
+SEGMENT_WORKERS = 4            # Segments transcribed in parallel per call
+
+OVERLAP_MATCH_LINES = 12       # Lines at each boundary compared when stitching
+LINE_MATCH_RATIO = 0.8         # difflib ratio for two lines to count as the same utterance
+MIN_SUBSTRING_MATCH = 12       # Partial lines cut at a boundary match if this long
+MIN_OVERLAP_RUN = 2            # Consecutive matched lines needed to trust an overlap...
+MIN_ANCHOR_CHARS = 25          # ...unless the matched run has this many characters ("Okay" alone never anchors)
+
+SPEAKER_RE = re.compile(r"^\s*\**\s*(agent|customer)\s*\**\s*:\s*(.*)$", re.IGNORECASE)
+SWAP = {"Agent": "Customer", "Customer": "Agent"}
+
+# =========================
+# SEGMENT PLANNING
+# =========================
+
+def plan_segments(duration_sec, segment_sec=SEGMENT_SEC, overlap_sec=SEGMENT_OVERLAP_SEC):
+    """
+    Splits a duration into overlapping windows.
+    Returns list of (start_sec, length_sec).
+    """
+    step = segment_sec - overlap_sec
+    segments = []
+    start = 0
+    while start < duration_sec:
+        segments.append((start, segment_sec))
+        if start + segment_sec >= duration_sec:
+            break
+        start += step
+    return segments
+
+# =========================
+# STITCHING
+# =========================
+
+def parse_lines(transcript):
+    """Parses a transcript into [speaker, text] lines. Unlabelled lines get speaker None."""
+    lines = []
+    for raw in transcript.splitlines():
+        if not raw.strip():
+            continue
+        match = SPEAKER_RE.match(raw)
+        if match:
+            lines.append([match.group(1).capitalize(), match.group(2).strip()])
+        else:
+            lines.append([None, raw.strip()])
+    return lines
+
+def _normalize(text):
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+def _same_utterance(a, b):
+    """True if two lines are the same utterance (allowing a line cut off at a segment edge)."""
+    na, nb = _normalize(a), _normalize(b)
+    if not na or not nb:
+        return False
+    if min(len(na), len(nb)) >= MIN_SUBSTRING_MATCH and (na in nb or nb in na):
+        return True
+    return SequenceMatcher(None, na, nb).ratio() >= LINE_MATCH_RATIO
+
+def align_overlap(tail, head):
+    """
+    Monotonically matches lines at the start of a segment (head) against the
+    end of the transcript so far (tail). Returns list of (tail_idx, head_idx).
+    """
+    matches = []
+    pointer = 0
+    for j, (_, text) in enumerate(head):
+        for i in range(pointer, len(tail)):
+            if _same_utterance(tail[i][1], text):
+                matches.append((i, j))
+                pointer = i + 1
+                break
+    return matches
+
+def overlap_anchor(tail, head, matches):
+    """
+    The run of consecutive matches (adjacent lines on both sides) that marks the
+    real overlap: the longest run of at least MIN_OVERLAP_RUN lines or
+    MIN_ANCHOR_CHARS characters. Short common utterances can match anywhere in
+    the window, so isolated matches are ignored. Returns the run or [].
+    """
+    runs = []
+    for i, j in matches:
+        if runs and runs[-1][-1] == (i - 1, j - 1):
+            runs[-1].append((i, j))
+        else:
+            runs.append([(i, j)])
+
+    def chars(run):
+        return sum(len(_normalize(head[j][1])) for _, j in run)
+
+    anchored = [run for run in runs if len(run) >= MIN_OVERLAP_RUN or chars(run) >= MIN_ANCHOR_CHARS]
+    return max(anchored, key=lambda run: (len(run), chars(run), run[-1][1]), default=[])
+
+def stitch_transcripts(segment_transcripts, window=OVERLAP_MATCH_LINES):
+    """
+    Joins per-segment transcripts into one.
+    - Speaker labels: each segment is diarized on its own, so its Agent/Customer
+      labels can come back swapped. Lines shared with the previous segment vote
+      on whether to swap the whole segment.
+    - Overlap: the segment's head is cut at the end of the anchored run of lines
+      it shares with the previous segment's tail (see overlap_anchor); with no
+      anchor nothing is dropped.
+    """
+    merged = []
+    for transcript in segment_transcripts:
+        lines = parse_lines(transcript or "")
+        if not merged:
+            merged.extend(lines)
+            continue
+
+        tail = merged[-window:]
+        head = lines[:window]
+        anchor = overlap_anchor(tail, head, align_overlap(tail, head))
+
+        agree = disagree = 0
+        for i, j in anchor:
+            if tail[i][0] and head[j][0]:
+                if tail[i][0] == head[j][0]:
+                    agree += 1
+                else:
+                    disagree += 1
+        if disagree > agree:
+            for line in lines:
+                if line[0]:
+                    line[0] = SWAP[line[0]]
+
+        cut = anchor[-1][1] + 1 if anchor else 0
+        merged.extend(lines[cut:])
+
+    return "\n".join(f"{speaker}: {text}" if speaker else text for speaker, text in merged)
@@ -0,0 +1,202 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+import argparse
+import numpy as np
+from collections import Counter
+
+from schema import CANONICAL_VARIABLES
+from scoring import (
+    EXCELLENT, NEEDS_IMPROVEMENT, NOT_PRESENT, MISSING, score_matrix, load_report_matrix, load_results_matrix
+)
+from table_parser import iter_report_calls
+from result_store import RESULTS_DIR
+from records import iter_records
+from prompts import COHORT_SUMMARY_PROMPT
+
+# =========================
+# CONFIGURATION
+# =========================
+
+TOP_VARIABLES = 20             # Variables (largest GOOD/BAD gap) shown and sent to the model
+PHRASES_PER_VARIABLE = 3       # Evidence quotes kept per variable in the report and prompt
+MAX_DISTINCT_PHRASES = 200     # Distinct quotes counted per variable (bounds memory on huge runs)
+MIN_GROUP_CALLS = 3            # Both groups need at least this many calls to compare
+OUTPUT_FILE = "output/cohort_comparison.txt"
+
+# =========================
+# LOADING
+# =========================
+
+def _iter_variable_rows(results_dir=None, report_paths=None):
+    """Yields each call's variable rows in the same order as the matrix loaders."""
+    if report_paths:
+        for path in report_paths:
+            for _, parsed in iter_report_calls(path):
+                yield parsed["variables"]
+    else:
+        for record in iter_records(results_dir):
+            yield record.variables
+
+# =========================
+# COHORT STATISTICS
+# =========================
+
+def group_profile(codes):
+    """
+    Per-variable status shares for one group of calls (vectorized over calls).
+    Shares are of calls where the variable was extracted.
+    """
+    extracted = (codes != MISSING).sum(axis=0)
+    evaluated = ((codes != MISSING) & (codes != NOT_PRESENT)).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "calls": codes.shape[0],
+            "excellent": np.where(evaluated > 0, (codes == EXCELLENT).sum(axis=0) / evaluated, np.nan),
+            "needs_improvement": np.where(evaluated > 0, (codes == NEEDS_IMPROVEMENT).sum(axis=0) / evaluated, np.nan),
+            "not_present": np.where(extracted > 0, (codes == NOT_PRESENT).sum(axis=0) / extracted, np.nan),
+        }
+
+def compare_cohorts(codes, is_good):
+    """
+    Variable-level differences between GOOD and BAD calls.
+    Gap = difference in Excellent share plus difference in presence, so a
+    variable GOOD agents do well *and* more often ranks highest.
+    Returns rows sorted by gap, largest first.
+    """
+    good = group_profile(codes[is_good])
+    bad = group_profile(codes[~is_good])
+    gap = np.nan_to_num(good["excellent"] - bad["excellent"]) + np.nan_to_num(bad["not_present"] - good["not_present"])
+
+    rows = []
+    for col in np.argsort(-gap):
+        rows.append({
+            "variable": CANONICAL_VARIABLES[col],
+            "good_excellent": good["excellent"][col],
+            "bad_excellent": bad["excellent"][col],
+            "good_not_present": good["not_present"][col],
+            "bad_not_present": bad["not_present"][col],
+            "gap": float(gap[col]),
+        })
+    return rows
+
+def _normalize_phrase(evidence):
+    phrase = re.sub(r"\s+", " ", str(evidence)).strip().strip("\"'“”").strip()
+    return "" if phrase.upper() in ("", "NA", "N/A") else phrase
+
+def collect_phrases(variable_rows, is_good, variables):
+    """
+    Counts Excellent evidence quotes of GOOD calls for the given variables,
+    streaming the calls a second time so quotes never all sit in memory.
+    Returns {variable: Counter(phrase -> count)}.
+    """
+    wanted = set(variables)
+    phrases = {name: Counter() for name in variables}
+    for good, rows in zip(is_good, variable_rows):
+        if not good:
+            continue
+        for v in rows:
+            if v["variable"] not in wanted or v["status"] != "Excellent":
+                continue
+            phrase = _normalize_phrase(v.get("evidence", ""))
+            counter = phrases[v["variable"]]
+            key = phrase.lower()
+            if phrase and (key in counter or len(counter) < MAX_DISTINCT_PHRASES):
+                counter[key] += 1
+    return phrases
+
+# =========================
+# REPORT
+# =========================
+
+def _pct(value):
+    return "  n/a" if np.isnan(value) else f"{value * 100:5.1f}"
+
+def format_differences(rows):
+    return "\n".join(
+        f"{r['variable']} | {_pct(r['good_excellent'])} | {_pct(r['bad_excellent'])} | "
+        f"{_pct(r['good_not_present'])} | {_pct(r['bad_not_present'])} | {r['gap']:+.2f}"
+        for r in rows
+    )
+
+def format_phrases(phrases):
+    lines = []
+    for name, counter in phrases.items():
+        top = counter.most_common(PHRASES_PER_VARIABLE)
+        if top:
+            lines.append(f"{name} | " + "; ".join(f'"{p}" ({n})' for p, n in top))
+    return "\n".join(lines)
+
+def summarize_with_model(good_calls, bad_calls, differences, phrases):
+    """One model call over the aggregated differences (never per call or per pair)."""
+    from src import call_gemini   # Imported here so the local statistics need no Vertex AI setup
+
+    prompt = COHORT_SUMMARY_PROMPT.format(
+        good_calls=good_calls, bad_calls=bad_calls, differences=differences, phrases=phrases
+    )
+    return call_gemini(prompt=prompt, stage="cohort_summary")
+
+def run_cohort_comparison(results_dir=RESULTS_DIR, report_paths=None, use_model=True, output_file=OUTPUT_FILE):
+    """
+    Splits scored calls into GOOD and BAD (same rule as the run summary),
+    computes variable-level differences locally and writes the cohort report.
+    Returns the report lines, or None if either group is too small.
+    """
+    if report_paths:
+        call_ids, codes = load_report_matrix(report_paths)
+    else:
+        call_ids, codes, _ = load_results_matrix(results_dir)
+
+    call_type = score_matrix(codes)["call_type"]
+    scored = call_type != "ERROR"
+    is_good = call_type == "GOOD"
+    good_calls, bad_calls = int(is_good.sum()), int((scored & ~is_good).sum())
+    print(f"[COHORT] {len(call_ids)} calls: {good_calls} GOOD, {bad_calls} BAD, {int((~scored).sum())} ERROR")
+    if good_calls < MIN_GROUP_CALLS or bad_calls < MIN_GROUP_CALLS:
+        print(f"[COHORT] Need at least {MIN_GROUP_CALLS} GOOD and BAD calls to compare")
+        return None
+
+    rows = compare_cohorts(codes[scored], is_good[scored])[:TOP_VARIABLES]
+    phrases = collect_phrases(_iter_variable_rows(results_dir, report_paths), is_good,
+                              [r["variable"] for r in rows])
+    differences = format_differences(rows)
+    phrase_lines = format_phrases(phrases)
+
+    lines = [
+        f"{'='*84}",
+        "COHORT COMPARISON REPORT: GOOD vs BAD",
+        f"{'='*84}",
+        f"GOOD calls : {good_calls}",
+        f"BAD calls  : {bad_calls}",
+        "",
+        f"--- TOP {len(rows)} VARIABLE DIFFERENCES (% of calls) ---",
+        f"| {'Variable':<40} | {'GOOD Exc':>8} | {'BAD Exc':>8} | {'GOOD NP':>8} | {'BAD NP':>8} | {'Gap':>6} |",
+        f"|{'-'*42}|{'-'*10}|{'-'*10}|{'-'*10}|{'-'*10}|{'-'*8}|",
+    ]
+    for r in rows:
+        lines.append(
+            f"| {r['variable']:<40} | {_pct(r['good_excellent']):>8} | {_pct(r['bad_excellent']):>8} | "
+            f"{_pct(r['good_not_present']):>8} | {_pct(r['bad_not_present']):>8} | {r['gap']:>+6.2f} |"
+        )
+    lines += ["", "--- MOST FREQUENT GOOD-CALL EVIDENCE ---", phrase_lines or "(no evidence quotes)"]
+
+    if use_model:
+        lines += ["", "--- MODEL SUMMARY ---", summarize_with_model(good_calls, bad_calls, differences, phrase_lines).strip()]
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"[COHORT] Report saved to {output_file}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare GOOD vs BAD calls across a whole run.")
+    parser.add_argument("--results", default=RESULTS_DIR, help="Stored per-call results directory")
+    parser.add_argument("--reports", nargs="*", help="Archived summary report files instead of stored results")
+    parser.add_argument("--no-model", action="store_true", help="Local statistics only, skip the summary call")
+    parser.add_argument("--out", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    run_cohort_comparison(args.results, args.reports, use_model=not args.no_model, output_file=args.out)
@@ -0,0 +1,212 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import json
+import argparse
+import numpy as np
+
+from schema import CANONICAL_VARIABLES, VARIABLE_INDEX
+from records import encode_variables
+from scoring import score_matrix, statuses_to_matrix, load_report_matrix, load_matrix, GOOD_THRESHOLD
+
+# =========================
+# CONFIGURATION
+# =========================
+
+POLICY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grading_policies")
+
+# =========================
+# POLICY LOADING
+# =========================
+
+def load_policy(name_or_path):
+    """
+    Loads a grading policy from grading_policies/<name>.json or an explicit path.
+
+    A policy defines:
+    - bands: [[lower_bound_pct, label], ...], highest first
+    - good_threshold: GOOD/BAD cut-off on the policy score
+    - groups: variable names per group, e.g. behaviour / positive_context (a
+      variable belongs to at most one group)
+    - group_weights: weight per variable group
+    - variable_weights: per-variable multipliers on top of the group weight
+    Raises ValueError for unknown groups/variables, overlapping groups or malformed bands.
+    """
+    path = name_or_path if name_or_path.endswith(".json") else os.path.join(POLICY_DIR, f"{name_or_path}.json")
+    with open(path, encoding="utf-8") as f:
+        policy = json.load(f)
+
+    policy.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    policy.setdefault("good_threshold", GOOD_THRESHOLD)
+    policy.setdefault("groups", {})
+    policy.setdefault("group_weights", {})
+    policy.setdefault("variable_weights", {})
+
+    bands = [(float(lower), str(label)) for lower, label in policy.get("bands", [])]
+    if not bands or bands != sorted(bands, reverse=True) or bands[-1][0] != 0:
+        raise ValueError(f"Policy {policy['name']}: bands must be highest-first and end at 0")
+    policy["bands"] = bands
+
+    grouped = {}
+    for group, names in policy["groups"].items():
+        for name in names:
+            if name not in VARIABLE_INDEX:
+                raise ValueError(f"Policy {policy['name']}: unknown variable '{name}' in group '{group}'")
+            if name in grouped:
+                raise ValueError(f"Policy {policy['name']}: '{name}' is in both '{grouped[name]}' and '{group}'")
+            grouped[name] = group
+
+    weights = np.ones(len(CANONICAL_VARIABLES), dtype=np.float64)
+    for group, weight in policy["group_weights"].items():
+        if group not in policy["groups"]:
+            raise ValueError(f"Policy {policy['name']}: unknown variable group '{group}'")
+        for name in policy["groups"][group]:
+            weights[VARIABLE_INDEX[name]] = weight
+    for name, multiplier in policy["variable_weights"].items():
+        if name not in VARIABLE_INDEX:
+            raise ValueError(f"Policy {policy['name']}: unknown variable '{name}'")
+        weights[VARIABLE_INDEX[name]] *= multiplier
+    policy["weights"] = weights
+
+    return policy
+
+# =========================
+# GRADING
+# =========================
+
+def apply_policy(codes, policy):
+    """
+    Grades a call x variable status matrix under a policy.
+    Returns score_matrix's dict (policy-weighted excellent_percentage, call_type,
+    grade) plus a per-group score array for every group the policy defines.
+    """
+    scores = score_matrix(codes, weights=policy["weights"],
+                          good_threshold=policy["good_threshold"], bands=policy["bands"])
+
+    for group, names in policy["groups"].items():
+        mask = np.zeros(len(CANONICAL_VARIABLES), dtype=np.float64)
+        mask[[VARIABLE_INDEX[n] for n in names]] = 1.0
+        group_scores = score_matrix(codes, weights=policy["weights"] * mask)
+        scores[f"{group}_percentage"] = group_scores["excellent_percentage"]
+
+    return scores
+
+def grade_variables(variables, policy):
+    """Grades a single call's variable rows. Returns {"policy", "score", "grade", "call_type"}."""
+    codes = statuses_to_matrix([encode_variables(variables)[0]])
+    scores = apply_policy(codes, policy)
+    return {
+        "policy": policy["name"],
+        "score": float(scores["excellent_percentage"][0]),
+        "grade": str(scores["grade"][0]),
+        "call_type": str(scores["call_type"][0]),
+    }
+
+# =========================
+# POLICY DIFF
+# =========================
+
+def same_scale(old_policy, new_policy):
+    """True if both policies grade on the same band labels, so their grades compare directly."""
+    return [label for _, label in old_policy["bands"]] == [label for _, label in new_policy["bands"]]
+
+def diff_policies(call_ids, codes, old_policy, new_policy):
+    """
+    Regrades stored calls under two policies (no model calls).
+    Returns (changes, transitions, relabelled): the calls that were really
+    regraded, a count of each old -> new transition, and how many calls only
+    changed label. A call is regraded when its GOOD/BAD class changes, or its
+    grade changes between policies on the same band labels; across different
+    label sets (GOOD/BAD vs five bands) grade strings always differ, so those
+    count as relabelled and transitions are counted on the class instead.
+    """
+    old = apply_policy(codes, old_policy)
+    new = apply_policy(codes, new_policy)
+
+    graded = same_scale(old_policy, new_policy)
+    regraded = old["call_type"] != new["call_type"]
+    if graded:
+        regraded |= old["grade"] != new["grade"]
+    relabelled = int(((old["grade"] != new["grade"]) & ~regraded).sum())
+
+    changed = np.flatnonzero(regraded)
+    changes = [
+        {
+            "call": call_ids[row],
+            "old_score": float(old["excellent_percentage"][row]),
+            "new_score": float(new["excellent_percentage"][row]),
+            "old_grade": str(old["grade"][row]),
+            "new_grade": str(new["grade"][row]),
+            "old_type": str(old["call_type"][row]),
+            "new_type": str(new["call_type"][row]),
+        }
+        for row in changed
+    ]
+
+    key = "grade" if graded else "call_type"
+    pairs = np.char.add(np.char.add(old[key].astype(str), " -> "), new[key].astype(str))
+    labels, counts = np.unique(pairs, return_counts=True)
+    transitions = dict(zip(labels.tolist(), counts.tolist()))
+    return changes, transitions, relabelled
+
+def _call_label(call):
+    # Report-loaded calls are (path, index) pairs
+    if isinstance(call, tuple):
+        return f"{os.path.basename(call[0])}:{call[1]}"
+    return str(call)
+
+def format_diff_report(changes, transitions, old_policy, new_policy, total_calls, relabelled=0):
+    """Renders a policy diff as report lines."""
+    graded = same_scale(old_policy, new_policy)
+    lines = [
+        f"{'='*80}",
+        f"GRADING POLICY DIFF: {old_policy['name']} -> {new_policy['name']}",
+        f"{'='*80}",
+        f"Calls regraded : {total_calls}",
+        f"Calls changed  : {len(changes)}",
+    ]
+    if not graded:
+        lines.append(f"Label only     : {relabelled} (different band labels; compared on GOOD/BAD class)")
+    lines += [
+        "",
+        "GRADE TRANSITIONS:" if graded else "CLASS TRANSITIONS:",
+    ]
+    for pair, count in sorted(transitions.items(), key=lambda kv: -kv[1]):
+        lines.append(f"  {pair:<30} {count}")
+
+    if changes:
+        lines.append("")
+        lines.append(f"| {'Call':<40} | {'Old':<22} | {'New':<22} |")
+        lines.append(f"|{'-'*42}|{'-'*24}|{'-'*24}|")
+        for c in changes:
+            old = f"{c['old_grade']} ({c['old_score']}%)"
+            new = f"{c['new_grade']} ({c['new_score']}%)"
+            lines.append(f"| {_call_label(c['call']):<40} | {old:<22} | {new:<22} |")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regrade stored results under grading policies.")
+    parser.add_argument("sources", nargs="+", help="Summary report files or a cached .npz status matrix")
+    parser.add_argument("--old", default="default", help="Baseline policy name or path")
+    parser.add_argument("--new", default="five_band", help="Policy to compare against")
+    parser.add_argument("--out", help="Write the diff report to this file")
+    args = parser.parse_args()
+
+    if len(args.sources) == 1 and args.sources[0].endswith(".npz"):
+        call_ids, codes = load_matrix(args.sources[0])
+    else:
+        call_ids, codes = load_report_matrix(args.sources)
+
+    old_policy, new_policy = load_policy(args.old), load_policy(args.new)
+    changes, transitions, relabelled = diff_policies(call_ids, codes, old_policy, new_policy)
+    report = format_diff_report(changes, transitions, old_policy, new_policy, len(call_ids), relabelled)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write("\n".join(report) + "\n")
+        print(f"Diff report saved to {args.out} ({len(changes)} changed calls)")
+    else:
+        print("\n".join(report))
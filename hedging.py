@@ -0,0 +1,328 @@
+# =========================
+# IMPORTS
+# =========================
+
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+
+# =========================
+# CONFIGURATION
+# =========================
+
+HEDGE_PERCENTILE = 0.95    # Send a duplicate once a request outlasts this percentile of recent ones (per stage)
+MIN_SAMPLES = 20           # Latencies a stage needs before it is hedged
+LATENCY_WINDOW = 200       # Recent latencies per stage the threshold is learned from
+MIN_HEDGE_DELAY_SEC = 5.0  # Never hedge sooner than this, whatever the percentile says
+HEDGE_BUDGET = 0.05        # Duplicates allowed as a fraction of requests sent...
+HEDGE_BURST = 2            # ...plus this many, so quota use stays ~1.05x rather than 2x
+REQUEST_DEADLINE_SEC = 600 # Abandon a request (and its duplicate) after this long; call_gemini retries it
+STREAM_IDLE_SEC = 120      # Abandon a stream that sends no chunk for this long (its whole read is also
+                           # bounded by REQUEST_DEADLINE_SEC)
+METRICS_WINDOW = 10000     # Latencies per stage kept for the p50/p99 report
+
+
+_END = object()               # End-of-stream marker for read_stream
+
+
+class HedgeTimeout(TimeoutError):
+    """Neither the request nor its duplicate answered within the deadline, or a stream stalled."""
+
+def _cancel(responses):
+    """Stops a stream another thread may be blocked reading (gRPC-style cancel(), else close())."""
+    for name in ("cancel", "close"):
+        method = getattr(responses, name, None)
+        if method is None:
+            continue
+        try:
+            method()
+            return
+        except Exception:
+            pass   # e.g. a generator that is mid-read; the reader closes it when the read returns
+
+# =========================
+# LATENCY TRACKING
+# =========================
+
+def percentile(values, q):
+    """Nearest-rank percentile of a sequence, or None when empty."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+class _StageStats:
+    def __init__(self):
+        self.recent = deque(maxlen=LATENCY_WINDOW)     # Winning latencies the threshold is learned from
+        self.actual = deque(maxlen=METRICS_WINDOW)     # What callers waited
+        self.unhedged = deque(maxlen=METRICS_WINDOW)   # What they would have waited for the first request alone
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+        self.timeouts = 0
+        self.stalls = 0
+        self.abandoned = 0              # Requests left running after a win or a timeout
+        self.abandoned_completed = 0    # ...of which later returned (and were closed/discarded)
+        self.wasted_tokens = 0          # Tokens those returned requests were billed
+
+# =========================
+# HEDGER
+# =========================
+
+class Hedger:
+    """
+    Runs model requests with a deadline and a hedge: once a request has run
+    longer than the stage's HEDGE_PERCENTILE latency, an identical duplicate is
+    sent and whichever answers first wins. The other one is abandoned: its
+    response is handed to `discard` (e.g. close a stream) as soon as it
+    arrives, and `usage_of` counts the tokens it was billed. A request still
+    blocked in the SDK cannot be interrupted, only closed when it returns.
+    Duplicates are capped by a budget relative to requests sent.
+    read_stream() bounds the rest of a streamed response the same way and
+    cancels the stream when it gives up on it.
+    Requests run on daemon threads so an abandoned hang never blocks exit.
+    Thread-safe.
+    """
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, budget=HEDGE_BUDGET, burst=HEDGE_BURST,
+                 deadline_sec=REQUEST_DEADLINE_SEC, min_delay_sec=MIN_HEDGE_DELAY_SEC):
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.deadline_sec = deadline_sec
+        self.min_delay_sec = min_delay_sec
+        self.stages = {}
+        self.requests = 0
+        self.hedges = 0
+        self._pending_primaries = {}   # Abandoned first requests still running -> (stage, start)
+        self._lock = threading.Lock()
+
+    def _stage(self, stage):
+        if stage not in self.stages:
+            self.stages[stage] = _StageStats()
+        return self.stages[stage]
+
+    def hedge_delay(self, stage):
+        """Seconds after which a request of this stage is hedged, or None while still learning."""
+        with self._lock:
+            recent = list(self._stage(stage).recent)
+        if len(recent) < MIN_SAMPLES:
+            return None
+        return max(percentile(recent, self.percentile), self.min_delay_sec)
+
+    def _take_hedge(self, stage):
+        with self._lock:
+            s = self._stage(stage)
+            if self.hedges >= self.requests * self.budget + self.burst:
+                s.denied += 1
+                return False
+            self.hedges += 1
+            s.hedged += 1
+            return True
+
+    def _launch(self, request):
+        future = Future()
+
+        def target():
+            try:
+                result = request()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=target, daemon=True, name="model-request").start()
+        return future
+
+    def _abandon(self, pending, stage, start, discard, usage_of):
+        """
+        Lets still-running requests finish in the background, closes what they
+        return via `discard` and counts their tokens via `usage_of`.
+        """
+        def on_done(future, role):
+            ok = future.exception() is None
+            tokens = 0
+            if ok and usage_of is not None:
+                try:
+                    tokens = usage_of(future.result()) or 0
+                except Exception:
+                    pass
+            with self._lock:
+                s = self._stage(stage)
+                if role == "primary" and self._pending_primaries.pop(future, None) is not None and ok:
+                    s.unhedged.append(time.monotonic() - start)
+                if ok:
+                    s.abandoned_completed += 1
+                    s.wasted_tokens += tokens
+            if discard is not None and ok:
+                try:
+                    discard(future.result())
+                except Exception:
+                    pass
+
+        with self._lock:
+            self._stage(stage).abandoned += len(pending)
+        for future, role in pending.items():
+            if role == "primary":
+                with self._lock:
+                    self._pending_primaries[future] = (stage, start)
+            future.add_done_callback(lambda f, role=role: on_done(f, role))
+
+    def run(self, request, stage=None, discard=None, usage_of=None):
+        """
+        Calls request() (no arguments, returns a response). Returns (response,
+        abandoned): the first successful response of it and its duplicate, and
+        how many requests were still running when it won (the caller accounts
+        for their usage). Raises the last error when both fail, or HedgeTimeout
+        after deadline_sec. usage_of(response) -> tokens measures what an
+        abandoned request was billed once it returns (reported in metrics).
+        """
+        start = time.monotonic()
+        delay = self.hedge_delay(stage)
+        with self._lock:
+            self.requests += 1
+            self._stage(stage).requests += 1
+
+        pending = {self._launch(request): "primary"}
+        hedged = False
+        error = None
+        while pending:
+            elapsed = time.monotonic() - start
+            if elapsed >= self.deadline_sec:
+                self._abandon(pending, stage, start, discard, usage_of)
+                with self._lock:
+                    self._stage(stage).timeouts += 1
+                raise HedgeTimeout(f"{stage or 'model'} request got no response in {self.deadline_sec:.0f}s")
+
+            can_hedge = not hedged and delay is not None
+            timeout = self.deadline_sec - elapsed
+            if can_hedge:
+                timeout = min(timeout, max(delay - elapsed, 0))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                role = pending.pop(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                latency = time.monotonic() - start
+                abandoned = len(pending)
+                self._abandon(pending, stage, start, discard, usage_of)
+                with self._lock:
+                    s = self._stage(stage)
+                    s.recent.append(latency)
+                    s.actual.append(latency)
+                    if role == "hedge":
+                        s.hedge_wins += 1
+                    else:
+                        s.unhedged.append(latency)
+                return future.result(), abandoned
+
+            if can_hedge and pending and time.monotonic() - start >= delay:
+                hedged = True
+                if self._take_hedge(stage):
+                    print(f"      [HEDGE] {stage or 'model'} request running {time.monotonic() - start:.0f}s "
+                          f"(p{self.percentile * 100:.0f} {delay:.0f}s) — sending a duplicate")
+                    pending[self._launch(request)] = "hedge"
+
+        raise error
+
+    def read_stream(self, responses, stage=None, idle_sec=STREAM_IDLE_SEC):
+        """
+        Yields the chunks of a streamed response, read on a daemon thread so a
+        stall can be detected. Raises HedgeTimeout when no chunk arrives for
+        idle_sec or the read outlasts deadline_sec. Closing the generator (or a
+        stall) cancels the stream so it stops generating billed tokens; the
+        reader closes it as well once its pending read returns.
+        """
+        chunks = queue.Queue()
+        stop = threading.Event()
+
+        def reader():
+            last = (_END, None)
+            try:
+                for chunk in responses:
+                    if stop.is_set():
+                        break
+                    chunks.put((chunk, None))
+            except BaseException as e:
+                last = (None, e)
+            finally:
+                close = getattr(responses, "close", None)
+                if close:
+                    try:
+                        close()
+                    except Exception:
+                        pass
+                chunks.put(last)
+
+        reading = threading.Thread(target=reader, daemon=True, name="model-stream")
+        reading.start()
+        deadline = time.monotonic() + self.deadline_sec
+        try:
+            while True:
+                try:
+                    chunk, error = chunks.get(timeout=max(min(idle_sec, deadline - time.monotonic()), 0))
+                except queue.Empty:
+                    with self._lock:
+                        self._stage(stage).stalls += 1
+                    raise HedgeTimeout(f"{stage or 'model'} stream stalled (no chunk for {idle_sec:.0f}s "
+                                       f"or over the {self.deadline_sec:.0f}s deadline)")
+                if error is not None:
+                    raise error
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            stop.set()
+            if reading.is_alive():
+                _cancel(responses)
+
+    def metrics(self):
+        """Per-stage counts and latency percentiles, with and without hedging."""
+        now = time.monotonic()
+        out = {}
+        with self._lock:
+            for stage, s in self.stages.items():
+                # First requests abandoned and still running count at their age so far (a lower bound)
+                unhedged = list(s.unhedged) + [now - start for st, start in self._pending_primaries.values()
+                                               if st == stage]
+                out[stage] = {
+                    "requests": s.requests,
+                    "hedged": s.hedged,
+                    "hedge_rate": round(s.hedged / s.requests, 4) if s.requests else 0.0,
+                    "hedge_wins": s.hedge_wins,
+                    "denied": s.denied,
+                    "timeouts": s.timeouts,
+                    "stalls": s.stalls,
+                    "abandoned": s.abandoned,
+                    "abandoned_completed": s.abandoned_completed,
+                    "wasted_tokens": s.wasted_tokens,
+                    "p50_sec": percentile(list(s.actual), 0.5),
+                    "p99_sec": percentile(list(s.actual), 0.99),
+                    "p99_unhedged_sec": percentile(unhedged, 0.99),
+                }
+        return out
+
+    def report(self):
+        """Summary lines: hedge rate, wins and p99 with vs without hedging, per stage."""
+        lines = [f"Hedging: p{self.percentile * 100:.0f} threshold, budget {self.budget:.0%} (+{self.burst}), "
+                 f"deadline {self.deadline_sec:.0f}s"]
+        for stage, m in sorted(self.metrics().items(), key=lambda kv: str(kv[0])):
+            line = (f"{stage or 'model'}: {m['requests']} requests, {m['hedged']} hedged ({m['hedge_rate']:.1%}), "
+                    f"{m['hedge_wins']} won by the duplicate, {m['denied']} over budget, {m['timeouts']} timed out")
+            if m["stalls"]:
+                line += f", {m['stalls']} stalled mid-stream"
+            if m["p99_sec"] is not None:
+                line += f"; p50 {m['p50_sec']:.1f}s, p99 {m['p99_sec']:.1f}s"
+                if m["p99_unhedged_sec"] is not None:
+                    line += f" (unhedged {m['p99_unhedged_sec']:.1f}s)"
+            if m["abandoned"]:
+                line += (f"; {m['abandoned']} abandoned ({m['abandoned_completed']} returned and closed, "
+                         f"{m['wasted_tokens']:,} tokens billed)")
+            lines.append(line)
+        return lines
@@ -0,0 +1,103 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import re
+import hashlib
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# =========================
+# CONFIGURATION
+# =========================
+
+ID_PARAMS = ("callId", "call_id", "callid")   # Query parameters that already name the recording
+IGNORED_PARAMS = {                             # Expiring auth, not part of the identity (matched lowercased)
+    "token", "expires", "signature", "sig",
+    "x-amz-signature", "x-amz-date", "x-amz-expires", "x-amz-credential", "x-amz-security-token",
+}
+
+PROCESSED_ID_PREFIX = "id:"          # Resume-log entries are "id:<call_id>"; bare digits are legacy sheet row indices
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+# =========================
+# CANONICAL CALL ID
+# =========================
+
+def canonical_url(url):
+    """URL with auth parameters dropped and the remaining query sorted."""
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k.lower() not in IGNORED_PARAMS)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path}" + (f"?{urlencode(query)}" if query else "")
+
+def canonical_call_id(url):
+    """
+    Stable, filename-safe ID for a recording URL.
+    Uses the callId query parameter when present (the same recording keeps its
+    callId while the token changes per export); otherwise a short hash of the
+    canonical URL.
+    """
+    params = dict(parse_qsl(urlsplit(url.strip()).query))
+    for name in ID_PARAMS:
+        if params.get(name):
+            return _UNSAFE_RE.sub("_", params[name])
+    return "u" + hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:16]
+
+# =========================
+# RESUME LOG
+# =========================
+
+def load_processed(paths):
+    """
+    Reads resume logs into (call IDs, sheet row indices). Entries are
+    "id:<call_id>"; older logs hold bare row indices (all digits) or bare
+    call IDs, which are still honoured. The prefix keeps a numeric call ID
+    from being read as a row index.
+    """
+    ids, indices = set(), set()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            for line in f:
+                entry = line.strip()
+                if entry.startswith(PROCESSED_ID_PREFIX):
+                    ids.add(entry[len(PROCESSED_ID_PREFIX):])
+                elif entry.isdigit():
+                    indices.add(int(entry))
+                elif entry:
+                    ids.add(entry)
+    return ids, indices
+
+# =========================
+# DEDUPLICATION
+# =========================
+
+class CallDeduplicator:
+    """
+    Drops calls whose recording was already processed (in an earlier run, per
+    the resume log) or already queued from an earlier row of this run.
+    Every dropped row is linked to the call ID whose stored result covers it
+    in the duplicates log ("<call_id>\t<source>\t<row>").
+    """
+
+    def __init__(self, seen_ids=None, duplicates_log=None, source=""):
+        self.seen = set(seen_ids or ())
+        self.duplicates_log = duplicates_log
+        self.source = source
+        self.unique = 0
+        self.duplicates = 0
+
+    def filter(self, calls):
+        """Yields only first occurrences; works lazily on any call iterator."""
+        for call in calls:
+            if call["call_id"] in self.seen:
+                self.duplicates += 1
+                if self.duplicates_log:
+                    with open(self.duplicates_log, "a", encoding="utf-8") as f:
+                        f.write(f"{call['call_id']}\t{self.source}\t{call['index']}\n")
+                continue
+            self.seen.add(call["call_id"])
+            self.unique += 1
+            yield call
@@ -0,0 +1,115 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import csv
+import json
+
+from identity import canonical_call_id
+
+# =========================
+# CONFIGURATION
+# =========================
+
+URL_COLUMN = "recording_url"   # Column holding the recording URL
+
+# =========================
+# ROW READERS
+# =========================
+# Each reader yields (header, row_iterator) lazily; rows are lists of cell
+# values in header order, so nothing beyond the current row is held in memory.
+
+def _iter_xlsx(path):
+    from openpyxl import load_workbook
+
+    # read_only streams rows straight from the sheet XML instead of building the workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        yield [str(h).strip() if h is not None else "" for h in header]
+        for row in rows:
+            yield list(row)
+    finally:
+        workbook.close()
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        yield [h.strip() for h in next(reader, [])]
+        for row in reader:
+            yield row
+
+def _iter_jsonl(path):
+    # JSONL has no header row: columns come from the first record's keys
+    with open(path, encoding="utf-8") as f:
+        header = None
+        for line in f:
+            line = line.strip()
+            if not line:
+                if header is not None:
+                    yield []
+                continue
+            record = json.loads(line)
+            if header is None:
+                header = list(record)
+                yield header
+            yield [record.get(h) for h in header]
+
+READERS = {
+    ".xlsx": _iter_xlsx,
+    ".xlsm": _iter_xlsx,
+    ".csv": _iter_csv,
+    ".jsonl": _iter_jsonl,
+}
+
+# =========================
+# CALL STREAM
+# =========================
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+def iter_calls(path, url_column=URL_COLUMN, column_map=None):
+    """
+    Lazily yields calls from an .xlsx, .csv or .jsonl call sheet.
+
+    Each call is {"index", "call_id", "audio_url", "meta"}: index is the 1-based
+    data row (same numbering as the old pd.read_excel loader, blank rows
+    included), call_id the recording's canonical ID (see identity.py),
+    and meta holds the columns named in column_map ({field: source_column},
+    e.g. {"agent": "agent_name"}). Rows without a URL are skipped.
+    Raises ValueError for an unsupported file type or a missing URL column.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"Unsupported call sheet type '{ext}' (expected {', '.join(READERS)})")
+    column_map = column_map or {}
+
+    rows = READERS[ext](path)
+    header = next(rows, [])
+    if url_column not in header:
+        raise ValueError(f"{path}: no '{url_column}' column (found: {', '.join(h for h in header if h)})")
+    url_col = header.index(url_column)
+
+    meta_cols = {}
+    for field, column in column_map.items():
+        if column in header:
+            meta_cols[field] = header.index(column)
+        else:
+            print(f"[INGEST] {path}: metadata column '{column}' not found, '{field}' is ignored")
+
+    for i, row in enumerate(rows):
+        url = _clean(row[url_col]) if url_col < len(row) else None
+        if not url:
+            continue
+        yield {
+            "index": i + 1,
+            "call_id": canonical_call_id(url),
+            "audio_url": url,
+            "meta": {field: _clean(row[col]) if col < len(row) else None for field, col in meta_cols.items()},
+        }
@@ -0,0 +1,222 @@
+# =========================
+# IMPORTS
+# =========================
+
+import json
+import time
+import sqlite3
+import threading
+
+from identity import canonical_call_id
+from lanes import lane_of, tenant_of, lane_table, TENANT_WEIGHTS
+
+# =========================
+# CONFIGURATION
+# =========================
+
+DB_PATH = "output/jobs.db"
+MAX_ATTEMPTS = 2               # A job that fails this many times stays failed until resubmitted
+
+STATUSES = ("queued", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_id      TEXT UNIQUE NOT NULL,
+    url          TEXT NOT NULL,
+    meta         TEXT NOT NULL DEFAULT '{}',
+    status       TEXT NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at   REAL,
+    finished_at  REAL,
+    call_type    TEXT,
+    error        TEXT,
+    lane         TEXT NOT NULL DEFAULT 'standard',
+    tenant       TEXT NOT NULL DEFAULT 'default',
+    result_at    REAL          -- When this run's result was stored; cleared when the job is queued again
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, job_id);
+CREATE TABLE IF NOT EXISTS lane_clocks (
+    lane   TEXT NOT NULL,
+    tenant TEXT NOT NULL,      -- '' holds the lane's own clock
+    vtime  REAL NOT NULL,
+    PRIMARY KEY (lane, tenant)
+);
+"""
+_LANE_INDEX = "CREATE INDEX IF NOT EXISTS jobs_lane ON jobs (status, lane, tenant, job_id)"
+
+# =========================
+# DURABLE JOB QUEUE
+# =========================
+
+class JobQueue:
+    """
+    SQLite-backed queue of calls to score. Survives restarts: jobs that were
+    running when the process died are queued again on open. Jobs are keyed by
+    canonical call ID, so resubmitting a recording (even with a new token)
+    returns the existing job instead of scoring it twice.
+    With max_workers set, claim() follows the lanes.py lane table over every
+    queued job (priority, reservations, per-lane caps, weighted fair sharing
+    across tenants, with virtual times kept in the database); without it,
+    jobs are claimed oldest first.
+    One connection is shared by all threads behind a lock.
+    """
+
+    def __init__(self, path=DB_PATH, max_workers=None, lanes=None):
+        self.path = path
+        self.lanes = lane_table(max_workers, lanes) if max_workers else None
+        self.max_workers = max_workers
+        self._lane_names = dict(self.lanes) if self.lanes else None
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            self._migrate()
+            recovered = self._db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+        if recovered:
+            print(f"[QUEUE] Re-queued {recovered} jobs interrupted by the last shutdown")
+
+    def _migrate(self):
+        # Queues created before lanes lack the lane/tenant columns; fill them from each job's meta
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "lane" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN lane TEXT NOT NULL DEFAULT 'standard'")
+            self._db.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT NOT NULL DEFAULT 'default'")
+            for row in self._db.execute("SELECT job_id, meta FROM jobs").fetchall():
+                call = {"meta": json.loads(row["meta"])}
+                self._db.execute("UPDATE jobs SET lane = ?, tenant = ? WHERE job_id = ?",
+                                 (lane_of(call), tenant_of(call), row["job_id"]))
+        if "result_at" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN result_at REAL")
+            self._db.execute("UPDATE jobs SET result_at = finished_at WHERE call_type IS NOT NULL")
+        self._db.execute(_LANE_INDEX)
+
+    def submit(self, url, meta=None):
+        """
+        Queues a recording URL. Returns (job dict, created). An existing job for
+        the same call ID keeps its status, but a failed one is queued again (its
+        stored result no longer counts until the new run completes) and a
+        queued one picks up the newer URL (fresher token).
+        """
+        call_id = canonical_call_id(url)
+        call = {"meta": meta or {}}
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (call_id, url, meta, submitted_at, lane, tenant) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (call_id, url, json.dumps(meta or {}), time.time(), lane_of(call, self._lane_names), tenant_of(call)),
+            )
+            created = cur.rowcount == 1
+            if not created:
+                self._db.execute(
+                    "UPDATE jobs SET url = ?, status = CASE status WHEN 'failed' THEN 'queued' ELSE status END, "
+                    "attempts = CASE status WHEN 'failed' THEN 0 ELSE attempts END, "
+                    "result_at = CASE status WHEN 'failed' THEN NULL ELSE result_at END "
+                    "WHERE call_id = ? AND status IN ('queued', 'failed')",
+                    (url, call_id),
+                )
+        return self.get(call_id), created
+
+    def claim(self):
+        """
+        Atomically takes the next job and marks it running: the oldest queued
+        one, or the lane scheduler's pick when max_workers is set. Returns the
+        job, or None when nothing is queued (or no lane may start a job now).
+        """
+        with self._lock:
+            if self.lanes is None:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY job_id LIMIT 1"
+                ).fetchone()
+            else:
+                row = self._next_in_lanes()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 WHERE job_id = ?",
+                (time.time(), row["job_id"]),
+            )
+        return self.get(row["call_id"])
+
+    def _next_in_lanes(self):
+        # Same rules as lanes.FairScheduler.next_call, over every queued job
+        running = dict(self._db.execute(
+            "SELECT lane, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY lane").fetchall())
+        free = self.max_workers - sum(running.values())
+        held_for_higher = 0
+        for name, cfg in self.lanes:
+            active = running.get(name, 0)
+            capped = cfg.get("max_concurrency") is not None and active >= cfg["max_concurrency"]
+            if not capped and free > held_for_higher:
+                row = self._pick_tenant(name)
+                if row is not None:
+                    return row
+            held_for_higher += max(cfg.get("reserved", 0) - active, 0)
+        return None
+
+    def _pick_tenant(self, lane):
+        """Oldest queued job of the lane's tenant with the lowest virtual time (weighted fair queuing)."""
+        heads = self._db.execute(
+            "SELECT tenant, MIN(job_id) AS job_id FROM jobs WHERE status = 'queued' AND lane = ? GROUP BY tenant",
+            (lane,)).fetchall()
+        if not heads:
+            return None
+        clocks = dict(self._db.execute("SELECT tenant, vtime FROM lane_clocks WHERE lane = ?", (lane,)).fetchall())
+        clock = clocks.get("", 0.0)
+        # A tenant (re)joining starts at the lane clock: no credit for idle periods
+        vtime, tenant, job_id = min((max(clocks.get(h["tenant"], 0.0), clock), h["tenant"], h["job_id"])
+                                    for h in heads)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO lane_clocks (lane, tenant, vtime) VALUES (?, ?, ?)",
+            [(lane, "", vtime), (lane, tenant, vtime + 1.0 / TENANT_WEIGHTS.get(tenant, 1))])
+        return self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+    def complete(self, call_id, call_type, error=None):
+        """
+        Records a pipeline result (call after it is stored). ERROR results (e.g.
+        an expired recording token) are stored as failed, so resubmitting the
+        recording with a fresh URL scores it again; anything else is done.
+        """
+        status = "failed" if call_type == "ERROR" else "done"
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, call_type = ?, error = ?, result_at = ? "
+                "WHERE call_id = ?",
+                (status, now, call_type, error, now, call_id),
+            )
+
+    def fail(self, call_id, error):
+        """Records a crash; the job is retried until it has been attempted MAX_ATTEMPTS times."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "finished_at = ?, error = ? WHERE call_id = ?",
+                (MAX_ATTEMPTS, time.time(), error, call_id),
+            )
+
+    def get(self, call_id):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE call_id = ?", (call_id,)).fetchone()
+        return _job_dict(row) if row else None
+
+    def counts(self):
+        """Returns {status: count} for every status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _job_dict(row):
+    job = dict(row)
+    job["meta"] = json.loads(job["meta"])
+    return job
@@ -0,0 +1,178 @@
+# =========================
+# IMPORTS
+# =========================
+
+import time
+import threading
+from collections import deque
+
+# =========================
+# CONFIGURATION
+# =========================
+
+# Lanes in priority order (0 = highest). reserved: worker slots lower-priority lanes may
+# never take, so a call in this lane starts at once while fewer than `reserved` of its
+# calls are running. max_concurrency: cap on this lane's running calls (None = no cap).
+LANES = {
+    "urgent":   {"priority": 0, "reserved": 1, "max_concurrency": None},
+    "standard": {"priority": 1, "reserved": 0, "max_concurrency": None},
+    "backfill": {"priority": 2, "reserved": 0, "max_concurrency": 3},
+}
+DEFAULT_LANE = "standard"
+LANE_FIELD = "lane"            # Call meta field naming the lane (e.g. a "lane" sheet column)
+TENANT_FIELD = "campaign"      # Call meta field that calls are fair-shared across within a lane
+TENANT_WEIGHTS = {}            # Tenant -> share weight (default 1), e.g. {"enterprise": 3}
+
+# =========================
+# LANE TABLE
+# =========================
+
+def lane_of(call, lanes=None):
+    """Lane name for a call (its "lane" key or LANE_FIELD meta), DEFAULT_LANE if unknown."""
+    meta = call.get("meta") or {}
+    name = call.get("lane") or meta.get(LANE_FIELD)
+    return name if name in (lanes or LANES) else DEFAULT_LANE
+
+def tenant_of(call):
+    """Tenant a call is fair-shared under within its lane."""
+    return str((call.get("meta") or {}).get(TENANT_FIELD) or "default")
+
+def lane_table(max_workers, lanes=None):
+    """
+    Lane configs as (name, config) in priority order, with reservations clamped
+    so they leave at least one slot for the lowest lane (or its calls never start).
+    """
+    table = sorted(((name, dict(cfg)) for name, cfg in (lanes or LANES).items()),
+                   key=lambda item: item[1]["priority"])
+    spare = max_workers - 1
+    for name, cfg in table[:-1]:
+        reserved = cfg.get("reserved", 0)
+        if reserved > spare:
+            print(f"[LANES] Lane '{name}' reserves {reserved} of {max_workers} workers; "
+                  f"clamped to {max(spare, 0)} so lower lanes can still start calls")
+            cfg["reserved"] = max(spare, 0)
+        spare -= cfg.get("reserved", 0)
+    return table
+
+# =========================
+# LANE STATE
+# =========================
+
+class _Lane:
+    """One priority lane: per-tenant FIFOs served by weighted fair queuing."""
+
+    def __init__(self, name, config):
+        self.name = name
+        self.priority = config["priority"]
+        self.reserved = config.get("reserved", 0)
+        self.max_concurrency = config.get("max_concurrency")
+        self.queues = {}       # tenant -> deque of (enqueued_at, call)
+        self.vtime = {}        # tenant -> virtual finish time
+        self.clock = 0.0       # Virtual time of the last dispatch
+        self.pending = 0
+        self.running = 0
+        self.waits = []        # Seconds each started call spent queued
+
+    def add(self, tenant, call, now):
+        queue = self.queues.setdefault(tenant, deque())
+        if not queue:
+            # A tenant (re)joining starts at the current virtual time: no credit for idle periods
+            self.vtime[tenant] = max(self.vtime.get(tenant, 0.0), self.clock)
+        queue.append((now, call))
+        self.pending += 1
+
+    def can_start(self):
+        return self.pending > 0 and (self.max_concurrency is None or self.running < self.max_concurrency)
+
+    def pop(self, now):
+        tenant = min((t for t, q in self.queues.items() if q), key=lambda t: (self.vtime[t], t))
+        enqueued_at, call = self.queues[tenant].popleft()
+        self.clock = self.vtime[tenant]
+        self.vtime[tenant] += 1.0 / TENANT_WEIGHTS.get(tenant, 1)
+        self.pending -= 1
+        self.running += 1
+        self.waits.append(now - enqueued_at)
+        return call
+
+# =========================
+# FAIR SCHEDULER
+# =========================
+
+class FairScheduler:
+    """
+    Decides which queued call a free worker starts next.
+
+    - Lanes are strict priority classes: a lower lane only starts a call when no
+      higher lane has a startable one.
+    - Slots reserved by higher lanes (and not in use by them) are never given to
+      lower lanes, so high-priority calls get a bounded wait without preempting
+      running work. Reservations are clamped to leave the lowest lane one slot.
+    - Within a lane, tenants (TENANT_FIELD, e.g. campaign or agent) share the
+      lane by weighted fair queuing, so one large backfill cannot starve a
+      tenant with a few calls.
+    Thread-safe; records per-lane queue wait times.
+
+    Only calls added so far are scheduled: src.process_queue feeds a streamed
+    sheet in LANE_LOOKAHEAD at a time, so a lane whose calls sit further down
+    the sheet is not seen until the window reaches them, and the bounded wait
+    holds only within that window. job_queue.JobQueue applies the same lanes
+    to every queued job of the service.
+    """
+
+    def __init__(self, max_workers, lanes=None):
+        self.max_workers = max_workers
+        self.lanes = [_Lane(name, cfg) for name, cfg in lane_table(max_workers, lanes)]
+        self._by_name = {lane.name: lane for lane in self.lanes}
+        self._lane_of = {}
+        self._lock = threading.Lock()
+
+    def lane_for(self, call):
+        return lane_of(call, self._by_name)
+
+    def add(self, call):
+        lane = self._by_name[self.lane_for(call)]
+        with self._lock:
+            lane.add(tenant_of(call), call, time.time())
+
+    def pending(self):
+        with self._lock:
+            return sum(lane.pending for lane in self.lanes)
+
+    def queued_calls(self):
+        """Snapshot of every queued call (for run-time estimates)."""
+        with self._lock:
+            return [call for lane in self.lanes for q in lane.queues.values() for _, call in q]
+
+    def next_call(self):
+        """Returns the call to start on a free worker, or None if nothing may start now."""
+        with self._lock:
+            free = self.max_workers - sum(lane.running for lane in self.lanes)
+            held_for_higher = 0
+            for lane in self.lanes:
+                if lane.can_start() and free > held_for_higher:
+                    call = lane.pop(time.time())
+                    self._lane_of[id(call)] = lane
+                    return call
+                held_for_higher += max(lane.reserved - lane.running, 0)
+            return None
+
+    def finished(self, call):
+        with self._lock:
+            lane = self._lane_of.pop(id(call), None)
+            if lane:
+                lane.running -= 1
+
+    def wait_report(self):
+        """Per-lane queue wait lines: calls started, mean, p95 and max wait."""
+        lines = []
+        with self._lock:
+            for lane in self.lanes:
+                if not lane.waits:
+                    continue
+                waits = sorted(lane.waits)
+                p95 = waits[min(int(len(waits) * 0.95), len(waits) - 1)]
+                lines.append(
+                    f"[{lane.name}] started={len(waits)} mean_wait={sum(waits) / len(waits):.1f}s "
+                    f"p95_wait={p95:.1f}s max_wait={waits[-1]:.1f}s"
+                )
+        return lines
@@ -1,9 +1,13 @@
 import os
+import sys
 import time
 import requests
 import google.generativeai as genai
 from dotenv import load_dotenv  
 from tabulate import tabulate 
+from pairing import QUEUE_FILE, pending_pairs, mark_pair_done
+from result_store import load_result
+from signed_urls import url_expires_at, needs_refresh, refresh_url
 from old_prompts import (
     CSAT_SCORING_PROMPT, 
     COMPARISON_PROMPT, 
@@ -116,7 +120,10 @@ def run_dual_analysis(good_url, bad_url):
     path_good = download_audio(good_url, "good")
     path_bad = download_audio(bad_url, "bad")
     
-    if not path_good or not path_bad: return
+    if not path_good or not path_bad:
+        for p in [path_good, path_bad]:
+            if p and os.path.exists(p): os.remove(p)
+        return False
 
     gem_good = None
     gem_bad = None
@@ -143,6 +150,7 @@ def run_dual_analysis(good_url, bad_url):
         ]).text
 
         save_comparison_report(good_url, bad_url, csat_good, csat_bad, comparison_raw, t_good, t_bad)
+        return True
 
     finally:
         for p in [path_good, path_bad]:
@@ -150,7 +158,46 @@ def run_dual_analysis(good_url, bad_url):
         if gem_good: genai.delete_file(gem_good.name)
         if gem_bad: genai.delete_file(gem_bad.name)
 
+def resolve_recording(call_id, results_dir):
+    """Recording URL of a stored call, refreshed first when its signed token is (about to be) stale."""
+    call = {"call_id": call_id, "audio_url": load_result(call_id, results_dir)["url"]}
+    call["expires_at"] = url_expires_at(call["audio_url"])
+    if needs_refresh(call):
+        refresh_url(call, reason="expiring")
+    return call
+
+def run_queued_pairs(queue_file):
+    """
+    Runs run_dual_analysis for every pair queued by pairing.py that has not been
+    compared yet, and marks each one done so a re-run only pays for new pairs.
+    Recording URLs come from the stored results and are refreshed when stale.
+    """
+    pairs = pending_pairs(queue_file)
+    print(f"[INFO] {len(pairs)} pairs left in {queue_file}")
+    for n, pair in enumerate(pairs, 1):
+        print(f"[INFO] Pair {n}/{len(pairs)}: GOOD {pair['good_call']} vs BAD {pair['bad_call']} "
+              f"(decisive: {', '.join(pair['decisive_variables'][:3])})")
+        try:
+            good = resolve_recording(pair["good_call"], pair["results_dir"])
+            bad = resolve_recording(pair["bad_call"], pair["results_dir"])
+            done = run_dual_analysis(good["audio_url"], bad["audio_url"])
+            if not done:
+                # Either link may be the stale one, so ask for both before retrying
+                refreshed = [refresh_url(c, reason="download failed") for c in (good, bad)]
+                if any(refreshed):
+                    done = run_dual_analysis(good["audio_url"], bad["audio_url"])
+        except Exception as e:
+            print(f"[ERROR] Pair {n}: {e}")
+            continue
+        if done:
+            mark_pair_done(pair, queue_file)
+        else:
+            print(f"[SKIP] Pair {n}: recordings could not be downloaded; left in the queue")
+
 if __name__ == "__main__":
-    g_url = input("Enter GOOD Call URL: ").strip()
-    b_url = input("Enter BAD Call URL: ").strip()
-    run_dual_analysis(g_url, b_url)
\ No newline at end of file
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--queue":
+        run_queued_pairs(sys.argv[2] if len(sys.argv) == 3 else QUEUE_FILE)
+    else:
+        g_url = input("Enter GOOD Call URL: ").strip()
+        b_url = input("Enter BAD Call URL: ").strip()
+        run_dual_analysis(g_url, b_url)
\ No newline at end of file
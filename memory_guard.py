@@ -0,0 +1,96 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import gc
+import sys
+import time
+import resource
+import threading
+
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024) if hasattr(os, "sysconf") else None
+
+# =========================
+# RSS
+# =========================
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError, TypeError):
+        return None
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+# =========================
+# BACKPRESSURE
+# =========================
+
+class MemoryGuard:
+    """
+    Admission check for new calls against an RSS ceiling.
+    While RSS is above the ceiling no new call starts; running calls finish
+    and release their audio and transcripts first. With nothing in flight a
+    call is always admitted, so the run never stalls. Where RSS cannot be
+    measured (no /proc) the ceiling is not enforced, and that is reported.
+    Thread-safe.
+    """
+
+    def __init__(self, max_rss_mb=None):
+        self.max_rss_mb = max_rss_mb
+        self.throttled = 0         # Times a start was deferred
+        self.throttled_sec = 0.0   # Time spent with starts deferred
+        self.peak_seen_mb = 0.0
+        self._throttle_started = None
+        self._lock = threading.Lock()
+        self.enforced = max_rss_mb is not None and current_rss_mb() is not None
+        if max_rss_mb is not None and not self.enforced:
+            print(f"  [MEMORY] Cannot measure RSS on this platform (no /proc/self/statm) — "
+                  f"the {max_rss_mb} MB ceiling will not be enforced")
+
+    def admit(self, in_flight):
+        """True if a new call may start now with `in_flight` calls running."""
+        rss = current_rss_mb()
+        if rss is None:
+            return True
+        with self._lock:
+            self.peak_seen_mb = max(self.peak_seen_mb, rss)
+            if self.max_rss_mb is None or rss < self.max_rss_mb or in_flight == 0:
+                self._end_throttle()
+                return True
+
+        # Over the ceiling: reclaim what finished calls left behind before deciding
+        gc.collect()
+        rss = current_rss_mb()
+        with self._lock:
+            if rss < self.max_rss_mb:
+                self._end_throttle()
+                return True
+            if self._throttle_started is None:
+                self._throttle_started = time.time()
+                self.throttled += 1
+                print(f"  [MEMORY] RSS {rss:.0f} MB over {self.max_rss_mb} MB ceiling — "
+                      f"waiting for {in_flight} running calls before starting more")
+            return False
+
+    def _end_throttle(self):
+        if self._throttle_started is not None:
+            self.throttled_sec += time.time() - self._throttle_started
+            self._throttle_started = None
+
+    def report(self):
+        """Summary lines: peak RSS and how often the ceiling held back new calls."""
+        lines = [f"Peak RSS: {peak_rss_mb():.0f} MB"]
+        if self.max_rss_mb is not None:
+            if self.enforced:
+                lines.append(f"RSS ceiling: {self.max_rss_mb} MB, starts deferred {self.throttled} times "
+                             f"({self.throttled_sec:.0f}s)")
+            else:
+                lines.append(f"RSS ceiling: {self.max_rss_mb} MB, not enforced (RSS unavailable)")
+        return lines
@@ -0,0 +1,185 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import json
+import argparse
+import numpy as np
+
+from schema import CANONICAL_VARIABLES, STATUSES
+from scoring import EXCELLENT, MISSING, score_matrix, load_results_matrix
+from result_store import RESULTS_DIR
+from cohorts import compare_cohorts
+
+# =========================
+# CONFIGURATION
+# =========================
+
+NEIGHBOURS = 5                 # GOOD candidates considered per BAD call
+PAIRS_PER_BAD_CALL = 1         # Pairs queued per BAD call
+MAX_DIFFERENCES = 20           # Candidates differing in more variables than this teach little
+DECISIVE_VARIABLES = 15        # Largest GOOD/BAD-gap variables that make a pair instructive
+QUERY_CHUNK = 512              # BAD calls scored against the index per matrix multiply
+QUEUE_FILE = "output/comparison_queue.jsonl"
+DONE_SUFFIX = ".done"          # <queue file>.done lists compared pairs, one "bad_call<TAB>good_call" per line
+
+# =========================
+# NEAREST-NEIGHBOUR INDEX
+# =========================
+
+def one_hot(codes):
+    """
+    (n, 64) status codes -> (n, 64 * 4) float32 one-hot rows. Missing variables
+    are all-zero, so they never count as a match.
+    """
+    n, width = codes.shape
+    encoded = np.zeros((n, width, len(STATUSES)), dtype=np.float32)
+    rows, cols = np.nonzero(codes != MISSING)
+    encoded[rows, cols, codes[rows, cols]] = 1.0
+    return encoded.reshape(n, width * len(STATUSES))
+
+class VariableIndex:
+    """
+    In-memory nearest-neighbour index over call status vectors.
+    Distance is the number of variables whose status differs (Hamming), computed
+    as `variables - matches` where matches come from one matrix multiply of
+    one-hot rows, so queries are chunked BLAS calls rather than Python loops.
+    """
+
+    def __init__(self, codes):
+        self.codes = codes
+        self.vectors = one_hot(codes)
+
+    def nearest(self, query_codes, k=NEIGHBOURS):
+        """Returns (indices, distances), each (n_queries, k), nearest first."""
+        k = min(k, len(self.codes))
+        all_idx = np.empty((len(query_codes), k), dtype=np.int64)
+        all_dist = np.empty((len(query_codes), k), dtype=np.int64)
+
+        for start in range(0, len(query_codes), QUERY_CHUNK):
+            chunk = query_codes[start:start + QUERY_CHUNK]
+            matches = one_hot(chunk) @ self.vectors.T
+            dist = (self.codes.shape[1] - matches).round().astype(np.int64)
+
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+            part = np.take_along_axis(dist, idx, axis=1)
+            order = np.argsort(part, axis=1, kind="stable")
+            all_idx[start:start + len(chunk)] = np.take_along_axis(idx, order, axis=1)
+            all_dist[start:start + len(chunk)] = np.take_along_axis(part, order, axis=1)
+        return all_idx, all_dist
+
+# =========================
+# PAIR SELECTION
+# =========================
+
+def select_pairs(call_ids, codes):
+    """
+    For each BAD call, finds the most similar GOOD calls and keeps those whose
+    differences include decisive variables (largest GOOD/BAD gap) where the
+    GOOD call is Excellent and the BAD call is not.
+    Returns pairs sorted by fewest differences, each with the decisive variables.
+    """
+    call_type = score_matrix(codes)["call_type"]
+    good_rows = np.flatnonzero(call_type == "GOOD")
+    bad_rows = np.flatnonzero(call_type == "BAD")
+    if not len(good_rows) or not len(bad_rows):
+        return []
+
+    scored = call_type != "ERROR"
+    gaps = compare_cohorts(codes[scored], (call_type == "GOOD")[scored])
+    decisive = np.zeros(codes.shape[1], dtype=bool)
+    decisive[[CANONICAL_VARIABLES.index(r["variable"]) for r in gaps[:DECISIVE_VARIABLES]]] = True
+
+    index = VariableIndex(codes[good_rows])
+    neighbours, distances = index.nearest(codes[bad_rows])
+
+    # Decisive wins for every (BAD, candidate) pair at once: (n_bad, k, 64)
+    good_codes = codes[good_rows][neighbours]
+    bad_codes = codes[bad_rows][:, None, :]
+    wins = (good_codes == EXCELLENT) & (bad_codes != EXCELLENT) & decisive
+
+    pairs = []
+    for b, bad_row in enumerate(bad_rows):
+        kept = 0
+        for j in range(neighbours.shape[1]):
+            if kept >= PAIRS_PER_BAD_CALL or distances[b, j] > MAX_DIFFERENCES:
+                break
+            won = np.flatnonzero(wins[b, j])
+            if not len(won):
+                continue
+            good_row = good_rows[neighbours[b, j]]
+            pairs.append({
+                "bad_call": call_ids[bad_row],
+                "good_call": call_ids[good_row],
+                "differences": int(distances[b, j]),
+                "decisive_variables": [CANONICAL_VARIABLES[c] for c in won],
+            })
+            kept += 1
+    pairs.sort(key=lambda p: (p["differences"], -len(p["decisive_variables"])))
+    return pairs
+
+# =========================
+# COMPARISON QUEUE
+# =========================
+
+def pair_key(pair):
+    return str(pair["bad_call"]), str(pair["good_call"])
+
+def _done_keys(queue_file):
+    path = queue_file + DONE_SUFFIX
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {tuple(line.rstrip("\n").split("\t")) for line in f if line.strip()}
+
+def _queued(queue_file):
+    if not os.path.exists(queue_file):
+        return []
+    with open(queue_file, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def queue_pairs(pairs, queue_file=QUEUE_FILE, results_dir=RESULTS_DIR):
+    """
+    Appends pairs to the comparison queue consumed by `python main.py --queue`,
+    skipping pairs already queued or compared. Pairs hold call IDs (and the
+    results directory to look their recordings up in), not signed URLs, which
+    would have expired by the time the queue runs. Returns how many were added.
+    """
+    seen = _done_keys(queue_file) | {pair_key(p) for p in _queued(queue_file)}
+    added = 0
+    with open(queue_file, "a", encoding="utf-8") as f:
+        for pair in pairs:
+            if pair_key(pair) in seen:
+                continue
+            seen.add(pair_key(pair))
+            f.write(json.dumps({**pair, "results_dir": results_dir}, ensure_ascii=False, default=str) + "\n")
+            added += 1
+    return added
+
+def pending_pairs(queue_file=QUEUE_FILE):
+    """Queued pairs not yet marked done, in queue order."""
+    done = _done_keys(queue_file)
+    return [p for p in _queued(queue_file) if pair_key(p) not in done]
+
+def mark_pair_done(pair, queue_file=QUEUE_FILE):
+    with open(queue_file + DONE_SUFFIX, "a", encoding="utf-8") as f:
+        f.write("\t".join(pair_key(pair)) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick instructive GOOD/BAD pairs by nearest-neighbour matching.")
+    parser.add_argument("--results", default=RESULTS_DIR, help="Stored per-call results directory")
+    parser.add_argument("--queue", default=QUEUE_FILE, help="Comparison queue file to append pairs to")
+    parser.add_argument("--dry-run", action="store_true", help="Print the pairs without queueing them")
+    args = parser.parse_args()
+
+    call_ids, codes, _ = load_results_matrix(args.results)
+    pairs = select_pairs(call_ids, codes)
+    print(f"[PAIRS] {len(pairs)} pairs from {len(call_ids)} calls")
+    for pair in pairs[:10]:
+        print(f"  BAD {pair['bad_call']} ~ GOOD {pair['good_call']}: {pair['differences']} differences, "
+              f"decisive: {', '.join(pair['decisive_variables'][:4])}")
+    if pairs and not args.dry_run:
+        added = queue_pairs(pairs, args.queue, args.results)
+        print(f"[PAIRS] Queued {added} new pairs in {args.queue} ({len(pairs) - added} already queued or compared)")
@@ -0,0 +1,417 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import argparse
+import threading
+import numpy as np
+
+from result_store import RESULTS_DIR, iter_results
+from search_index import transcript_passages
+
+# =========================
+# CONFIGURATION
+# =========================
+
+DB_PATH = "output/phrases.db"          # Embedding cache + phrase library
+REPORT_FILE = "output/phrase_library.txt"
+EXPORT_FILE = "output/phrase_library.json"
+
+EMBEDDER = "vertex"                    # "vertex" (Vertex AI text embeddings) or "hashing" (local stub)
+EMBEDDING_MODEL = "text-embedding-004"
+PROJECT_ID = "mec-transcript"          # Vertex AI project/location, as in src.py
+LOCATION = "us-central1"
+EMBED_BATCH = 100                      # Utterances per embedding request
+EMBED_RETRIES = 3
+HASHING_DIM = 256                      # Vector size of the local hashing embedder
+
+MIN_WORDS = 4                          # Shorter agent lines ("Okay.", "Haan ji") carry no technique
+SIMILARITY = 0.82                      # Cosine similarity for an utterance to join a cluster
+LSH_BITS = 12                          # Random-hyperplane bits per hash table
+LSH_TABLES = 6                         # More tables = fewer missed neighbours, more candidates
+MIN_CLUSTER_CALLS = 3                  # Clusters seen in fewer calls are not ranked
+SMOOTHING_ALPHA = 1.0                  # Add-alpha pseudo-counts on each group's in/out counts (fixed-strength prior)
+TOP_CLUSTERS = 30                      # Clusters shown per direction in the report
+EXAMPLES_PER_CLUSTER = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key    TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clusters (
+    cluster_id INTEGER PRIMARY KEY,
+    centroid   BLOB NOT NULL,
+    size       INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS members (
+    cluster_id INTEGER NOT NULL,
+    call_id    TEXT NOT NULL,
+    text       TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS members_call ON members (call_id);
+CREATE INDEX IF NOT EXISTS members_cluster ON members (cluster_id);
+CREATE TABLE IF NOT EXISTS calls (
+    call_id   TEXT PRIMARY KEY,
+    call_type TEXT NOT NULL,
+    digest    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS library_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# =========================
+# EMBEDDERS
+# =========================
+
+class HashingEmbedder:
+    """
+    Local, deterministic stand-in for a real embedding model: hashed word and
+    character-trigram counts, L2-normalised. Needs no network, so tests and
+    dry runs exercise the whole pipeline; similar wording lands close together.
+    """
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            grams = words + [w[i:i + 3] for w in words for i in range(max(len(w) - 2, 1))]
+            for gram in grams:
+                vectors[row, zlib.crc32(gram.encode("utf-8")) % self.dim] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class VertexEmbedder:
+    """Vertex AI text embeddings (same project/location as the scoring pipeline)."""
+
+    def __init__(self, model_name=EMBEDDING_MODEL):
+        # Imported here so the stub embedder needs no GCP setup
+        import vertexai
+        from vertexai.language_models import TextEmbeddingModel
+
+        vertexai.init(project=PROJECT_ID, location=LOCATION)
+
+        self.model = TextEmbeddingModel.from_pretrained(model_name)
+        self.name = model_name
+
+    def embed(self, texts):
+        for attempt in range(1, EMBED_RETRIES + 1):
+            try:
+                response = self.model.get_embeddings(list(texts))
+                vectors = np.array([e.values for e in response], dtype=np.float32)
+                return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+            except Exception as e:
+                if attempt == EMBED_RETRIES:
+                    raise
+                print(f"  [RETRY] Embedding batch attempt {attempt} failed: {e}")
+                time.sleep(2 ** attempt)
+
+
+EMBEDDERS = {
+    "vertex": VertexEmbedder,
+    "hashing": HashingEmbedder,
+}
+
+def get_embedder(name=EMBEDDER):
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder {name!r}; choose from {sorted(EMBEDDERS)}")
+    return EMBEDDERS[name]()
+
+# =========================
+# APPROXIMATE NEAREST-NEIGHBOUR INDEX
+# =========================
+
+class LSHIndex:
+    """
+    Random-hyperplane LSH over unit vectors. Vectors whose signs agree on every
+    hyperplane of any table share a bucket; only bucket mates are compared
+    exactly, so assigning an utterance costs a few dot products, not one per cluster.
+    """
+
+    def __init__(self, dim, bits=LSH_BITS, tables=LSH_TABLES, seed=0):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.weights = 1 << np.arange(bits)
+        self.buckets = [{} for _ in range(tables)]
+        self.keys = {}          # item -> bucket key per table
+
+    def _keys(self, vector):
+        return tuple(int(k) for k in ((self.planes @ vector) > 0) @ self.weights)
+
+    def add(self, item, vector):
+        self.remove(item)
+        keys = self._keys(vector)
+        for table, key in zip(self.buckets, keys):
+            table.setdefault(key, set()).add(item)
+        self.keys[item] = keys
+
+    def remove(self, item):
+        for table, key in zip(self.buckets, self.keys.pop(item, ())):
+            table[key].discard(item)
+
+    def candidates(self, vector):
+        found = set()
+        for table, key in zip(self.buckets, self._keys(vector)):
+            found |= table.get(key, set())
+        return found
+
+# =========================
+# PHRASE LIBRARY
+# =========================
+
+def agent_utterances(transcript):
+    """Distinct agent lines of one call worth mining (normalised text)."""
+    seen = {}
+    for speaker, _, text in transcript_passages(transcript):
+        text = re.sub(r"\s+", " ", text).strip()
+        if speaker == "Agent" and len(text.split()) >= MIN_WORDS:
+            seen.setdefault(text.lower(), text)
+    return list(seen.values())
+
+
+class PhraseLibrary:
+    """
+    Persistent clusters of similar agent utterances with the calls they occur in.
+    Embeddings are cached by (model, text), so each distinct utterance is embedded
+    once. Calls are added incrementally: an unchanged call is skipped, and a
+    re-scored call has its old memberships replaced. Lift is computed from
+    current call labels, so a call that changes GOOD <-> BAD re-ranks at once.
+    """
+
+    def __init__(self, embedder, path=DB_PATH):
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(_SCHEMA)
+
+        model = self._db.execute("SELECT value FROM library_meta WHERE key = 'embedder'").fetchone()
+        if model and model[0] != embedder.name:
+            raise ValueError(f"{path} was built with embedder {model[0]!r}, not {embedder.name!r}; "
+                             f"use another --db or delete it")
+        self._db.execute("INSERT OR REPLACE INTO library_meta VALUES ('embedder', ?)", (embedder.name,))
+
+        self.centroids = {}
+        self.sizes = {}
+        self.index = None
+        for cluster_id, blob, size in self._db.execute("SELECT cluster_id, centroid, size FROM clusters"):
+            self._track(cluster_id, np.frombuffer(blob, dtype=np.float32).copy(), size)
+
+    def _track(self, cluster_id, centroid, size):
+        if self.index is None:
+            self.index = LSHIndex(len(centroid))
+        self.centroids[cluster_id] = centroid
+        self.sizes[cluster_id] = size
+        self.index.add(cluster_id, centroid / max(np.linalg.norm(centroid), 1e-9))
+
+    # ---- Embedding cache ----
+
+    def _cache_key(self, text):
+        return hashlib.sha1(f"{self.embedder.name}\n{text.lower()}".encode("utf-8")).hexdigest()
+
+    def embed(self, texts):
+        """Vectors for texts, embedding only those not in the cache (in EMBED_BATCH batches)."""
+        keys = [self._cache_key(t) for t in texts]
+        cached = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            cached.update({key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows})
+
+        missing = list({key: text for key, text in zip(keys, texts) if key not in cached}.items())
+        for start in range(0, len(missing), EMBED_BATCH):
+            batch = missing[start:start + EMBED_BATCH]
+            vectors = self.embedder.embed([text for _, text in batch])
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                                 [(key, vec.astype(np.float32).tobytes()) for (key, _), vec in zip(batch, vectors)])
+            cached.update({key: vec.astype(np.float32) for (key, _), vec in zip(batch, vectors)})
+        return [cached[key] for key in keys], len(missing)
+
+    # ---- Clustering ----
+
+    def _assign(self, vector):
+        """Cluster ID for one unit vector: best LSH candidate above SIMILARITY, else a new cluster."""
+        best, best_sim = None, SIMILARITY
+        if self.index is not None:
+            for cluster_id in self.index.candidates(vector):
+                centroid = self.centroids[cluster_id]
+                sim = float(centroid @ vector) / max(float(np.linalg.norm(centroid)), 1e-9)
+                if sim >= best_sim:
+                    best, best_sim = cluster_id, sim
+
+        if best is None:
+            best = self._db.execute("INSERT INTO clusters (centroid, size) VALUES (?, 1)",
+                                    (vector.tobytes(),)).lastrowid
+            self._track(best, vector.copy(), 1)
+            return best
+
+        # Running mean; the centroid is re-hashed so the index follows it
+        size = self.sizes[best] + 1
+        centroid = self.centroids[best] + (vector - self.centroids[best]) / size
+        self._track(best, centroid, size)
+        return best
+
+    def add_call(self, call_id, call_type, transcript):
+        """Adds or refreshes one call. Returns (utterances added, utterances embedded) or None if unchanged."""
+        call_id = str(call_id)
+        utterances = agent_utterances(transcript)
+        digest = hashlib.sha1("\n".join(utterances).encode("utf-8")).hexdigest()
+
+        with self._lock:
+            old = self._db.execute("SELECT call_type, digest FROM calls WHERE call_id = ?", (call_id,)).fetchone()
+            if old and old[1] == digest:
+                if old[0] != call_type:
+                    self._db.execute("UPDATE calls SET call_type = ? WHERE call_id = ?", (call_type, call_id))
+                return None
+
+            vectors, embedded = self.embed(utterances)
+            self._db.execute("BEGIN")
+            try:
+                if old:
+                    # Memberships are replaced; centroids keep the old contribution (they only steer assignment)
+                    self._db.execute("DELETE FROM members WHERE call_id = ?", (call_id,))
+                rows = [(self._assign(vec), call_id, text) for text, vec in zip(utterances, vectors)]
+                self._db.executemany("INSERT INTO members VALUES (?, ?, ?)", rows)
+                self._db.executemany("UPDATE clusters SET centroid = ?, size = ? WHERE cluster_id = ?",
+                                     [(self.centroids[c].tobytes(), self.sizes[c], c) for c in {r[0] for r in rows}])
+                self._db.execute("INSERT OR REPLACE INTO calls VALUES (?, ?, ?)", (call_id, call_type, digest))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(rows), embedded
+
+    # ---- Ranking ----
+
+    def ranked_clusters(self, min_calls=MIN_CLUSTER_CALLS):
+        """
+        Clusters ranked by lift = P(cluster in call | GOOD) / P(cluster in call | BAD).
+        Both rates use add-alpha smoothing, (count + SMOOTHING_ALPHA) / (total + 2 * SMOOTHING_ALPHA),
+        so a cluster never seen in one group gets a finite lift that still grows with
+        how often it was seen in the other. Each row: cluster_id, good_calls, bad_calls, lift, examples.
+        """
+        with self._lock:
+            totals = dict(self._db.execute(
+                "SELECT call_type, COUNT(*) FROM calls WHERE call_type IN ('GOOD', 'BAD') GROUP BY call_type"
+            ).fetchall())
+            counts = self._db.execute(
+                "SELECT m.cluster_id, "
+                "COUNT(DISTINCT CASE WHEN c.call_type = 'GOOD' THEN m.call_id END), "
+                "COUNT(DISTINCT CASE WHEN c.call_type = 'BAD' THEN m.call_id END) "
+                "FROM members m JOIN calls c ON c.call_id = m.call_id GROUP BY m.cluster_id"
+            ).fetchall()
+        good_total, bad_total = totals.get("GOOD", 0), totals.get("BAD", 0)
+
+        rows = []
+        for cluster_id, good, bad in counts:
+            if good + bad < min_calls:
+                continue
+            good_rate = (good + SMOOTHING_ALPHA) / (good_total + 2 * SMOOTHING_ALPHA)
+            bad_rate = (bad + SMOOTHING_ALPHA) / (bad_total + 2 * SMOOTHING_ALPHA)
+            lift = good_rate / bad_rate
+            rows.append({"cluster_id": cluster_id, "good_calls": good, "bad_calls": bad, "lift": round(lift, 3)})
+        rows.sort(key=lambda r: (-r["lift"], -r["good_calls"]))
+
+        for row in rows[:TOP_CLUSTERS] + rows[-TOP_CLUSTERS:]:
+            if "examples" not in row:
+                row["examples"] = self.examples(row["cluster_id"])
+        return rows, good_total, bad_total
+
+    def examples(self, cluster_id, n=EXAMPLES_PER_CLUSTER):
+        """Most frequent member texts of a cluster."""
+        with self._lock:
+            return [text for text, _ in self._db.execute(
+                "SELECT text, COUNT(*) AS n FROM members WHERE cluster_id = ? "
+                "GROUP BY lower(text) ORDER BY n DESC, length(text) LIMIT ?", (cluster_id, n)
+            )]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# =========================
+# PIPELINE
+# =========================
+
+def update_library(results_dir=RESULTS_DIR, embedder=None, db_path=DB_PATH,
+                   report_file=REPORT_FILE, export_file=EXPORT_FILE):
+    """
+    Adds every new or changed stored call to the phrase library, then rewrites
+    the ranked report and JSON export. Safe to run after every batch run.
+    """
+    embedder = embedder or get_embedder()
+    library = PhraseLibrary(embedder, db_path)
+    start = time.perf_counter()
+    added = skipped = utterances = embedded = 0
+
+    for r in iter_results(results_dir):
+        call_type = r.get("summary", {}).get("call_type", "ERROR")
+        outcome = library.add_call(r.get("call_id", r["index"]), call_type, r.get("transcript", ""))
+        if outcome is None:
+            skipped += 1
+            continue
+        added += 1
+        utterances += outcome[0]
+        embedded += outcome[1]
+
+    print(f"[PHRASES] {added} calls added ({utterances} agent utterances, {embedded} newly embedded), "
+          f"{skipped} unchanged, {len(library.sizes)} clusters in {time.perf_counter() - start:.1f}s")
+    rows, good_total, bad_total = library.ranked_clusters()
+    write_report(rows, good_total, bad_total, report_file, export_file)
+    library.close()
+    return rows
+
+
+def write_report(rows, good_total, bad_total, report_file=REPORT_FILE, export_file=EXPORT_FILE):
+    winning = [r for r in rows[:TOP_CLUSTERS] if r["lift"] > 1]
+    losing = [r for r in reversed(rows[-TOP_CLUSTERS:]) if r["lift"] < 1]
+
+    lines = [
+        f"{'='*84}",
+        "PHRASE LIBRARY: AGENT PHRASE CLUSTERS BY LIFT (GOOD vs BAD)",
+        f"{'='*84}",
+        f"GOOD calls : {good_total}",
+        f"BAD calls  : {bad_total}",
+        f"Clusters   : {len(rows)} seen in at least {MIN_CLUSTER_CALLS} calls",
+    ]
+    for title, group in (("WINNING PHRASES (more common in GOOD calls)", winning),
+                         ("LOSING PHRASES (more common in BAD calls)", losing)):
+        lines += ["", f"--- {title} ---"]
+        for r in group:
+            lines.append(f"[lift {r['lift']:.2f}] GOOD {r['good_calls']}/{good_total}, BAD {r['bad_calls']}/{bad_total}")
+            lines += [f'    "{text}"' for text in r["examples"]]
+        if not group:
+            lines.append("(none)")
+
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    with open(export_file, "w", encoding="utf-8") as f:
+        json.dump({"good_calls": good_total, "bad_calls": bad_total, "winning": winning, "losing": losing},
+                  f, ensure_ascii=False, indent=2)
+    print(f"[PHRASES] {len(winning)} winning / {len(losing)} losing clusters saved to {report_file} and {export_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mine agent phrases that separate GOOD from BAD calls.")
+    parser.add_argument("--results", default=RESULTS_DIR, help="Stored per-call results directory")
+    parser.add_argument("--embedder", default=EMBEDDER, choices=sorted(EMBEDDERS))
+    parser.add_argument("--db", default=DB_PATH, help="Embedding cache and phrase library")
+    parser.add_argument("--out", default=REPORT_FILE)
+    parser.add_argument("--export", default=EXPORT_FILE)
+    args = parser.parse_args()
+
+    update_library(args.results, get_embedder(args.embedder), args.db, args.out, args.export)
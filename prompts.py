@@ -349,4 +349,68 @@ VARIABLE LIST:
   "Willingness for Deep Dive",
   "Agreement to Next Steps"
 ]
-"""
\ No newline at end of file
+"""
+# =========================
+# LONG-CALL SEGMENT NOTE
+# =========================
+
+LONG_CALL_SEGMENT_NOTE = """
+NOTE: This audio is segment {segment} of {total} of a longer call (starting at {start}).
+- It may begin or end in the middle of a sentence. Transcribe partial sentences as heard.
+- Keep the same roles as the full call: the Agent is the company representative, the Customer is the other person.
+"""
+
+# =========================
+# VARIABLE EXTRACTION PROMPT (STRUCTURED JSON)
+# =========================
+
+EXTRACT_STRUCTURED_PROMPT = """
+You are a strict call quality evaluation engine.
+
+TASK:
+Evaluate ALL variables in the response schema based ONLY on the transcript.
+
+OUTPUT:
+Return a JSON object matching the response schema exactly: one key per variable,
+each with a "status" and an "evidence" field. No other text.
+
+RULES (NON-NEGOTIABLE):
+- Every variable MUST be present
+- status MUST be one of: Excellent | Moderate | Needs Improvement | Not Present
+- If there is NO clear evidence → evidence = "NA"
+- evidence must be a short direct quote (max 10 words)
+- Do NOT invent evidence
+"""
+
+# =========================
+# COHORT COMPARISON SUMMARY PROMPT
+# =========================
+
+COHORT_SUMMARY_PROMPT = """
+You are a sales coaching analyst. Below are aggregated results from {good_calls} GOOD calls
+and {bad_calls} BAD calls, already scored variable by variable. You are NOT given any audio or
+transcripts — work only from these numbers and quotes.
+
+[VARIABLE_DIFFERENCES]
+Variable | GOOD Excellent % | BAD Excellent % | GOOD Not Present % | BAD Not Present % | Gap
+{differences}
+
+[GOOD_CALL_PHRASES]
+Variable | Most frequent evidence quotes in GOOD calls (count)
+{phrases}
+
+TASK:
+[TABLE_DATA]
+For the 10 variables with the largest gap, write: Variable | GOOD Agent Pattern | BAD Agent Pattern
+(one short sentence each, grounded in the numbers and quotes above).
+
+[MISSING_ELEMENTS]
+List 5 systemic failures of the BAD group, most costly first.
+
+[WINNING_PHRASES]
+List 5 phrases from the GOOD call quotes that BAD agents should adopt, each with the variable it drives.
+
+RULES:
+- Use only the data above. Do NOT invent statistics or quotes.
+- Keep each line under 25 words.
+"""
@@ -0,0 +1,241 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+from collections import Counter
+
+# =========================
+# THRESHOLDS
+# =========================
+
+MIN_TRANSCRIPT_CHARS = 20      # Shorter than this = EMPTY_TRANSCRIPT
+NGRAM_SIZE = 4                 # Word n-gram length used for loop detection
+
+REPEAT_WORD_RATIO = 0.5        # One word covering more than this share of all words
+REPEAT_WORD_MIN_WORDS = 20
+REPEAT_NGRAM_RATIO = 0.5       # Share of n-grams that repeat an earlier n-gram
+REPEAT_NGRAM_MIN = 100         # n-grams needed before the n-gram ratio is judged
+MAX_IDENTICAL_LINE_RUN = 6     # Consecutive identical lines
+MAX_CHARS_PER_SECOND = 40      # Speech rarely exceeds ~20 chars/sec of transcript
+LABEL_MIN_CHARS = 1500         # Partial text this long must already contain a speaker label
+STREAM_MIN_WORDS = 200         # Partial transcripts are not judged on word/n-gram ratios before this
+
+SPEAKER_RE = re.compile(r"^\s*\**\s*(agent|customer)\s*\**\s*:", re.IGNORECASE)
+
+# =========================
+# ANALYZER
+# =========================
+
+class TranscriptQualityAnalyzer:
+    """
+    Single-pass transcript quality analyzer.
+
+    Text is fed in arbitrary chunks (streamed output or a whole transcript);
+    each complete line is processed once, so total work is linear in the
+    transcript length. scores() and check() can be called at any point, so
+    the same analyzer serves partial (streaming) and complete transcripts.
+
+    feed() returns an abort reason for streaming use, or None to continue;
+    that partial check only reads running totals, so it is O(1) per chunk.
+    """
+
+    def __init__(self, duration_sec=None):
+        self.duration_sec = duration_sec
+
+        self.chars = 0
+        self.content_chars = 0
+        self.lines = 0
+        self.words = 0
+        self.word_counts = Counter()
+        self.top_word = None
+        self.top_word_count = 0
+
+        self.ngram_tail = []            # Last NGRAM_SIZE - 1 words, so n-grams span lines
+        self.ngram_counts = Counter()
+        self.ngrams = 0
+
+        self.last_line = None
+        self.line_run = 0
+        self.longest_line_run = 0
+        self.longest_run_line = None
+
+        self.speaker_lines = {"Agent": 0, "Customer": 0}
+        self.speaker_words = {"Agent": 0, "Customer": 0}
+        self.turns = 0
+        self._last_speaker = None
+
+        self._carry = ""
+
+    # ---------------------------------------------------------
+    # Feeding
+    # ---------------------------------------------------------
+
+    def feed(self, text):
+        """Consumes a chunk of text. Returns an abort reason (partial check) or None."""
+        self.chars += len(text)
+        lines = (self._carry + text).split("\n")
+        self._carry = lines.pop()
+        if lines:
+            self._process_lines(lines)
+        return self._abort_reason()
+
+    def finish(self):
+        """Processes any trailing partial line. Call once the full transcript has been fed."""
+        if self._carry:
+            self._process_lines([self._carry])
+            self._carry = ""
+        return self
+
+    def _process_lines(self, lines):
+        """Updates all running totals with complete lines (one counter update per call)."""
+        chunk_words = []
+        speaker_lines = self.speaker_lines
+        speaker_words = self.speaker_words
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            self.lines += 1
+            self.content_chars += len(line)
+
+            # Identical-line runs
+            if line == self.last_line:
+                self.line_run += 1
+                if self.line_run > self.longest_line_run:
+                    self.longest_line_run = self.line_run
+                    self.longest_run_line = line
+            else:
+                self.last_line = line
+                self.line_run = 1
+                if not self.longest_line_run:
+                    self.longest_line_run = 1
+                    self.longest_run_line = line
+
+            # Speaker label and turns
+            match = SPEAKER_RE.match(line)
+            if match:
+                speaker = match.group(1).capitalize()
+                line = line[match.end():]
+                speaker_lines[speaker] += 1
+                if speaker != self._last_speaker:
+                    self.turns += 1
+                    self._last_speaker = speaker
+            else:
+                speaker = self._last_speaker
+
+            words = line.split()
+            if speaker:
+                speaker_words[speaker] += len(words)
+            chunk_words.extend(words)
+
+        if not chunk_words:
+            return
+        self.words += len(chunk_words)
+
+        # Counter.update runs in C; only words seen in this chunk can have become the top word
+        word_counts = self.word_counts
+        word_counts.update(chunk_words)
+        top = max(chunk_words, key=word_counts.__getitem__)
+        if word_counts[top] > self.top_word_count:
+            self.top_word, self.top_word_count = top, word_counts[top]
+
+        # n-grams continue across line (and chunk) boundaries
+        seq = self.ngram_tail + chunk_words
+        grams = list(zip(*(seq[i:] for i in range(NGRAM_SIZE))))
+        self.ngram_counts.update(grams)
+        self.ngrams += len(grams)
+        self.ngram_tail = seq[-(NGRAM_SIZE - 1):]
+
+    # ---------------------------------------------------------
+    # Results
+    # ---------------------------------------------------------
+
+    @property
+    def repeated_ngrams(self):
+        # Every occurrence after an n-gram's first is a repeat
+        return self.ngrams - len(self.ngram_counts)
+
+    def _abort_reason(self):
+        """Cheap partial check run after every streamed chunk (no scans over the counters)."""
+        if self.words > STREAM_MIN_WORDS and self.top_word_count / self.words > REPEAT_WORD_RATIO:
+            return f"HALLUCINATED_REPEAT ('{self.top_word}' repeated {self.top_word_count}/{self.words} times)"
+        if self.ngrams >= max(REPEAT_NGRAM_MIN, STREAM_MIN_WORDS) and self.repeated_ngrams / self.ngrams > REPEAT_NGRAM_RATIO:
+            return f"HALLUCINATED_LOOP ({self.repeated_ngrams / self.ngrams:.0%} of {NGRAM_SIZE}-grams repeated)"
+        if self.longest_line_run > MAX_IDENTICAL_LINE_RUN:
+            return f"REPEATED_LINES ('{self.longest_run_line[:60]}' {self.longest_line_run} times in a row)"
+        if self.duration_sec and self.chars / self.duration_sec > MAX_CHARS_PER_SECOND:
+            return f"TOO_DENSE ({self.chars / self.duration_sec:.1f} chars per audio-second)"
+        if self.chars >= LABEL_MIN_CHARS and not (self.speaker_lines["Agent"] or self.speaker_lines["Customer"]):
+            return "NO_DIARIZATION (no Agent:/Customer: labels found)"
+        return None
+
+    def scores(self):
+        """Returns the structured quality scores computed so far."""
+        labelled_words = self.speaker_words["Agent"] + self.speaker_words["Customer"]
+        agent_share = round(self.speaker_words["Agent"] / labelled_words, 3) if labelled_words else None
+        top_ngram, top_ngram_count = (self.ngram_counts.most_common(1) or [((), 0)])[0]
+
+        return {
+            "chars": self.chars,
+            "lines": self.lines,
+            "words": self.words,
+            "top_word": self.top_word,
+            "top_word_ratio": round(self.top_word_count / self.words, 3) if self.words else 0.0,
+            "repeated_ngram_ratio": round(self.repeated_ngrams / self.ngrams, 3) if self.ngrams else 0.0,
+            "top_ngram": " ".join(top_ngram) or None,
+            "top_ngram_count": top_ngram_count,
+            "longest_identical_line_run": self.longest_line_run,
+            "agent_lines": self.speaker_lines["Agent"],
+            "customer_lines": self.speaker_lines["Customer"],
+            "agent_word_share": agent_share,
+            "speaker_turns": self.turns,
+            "chars_per_second": round(self.chars / self.duration_sec, 2) if self.duration_sec else None,
+        }
+
+    def check(self, partial=False):
+        """
+        Evaluates the scores against the thresholds.
+        Returns {"is_good", "reasons", "scores"}. With partial=True, checks that
+        need the whole transcript (empty text, final diarization) are relaxed.
+        """
+        s = self.scores()
+        reasons = []
+
+        if not partial and self.content_chars < MIN_TRANSCRIPT_CHARS:
+            return {"is_good": False, "reasons": ["EMPTY_TRANSCRIPT"], "scores": s}
+
+        min_words = STREAM_MIN_WORDS if partial else REPEAT_WORD_MIN_WORDS
+        if self.words > min_words and s["top_word_ratio"] > REPEAT_WORD_RATIO:
+            reasons.append(
+                f"HALLUCINATED_REPEAT ('{self.top_word}' repeated {self.top_word_count}/{self.words} times)"
+            )
+
+        if self.ngrams >= REPEAT_NGRAM_MIN and s["repeated_ngram_ratio"] > REPEAT_NGRAM_RATIO:
+            reasons.append(
+                f"HALLUCINATED_LOOP ({s['repeated_ngram_ratio']:.0%} of {NGRAM_SIZE}-grams repeated, "
+                f"top: '{s['top_ngram']}' x{s['top_ngram_count']})"
+            )
+
+        if self.longest_line_run > MAX_IDENTICAL_LINE_RUN:
+            reasons.append(
+                f"REPEATED_LINES ('{self.longest_run_line[:60]}' {self.longest_line_run} times in a row)"
+            )
+
+        if s["chars_per_second"] and s["chars_per_second"] > MAX_CHARS_PER_SECOND:
+            # Partial text only ever grows, so exceeding the rate early is already conclusive
+            reasons.append(f"TOO_DENSE ({s['chars_per_second']} chars per audio-second)")
+
+        labelled = s["agent_lines"] + s["customer_lines"]
+        if labelled == 0 and (not partial or self.chars >= LABEL_MIN_CHARS):
+            reasons.append("NO_DIARIZATION (no Agent:/Customer: labels found)")
+
+        return {"is_good": not reasons, "reasons": reasons, "scores": s}
+
+
+def analyze_transcript(transcript, duration_sec=None):
+    """Analyzes a complete transcript. Returns {"is_good", "reasons", "scores"}."""
+    analyzer = TranscriptQualityAnalyzer(duration_sec=duration_sec)
+    analyzer.feed(transcript or "")
+    return analyzer.finish().check()
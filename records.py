@@ -0,0 +1,177 @@
+# =========================
+# IMPORTS
+# =========================
+
+import sys
+from array import array
+from enum import IntEnum
+from dataclasses import dataclass, field
+
+from schema import CANONICAL_VARIABLES, VARIABLE_INDEX, STATUSES
+from result_store import RESULTS_DIR, iter_results
+
+# =========================
+# STATUS CODES
+# =========================
+
+class Status(IntEnum):
+    """Variable status as a small code (same codes as scoring's matrix cells)."""
+    MISSING = -1
+    EXCELLENT = 0
+    MODERATE = 1
+    NEEDS_IMPROVEMENT = 2
+    NOT_PRESENT = 3
+
+    @property
+    def label(self):
+        return STATUSES[self] if self >= 0 else None
+
+STATUS_BY_LABEL = {label: Status(code) for code, label in enumerate(STATUSES)}
+CALL_TYPES = {name: sys.intern(name) for name in ("GOOD", "BAD", "ERROR")}
+
+_NO_CODES = array("b", [Status.MISSING]) * len(CANONICAL_VARIABLES)
+_NO_COUNTS = (0,) * len(STATUSES)
+
+# =========================
+# RECORDS
+# =========================
+
+@dataclass(slots=True)
+class Summary:
+    """A call's score summary; counts are per status, in STATUSES order."""
+    counts: tuple
+    excellent_percentage: float
+    call_type: str
+    total_possible: int
+    considered: int
+    grade: dict = None
+
+    @classmethod
+    def error(cls):
+        return cls(_NO_COUNTS, 0, CALL_TYPES["ERROR"], 0, 0)
+
+    @classmethod
+    def from_dict(cls, d):
+        counts = d.get("counts") or {}
+        return cls(
+            counts=tuple(counts.get(label, 0) for label in STATUSES),
+            excellent_percentage=d.get("excellent_percentage", 0),
+            call_type=CALL_TYPES.get(d.get("call_type"), d.get("call_type")),
+            total_possible=d.get("total_possible", 0),
+            considered=d.get("considered", 0),
+            grade=d.get("grade"),
+        )
+
+    def to_dict(self):
+        d = {
+            "counts": {label: n for label, n in zip(STATUSES, self.counts) if n},
+            "excellent_percentage": self.excellent_percentage,
+            "call_type": self.call_type,
+            "total_possible": self.total_possible,
+            "considered": self.considered,
+        }
+        if self.grade is not None:
+            d["grade"] = self.grade
+        return d
+
+
+@dataclass(slots=True)
+class CallResult:
+    """
+    One call's result. Variable statuses are an int8 array of Status codes in
+    canonical variable order (MISSING where not extracted) and evidence a tuple
+    in the same order, so a call holds two containers instead of 64 row dicts.
+    to_dict() gives the result dict the writers and result_store expect.
+    """
+    index: object
+    call_id: str
+    url: str
+    timestamp: str
+    transcript: str
+    summary: Summary
+    statuses: array = field(default_factory=lambda: array("b", _NO_CODES))
+    evidence: tuple = ()
+    error: str = None
+    is_complete: bool = False
+    meta: dict = field(default_factory=dict)
+    usage: dict = field(default_factory=dict)
+    audio: dict = field(default_factory=dict)
+    quality: dict = field(default_factory=dict)
+    parse: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_call(cls, call, timestamp, transcript, variables, summary, **fields):
+        """Record for a scored call; `variables` are parser rows, `summary` a compute_summary dict."""
+        statuses, evidence = encode_variables(variables)
+        return cls(call["index"], call["call_id"], call["audio_url"], timestamp, transcript,
+                   Summary.from_dict(summary), statuses, evidence, meta=call.get("meta", {}), **fields)
+
+    @classmethod
+    def failed(cls, call, timestamp, transcript, error, **fields):
+        """ERROR record for a call that produced no variables."""
+        return cls(call["index"], call["call_id"], call["audio_url"], timestamp, transcript,
+                   Summary.error(), error=error, meta=call.get("meta", {}), **fields)
+
+    @property
+    def variable_count(self):
+        return sum(1 for code in self.statuses if code != Status.MISSING)
+
+    @property
+    def variables(self):
+        """Variable rows ({"variable", "status", "evidence"}) in canonical order."""
+        return [{"variable": CANONICAL_VARIABLES[col], "status": STATUSES[code], "evidence": self.evidence[col]}
+                for col, code in enumerate(self.statuses) if code != Status.MISSING]
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "call_id": self.call_id,
+            "url": self.url,
+            "timestamp": self.timestamp,
+            "transcript": self.transcript,
+            "variables": self.variables,
+            "summary": self.summary.to_dict(),
+            "error": self.error,
+            "is_complete": self.is_complete,
+            "meta": self.meta,
+            "usage": self.usage,
+            "audio": self.audio,
+            "quality": self.quality,
+            "parse": self.parse,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """Record from a stored result dict; rows with unknown variables or statuses are dropped."""
+        statuses, evidence = encode_variables(d.get("variables") or [])
+        return cls(
+            index=d["index"], call_id=d.get("call_id", d["index"]), url=d.get("url"),
+            timestamp=d.get("timestamp"), transcript=d.get("transcript", ""),
+            summary=Summary.from_dict(d.get("summary") or {}), statuses=statuses, evidence=evidence,
+            error=d.get("error"), is_complete=d.get("is_complete", False), meta=d.get("meta") or {},
+            usage=d.get("usage") or {}, audio=d.get("audio") or {}, quality=d.get("quality") or {},
+            parse=d.get("parse") or {},
+        )
+
+# =========================
+# ENCODING
+# =========================
+
+def encode_variables(variables):
+    """Parser rows -> (int8 status codes, evidence tuple), both in canonical variable order."""
+    statuses = array("b", _NO_CODES)
+    if not variables:
+        return statuses, ()
+    evidence = [None] * len(CANONICAL_VARIABLES)
+    for v in variables:
+        col = VARIABLE_INDEX.get(v["variable"])
+        code = STATUS_BY_LABEL.get(v["status"])
+        if col is not None and code is not None:
+            statuses[col] = code
+            evidence[col] = v.get("evidence")
+    return statuses, tuple(evidence)
+
+def iter_records(results_dir=RESULTS_DIR):
+    """Yields stored results (result_store) as CallResult records, one at a time."""
+    for d in iter_results(results_dir):
+        yield CallResult.from_dict(d)
@@ -0,0 +1,414 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import hashlib
+import inspect
+import argparse
+import tempfile
+
+from schema import CANONICAL_VARIABLES
+from usage import empty_usage, add_usage
+from result_store import RESULTS_DIR, iter_stored, result_path
+
+# =========================
+# CONFIGURATION
+# =========================
+
+OUTPUT_DIR = "output"
+RENDER_CACHE_DIR = "output/rendered"     # Rendered per-call fragments + manifest
+MANIFEST_FILE = "manifest.db"            # SQLite: template hashes and one row per rendered call
+LEGACY_MANIFEST_FILE = "manifest.json"   # Older whole-file manifest, replaced on first run
+PRUNE_BATCH = 1000                       # Manifest rows checked per batch when dropping deleted calls
+REPORT_FILES = {                         # Same file names src.py writes during a run
+    "summary": "summary_reportcalls.txt",
+    "transcripts": "call_transcripts.txt",
+    "stats": "summary_stats.txt",
+}
+EXPECTED_VARIABLES = len(CANONICAL_VARIABLES)
+MAX_LISTED_CALLS = 100                   # ERROR / incomplete calls listed individually in the run summary
+
+# =========================
+# PER-CALL TEMPLATES
+# =========================
+
+def render_transcript(r):
+    """Renders one call's block of the transcripts file."""
+    lines = [
+        f"{'#'*40}",
+        f"CALL INDEX: {r['index']}",
+        f"{'#'*40}",
+        "CALL METADATA",
+        "==========================",
+        f"Call ID    : {r.get('call_id', r['index'])}",
+        f"Timestamp  : {r['timestamp']}",
+        f"Audio URL  : {r['url']}",
+        f"Result     : {r['summary']['call_type']} ({r['summary']['excellent_percentage']}%)",
+    ]
+    if r.get("error"):
+        lines.append(f"Error      : {r['error']}")
+    lines += [
+        "==========================",
+        "",
+        "TRANSCRIPT",
+        "--------------------------",
+    ]
+    return (
+        "\n".join(lines) + "\n" + r['transcript']
+        + f"\n--------------------------\nEnd of Transcript for Call {r['index']}\n\n{'='*80}\n\n"
+    )
+
+def render_summary_report(r):
+    """Renders one call's block of the summary report."""
+    lines = [
+        "",
+        f"{'='*80}",
+        f"CALL {r['index']} ANALYSIS REPORT",
+        f"{'='*80}",
+        f"Call ID    : {r.get('call_id', r['index'])}",
+        f"Time (IST) : {r['timestamp']}",
+        f"URL        : {r['url']}",
+        f"Result     : {r['summary']['call_type']} ({r['summary']['excellent_percentage']}%)",
+    ]
+    if r.get("error"):
+        lines.append(f"Error      : {r['error']}")
+    meta = {field: value for field, value in (r.get("meta") or {}).items() if value}
+    if meta:
+        lines.append(f"Call Meta  : {', '.join(f'{field}={value}' for field, value in meta.items())}")
+    audio = r.get("audio")
+    if audio and audio.get("original_sec") is not None:
+        lines.append(f"Audio      : {audio['original_sec']}s -> {audio['processed_sec']}s "
+                     f"({audio['original_bytes']} -> {audio['processed_bytes']} bytes, {audio['status']})")
+    quality = r.get("quality")
+    if quality:
+        lines.append(f"Quality    : top word {quality['top_word_ratio']:.0%}, "
+                     f"repeated {quality['repeated_ngram_ratio']:.0%} of n-grams, "
+                     f"max line run {quality['longest_identical_line_run']}, "
+                     f"agent share {quality['agent_word_share']}")
+    total_usage = r.get("usage", {}).get("total")
+    if total_usage:
+        lines.append(f"Tokens     : {total_usage['total_tokens']} "
+                     f"(prompt {total_usage['prompt_tokens']}, audio {total_usage['audio_tokens']}, "
+                     f"output {total_usage['output_tokens']}, thinking {total_usage.get('thinking_tokens', 0)}) "
+                     f"~${total_usage['cost_usd']:.4f}")
+    lines.append("")
+
+    header = f"| {'Variable':<40} | {'Status':<20} | {'Evidence'} |"
+    divider = f"|{'-'*42}|{'-'*22}|{'-'*50}|"
+    lines += [divider, header, divider]
+
+    for v in r["variables"]:
+        evidence = str(v.get('evidence', 'NA')).replace('\n', ' ')
+        variable = str(v.get('variable', 'Unknown'))
+        status = str(v.get('status', 'Unknown'))
+        lines.append(f"| {variable:<40} | {status:<20} | {evidence}")
+
+    lines.append(divider)
+
+    parse_info = r.get("parse") or {}
+    if parse_info.get("missing_variables"):
+        lines.append(f"Missing Variables : {', '.join(parse_info['missing_variables'])}")
+    if parse_info.get("unknown_variables"):
+        lines.append(f"Unknown Variables : {', '.join(parse_info['unknown_variables'])}")
+    if parse_info.get("invalid_statuses"):
+        invalid = ", ".join(f"{var} ({status})" for var, status in parse_info["invalid_statuses"])
+        lines.append(f"Invalid Statuses  : {invalid}")
+    if parse_info.get("duplicates"):
+        lines.append(f"Duplicate Rows    : {', '.join(parse_info['duplicates'])}")
+
+    # Metrics
+    summary = r['summary']
+    counts = summary['counts']
+
+    lines += [
+        "",
+        "SCORING METRICS:",
+        f"{'-'*20}",
+        f"Total Variables        : {summary['total_possible']}",
+        f"Not Present            : {counts.get('Not Present', 0)}",
+        f"Total Evaluated (Net)  : {summary['considered']}",
+        f"{'-'*20}",
+        f"Excellent              : {counts.get('Excellent', 0)}",
+        f"Moderate               : {counts.get('Moderate', 0)}",
+        f"Needs Improvement      : {counts.get('Needs Improvement', 0)}",
+        f"{'-'*20}",
+        f"Final Percentage Score : {summary['excellent_percentage']}%",
+        f"Call Classification    : {summary['call_type']}",
+    ]
+    if summary.get("grade"):
+        grade = summary["grade"]
+        lines.append(f"Grade ({grade['policy']}){' ' * max(15 - len(grade['policy']), 1)}: "
+                     f"{grade['grade']} ({grade['score']}%)")
+
+    for stage, stage_usage in r.get("usage", {}).items():
+        if stage == "total":
+            continue
+        lines.append(f"Tokens [{stage:<13}] : prompt {stage_usage['prompt_tokens']}, "
+                     f"audio {stage_usage['audio_tokens']}, output {stage_usage['output_tokens']}, "
+                     f"thinking {stage_usage.get('thinking_tokens', 0)} (~${stage_usage['cost_usd']:.4f})")
+    return "\n".join(lines) + "\n\n\n"
+
+def stats_record(r):
+    """The few fields of a result the stats report needs (cached per call in the manifest)."""
+    summary = r["summary"]
+    return {
+        "call_type": summary["call_type"],
+        "score": summary["excellent_percentage"],
+        "variables": summary.get("total_possible", 0),
+        "grade": (summary.get("grade") or {}).get("grade"),
+        "policy": (summary.get("grade") or {}).get("policy"),
+        "usage": r.get("usage") or {},
+        "index": r.get("index"),
+        "call_id": r.get("call_id", r.get("index")),
+        "error": r.get("error"),
+        "audio": {k: (r.get("audio") or {}).get(k) for k in ("original_sec", "processed_sec")},
+    }
+
+REPORTS = {
+    "transcripts": render_transcript,
+    "summary": render_summary_report,
+}
+
+# =========================
+# STREAMING STATS
+# =========================
+
+class StatsAggregator:
+    """
+    Builds summary_stats.txt from per-call stats records in one pass.
+    Only counters are kept in memory; the per-call score list is spooled to a
+    temporary file and copied into the report when it is written. ERROR and
+    incomplete calls are listed up to MAX_LISTED_CALLS each.
+    """
+
+    def __init__(self):
+        self.types = {"GOOD": 0, "BAD": 0, "ERROR": 0}
+        self.complete = 0
+        self.incomplete = 0
+        self.score_sum = 0.0
+        self.score_count = 0
+        self.grades = {}
+        self.policy = None
+        self.usage = empty_usage()
+        self.usage_by_stage = {}
+        self.errors = []           # (call_id, error) of ERROR calls
+        self.incomplete_calls = [] # (call_id, variables extracted)
+        self.audio_calls = 0       # Calls whose audio was preprocessed
+        self.audio_original_sec = 0.0
+        self.audio_processed_sec = 0.0
+        self._scores = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+    def add(self, record):
+        call_type = record["call_type"]
+        self.types[call_type] = self.types.get(call_type, 0) + 1
+        if record["variables"] >= EXPECTED_VARIABLES:
+            self.complete += 1
+        elif call_type != "ERROR":
+            self.incomplete += 1
+            if len(self.incomplete_calls) < MAX_LISTED_CALLS:
+                self.incomplete_calls.append((record.get("call_id"), record["variables"]))
+        if call_type == "ERROR" and len(self.errors) < MAX_LISTED_CALLS:
+            self.errors.append((record.get("call_id"), record.get("error") or "Unknown error"))
+
+        audio = record.get("audio") or {}
+        if audio.get("processed_sec") is not None:
+            self.audio_calls += 1
+            self.audio_original_sec += audio.get("original_sec") or 0
+            self.audio_processed_sec += audio["processed_sec"]
+
+        self._scores.write(f"{', ' if self.score_count else ''}{record['score']}")
+        self.score_sum += record["score"]
+        self.score_count += 1
+
+        if record.get("grade"):
+            self.grades[record["grade"]] = self.grades.get(record["grade"], 0) + 1
+            self.policy = record["policy"]
+
+        for stage, usage in record["usage"].items():
+            if stage == "total":
+                add_usage(self.usage, usage)
+            else:
+                add_usage(self.usage_by_stage.setdefault(stage, empty_usage()), usage)
+
+    def average_score(self):
+        return round(self.score_sum / self.score_count, 2) if self.score_count else 0.0
+
+    def write(self, filepath, usage_lines=None):
+        """Writes summary_stats.txt. `usage_lines` (e.g. RunUsage.format_report()) replace the usage rollup."""
+        avg_score = self.average_score()
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(f"Good Calls: {self.types['GOOD']}\n")
+            f.write(f"Bad Calls: {self.types['BAD']}\n")
+            f.write(f"Error Calls: {self.types['ERROR']}\n")
+            f.write(f"Complete Calls (64 vars): {self.complete}\n")
+            f.write(f"Incomplete Calls: {self.incomplete}\n")
+            f.write("Final Scores: [")
+            self._scores.seek(0)
+            shutil.copyfileobj(self._scores, f)
+            f.write("]\n")
+            f.write(f"Average Final Percentage Score: {avg_score}%\n")
+            f.write(f"Total Scores Count: {self.score_count}\n")
+            if self.policy:
+                f.write(f"Grades ({self.policy}): {dict(sorted(self.grades.items()))}\n")
+
+            if usage_lines is not None:
+                f.write("\n#Usage\n")
+                for line in usage_lines:
+                    f.write(f"{line}\n")
+            elif self.usage["requests"]:
+                f.write("\n#Usage\n")
+                f.write(f"Gemini Requests: {self.usage['requests']}\n")
+                f.write(f"Prompt Tokens: {self.usage['prompt_tokens']} (audio: {self.usage['audio_tokens']})\n")
+                f.write(f"Output Tokens: {self.usage['output_tokens']} (thinking: {self.usage['thinking_tokens']})\n")
+                f.write(f"Total Tokens: {self.usage['total_tokens']}\n")
+                f.write(f"Estimated Cost (USD): {self.usage['cost_usd']:.4f}\n")
+                for stage, usage in sorted(self.usage_by_stage.items()):
+                    f.write(f"  [{stage}] requests={usage['requests']} prompt={usage['prompt_tokens']} "
+                            f"audio={usage['audio_tokens']} output={usage['output_tokens']} "
+                            f"thinking={usage['thinking_tokens']} cost=${usage['cost_usd']:.4f}\n")
+        self._scores.close()
+
+# =========================
+# INCREMENTAL REGENERATION
+# =========================
+
+def template_hash(render):
+    """Hash of a template function's source, so layout edits invalidate its fragments."""
+    return hashlib.sha1(inspect.getsource(render).encode("utf-8")).hexdigest()
+
+_MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS templates (
+    name   TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calls (
+    call_id TEXT PRIMARY KEY,
+    key     TEXT NOT NULL,
+    stats   TEXT NOT NULL
+);
+"""
+
+def _open_manifest(cache_dir):
+    """Opens (creating) the manifest database; a legacy JSON manifest is dropped, so fragments re-render once."""
+    os.makedirs(cache_dir, exist_ok=True)
+    legacy = os.path.join(cache_dir, LEGACY_MANIFEST_FILE)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+    db = sqlite3.connect(os.path.join(cache_dir, MANIFEST_FILE))
+    db.executescript(_MANIFEST_SCHEMA)
+    return db
+
+def _prune_manifest(db, results_dir, cache_dir):
+    """Drops manifest rows and fragments of calls no longer stored, a batch of rows at a time."""
+    removed = 0
+    last = 0
+    while True:
+        rows = db.execute("SELECT rowid, call_id FROM calls WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                          (last, PRUNE_BATCH)).fetchall()
+        if not rows:
+            return removed
+        last = rows[-1][0]
+        gone = [call_id for _, call_id in rows if not os.path.exists(result_path(call_id, results_dir))]
+        db.executemany("DELETE FROM calls WHERE call_id = ?", [(call_id,) for call_id in gone])
+        for call_id in gone:
+            for name in REPORTS:
+                fragment = os.path.join(cache_dir, name, f"{call_id}.txt")
+                if os.path.exists(fragment):
+                    os.remove(fragment)
+        removed += len(gone)
+
+def regenerate_reports(results_dir=RESULTS_DIR, output_dir=OUTPUT_DIR, cache_dir=RENDER_CACHE_DIR):
+    """
+    Re-renders the summary report, transcripts file and stats from stored results.
+
+    Each call's rendered block is cached under cache_dir/<report>/<call_id>.txt
+    and keyed by a hash of the stored result. The manifest (SQLite, in
+    cache_dir) keeps that key and the call's stats record per call, plus each
+    template's source hash, so only calls whose result changed (or every call
+    of a report whose template changed) are rendered again, and only their
+    manifest rows are written. Final files are built by copying fragments one
+    at a time and the manifest is read row by row, so memory does not grow
+    with run size.
+
+    Returns {"calls", "rendered": {report: count}, "files": {report: path}}.
+    """
+    db = _open_manifest(cache_dir)
+    known = dict(db.execute("SELECT name, digest FROM templates"))
+    templates = {name: template_hash(render) for name, render in REPORTS.items()}
+    stale_reports = {name for name, digest in templates.items() if known.get(name) != digest}
+    for name in REPORTS:
+        os.makedirs(os.path.join(cache_dir, name), exist_ok=True)
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = {name: os.path.join(output_dir, filename) for name, filename in REPORT_FILES.items()}
+    rendered = {name: 0 for name in REPORTS}
+    stats = StatsAggregator()
+    calls = 0
+
+    # Fragments are appended to temporary outputs and swapped in at the end
+    outputs = {name: open(f"{files[name]}.tmp", "wb") for name in REPORTS}
+    try:
+        with db:
+            for call_id, raw in iter_stored(results_dir):
+                calls += 1
+                result_key = hashlib.sha1(raw).hexdigest()
+                row = db.execute("SELECT key, stats FROM calls WHERE call_id = ?", (call_id,)).fetchone()
+                unchanged = row is not None and row[0] == result_key
+
+                r = None
+                if unchanged:
+                    record = json.loads(row[1])
+                else:
+                    r = json.loads(raw)
+                    record = stats_record(r)
+                    db.execute("INSERT OR REPLACE INTO calls (call_id, key, stats) VALUES (?, ?, ?)",
+                               (call_id, result_key, json.dumps(record)))
+
+                for name, render in REPORTS.items():
+                    fragment = os.path.join(cache_dir, name, f"{call_id}.txt")
+                    if not unchanged or name in stale_reports or not os.path.exists(fragment):
+                        if r is None:
+                            r = json.loads(raw)
+                        with open(fragment, "w", encoding="utf-8") as f:
+                            f.write(render(r))
+                        rendered[name] += 1
+                    with open(fragment, "rb") as f:
+                        shutil.copyfileobj(f, outputs[name])
+
+                stats.add(record)
+    finally:
+        for out in outputs.values():
+            out.close()
+
+    for name in REPORTS:
+        os.replace(f"{files[name]}.tmp", files[name])
+    stats.write(files["stats"])
+
+    with db:
+        _prune_manifest(db, results_dir, cache_dir)
+        db.executemany("INSERT OR REPLACE INTO templates (name, digest) VALUES (?, ?)",
+                       [(name, digest) for name, digest in templates.items() if known.get(name) != digest])
+    db.close()
+
+    return {"calls": calls, "rendered": rendered, "files": files}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate reports from stored per-call results.")
+    parser.add_argument("--results", default=RESULTS_DIR, help="Directory of stored result JSON files")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="Directory for the regenerated reports")
+    parser.add_argument("--cache", default=RENDER_CACHE_DIR, help="Rendered fragment cache")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.results):
+        print(f"[REPORTS] No stored results in {args.results}")
+        sys.exit(1)
+
+    summary = regenerate_reports(args.results, args.out, args.cache)
+    print(f"[REPORTS] {summary['calls']} calls, re-rendered: {summary['rendered']}")
+    for name, path in summary["files"].items():
+        print(f"  {name:<12} -> {path}")
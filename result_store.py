@@ -0,0 +1,68 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import json
+import threading
+
+# =========================
+# CONFIGURATION
+# =========================
+
+RESULTS_DIR = "output/results"   # One JSON file per call ID
+
+_store_lock = threading.Lock()
+
+# =========================
+# PER-CALL RESULT STORE
+# =========================
+
+def result_path(call_id, results_dir=RESULTS_DIR):
+    return os.path.join(results_dir, f"{call_id}.json")
+
+def save_result(r, results_dir=RESULTS_DIR):
+    """
+    Persists one call's result dict (thread-safe, atomic replace).
+    The stored result is the source of truth for report regeneration.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    path = result_path(r.get("call_id", r["index"]), results_dir)
+    tmp_path = f"{path}.tmp"
+    with _store_lock:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(r, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    return path
+
+def load_result(call_id, results_dir=RESULTS_DIR):
+    with open(result_path(call_id, results_dir), encoding="utf-8") as f:
+        return json.load(f)
+
+def _sort_key(call_id):
+    # Numeric IDs (row indices, epoch-style callIds) sort numerically, anything else after them by name
+    try:
+        return (0, float(call_id), call_id)
+    except ValueError:
+        return (1, 0.0, call_id)
+
+def list_call_ids(results_dir=RESULTS_DIR):
+    """Returns stored call IDs in call order (only names are held in memory)."""
+    if not os.path.isdir(results_dir):
+        return []
+    ids = [name[:-5] for name in os.listdir(results_dir) if name.endswith(".json")]
+    return sorted(ids, key=_sort_key)
+
+def iter_stored(results_dir=RESULTS_DIR):
+    """
+    Yields (call_id, raw_bytes) for every stored result in call order, one file at
+    a time, so callers can hash or parse results without loading the whole run.
+    """
+    for call_id in list_call_ids(results_dir):
+        with open(result_path(call_id, results_dir), "rb") as f:
+            yield call_id, f.read()
+
+def iter_results(results_dir=RESULTS_DIR):
+    """Yields stored result dicts in call order, one at a time."""
+    for _, raw in iter_stored(results_dir):
+        yield json.loads(raw)
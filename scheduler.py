@@ -0,0 +1,302 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+import time
+import heapq
+import struct
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from signed_urls import EXPIRY_MARGIN_SEC
+
+# =========================
+# CONFIGURATION
+# =========================
+
+PROBE_BYTES = 65536        # Header bytes fetched per recording (ID3 tag + first frames)
+PROBE_TIMEOUT = 15         # Seconds per probe request
+PROBE_WORKERS = 16         # Probes are tiny, so they can fan out wider than BATCH_SIZE
+DEFAULT_BITRATE_KBPS = 32  # Assumed bitrate when only the size is known (telephony MP3)
+DEFAULT_SECONDS_PER_CALL = 90  # Processing time assumed per call when projecting start times
+
+# MPEG audio Layer III lookup tables
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],   # MPEG-1
+    2: [22050, 24000, 16000],   # MPEG-2
+    0: [11025, 12000, 8000],    # MPEG-2.5
+}
+
+# =========================
+# CONTAINER HEADER PARSING
+# =========================
+
+def _id3_size(head):
+    """Returns the byte length of a leading ID3v2 tag (0 if absent)."""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = 0
+    for b in head[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+def parse_mp3_header(head, total_size=None):
+    """
+    Parses the first MPEG Layer III frame (and Xing/Info VBR header if present).
+    Returns {"bitrate_kbps", "sample_rate", "channels", "duration_sec"} or None.
+    duration_sec is exact for VBR files with a frame count, otherwise estimated
+    from total_size and the first frame's bitrate.
+    """
+    offset = _id3_size(head)
+    limit = len(head) - 4
+
+    while offset < limit:
+        if head[offset] == 0xFF and (head[offset + 1] & 0xE0) == 0xE0:
+            b1, b2, b3 = head[offset + 1], head[offset + 2], head[offset + 3]
+            version = (b1 >> 3) & 0x03
+            layer = (b1 >> 1) & 0x03
+            bitrate_idx = b2 >> 4
+            rate_idx = (b2 >> 2) & 0x03
+            if version != 1 and layer == 1 and 0 < bitrate_idx < 15 and rate_idx < 3:
+                break
+        offset += 1
+    else:
+        return None
+
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][bitrate_idx]
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_idx]
+    channels = 1 if (b3 >> 6) == 3 else 2
+    samples_per_frame = 1152 if version == 3 else 576
+
+    info = {"bitrate_kbps": bitrate, "sample_rate": sample_rate, "channels": channels, "duration_sec": None}
+
+    # Xing/Info header sits right after the side info of the first frame
+    if version == 3:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    xing = offset + 4 + side_info
+    if head[xing:xing + 4] in (b"Xing", b"Info") and len(head) >= xing + 12:
+        flags = struct.unpack(">I", head[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            frames = struct.unpack(">I", head[xing + 8:xing + 12])[0]
+            info["duration_sec"] = round(frames * samples_per_frame / sample_rate, 2)
+            return info
+
+    if total_size:
+        audio_bytes = max(total_size - _id3_size(head), 0)
+        info["duration_sec"] = round(audio_bytes * 8 / (bitrate * 1000), 2)
+    return info
+
+def parse_wav_header(head):
+    """Parses a RIFF/WAVE header. Returns {"sample_rate", "channels", "duration_sec"} or None."""
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+
+    pos = 12
+    byte_rate = sample_rate = channels = None
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        chunk_size = struct.unpack("<I", head[pos + 4:pos + 8])[0]
+        if chunk_id == b"fmt " and pos + 24 <= len(head):
+            channels, sample_rate, byte_rate = struct.unpack("<HII", head[pos + 10:pos + 20])
+        elif chunk_id == b"data" and byte_rate:
+            return {
+                "sample_rate": sample_rate,
+                "channels": channels,
+                "duration_sec": round(chunk_size / byte_rate, 2),
+            }
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+# =========================
+# PROBING
+# =========================
+
+def _total_size(response):
+    """Reads the full object size from Content-Range (206) or Content-Length (200)."""
+    content_range = response.headers.get("Content-Range", "")
+    match = re.search(r"/(\d+)$", content_range)
+    if match:
+        return int(match.group(1))
+    if response.status_code == 200 and response.headers.get("Content-Length"):
+        return int(response.headers["Content-Length"])
+    return None
+
+def probe_audio(audio_url):
+    """
+    Cheaply probes a recording without downloading it.
+    Fetches only the first PROBE_BYTES with a ranged GET (falls back to HEAD),
+    then parses the container header.
+    Returns {"size_bytes", "duration_sec", "source"}; unknown fields are None.
+    """
+    probe = {"size_bytes": None, "duration_sec": None, "source": "unknown"}
+
+    try:
+        with requests.get(audio_url, headers={"Range": f"bytes=0-{PROBE_BYTES - 1}"},
+                          stream=True, timeout=PROBE_TIMEOUT) as response:
+            if response.status_code in (200, 206):
+                probe["size_bytes"] = _total_size(response)
+                head = response.raw.read(PROBE_BYTES, decode_content=True) or b""
+
+                info = parse_wav_header(head) or parse_mp3_header(head, probe["size_bytes"])
+                if info and info.get("duration_sec"):
+                    probe["duration_sec"] = info["duration_sec"]
+                    probe["source"] = "header"
+    except Exception:
+        pass
+
+    if probe["size_bytes"] is None:
+        try:
+            response = requests.head(audio_url, timeout=PROBE_TIMEOUT, allow_redirects=True)
+            if response.status_code == 200 and response.headers.get("Content-Length"):
+                probe["size_bytes"] = int(response.headers["Content-Length"])
+        except Exception:
+            pass
+
+    if probe["duration_sec"] is None and probe["size_bytes"]:
+        probe["duration_sec"] = round(probe["size_bytes"] * 8 / (DEFAULT_BITRATE_KBPS * 1000), 2)
+        probe["source"] = "size"
+
+    return probe
+
+def probe_calls(calls, max_workers=PROBE_WORKERS):
+    """
+    Probes every call in parallel and stores the result on call["probe"].
+    Returns the same list for chaining.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for call, probe in zip(calls, executor.map(lambda c: probe_audio(c["audio_url"]), calls)):
+            call["probe"] = probe
+    return calls
+
+# =========================
+# LONGEST-PROCESSING-TIME-FIRST ORDERING
+# =========================
+
+def call_duration(call):
+    """Returns the probed duration of a call in seconds, or None."""
+    return (call.get("probe") or {}).get("duration_sec")
+
+def order_longest_first(calls):
+    """
+    Orders calls longest-processing-time-first (LPT).
+    With a fixed worker pool pulling in this order, long recordings start
+    early and short ones fill the gaps at the end, which bounds the makespan.
+    Calls that could not be probed are treated as median length.
+    """
+    known = sorted(d for d in (call_duration(c) for c in calls) if d)
+    median = known[len(known) // 2] if known else 0
+    return sorted(calls, key=lambda c: call_duration(c) or median, reverse=True)
+
+# =========================
+# EXPIRY-AWARE ORDERING
+# =========================
+
+def projected_starts(calls, workers, seconds_per_call=DEFAULT_SECONDS_PER_CALL, now=None):
+    """
+    Simulates a fixed worker pool pulling calls in order.
+    Returns the projected start time (epoch seconds) of each call.
+    """
+    now = now or time.time()
+    free_at = [now] * workers
+    starts = []
+    for _ in calls:
+        start = heapq.heappop(free_at)
+        starts.append(start)
+        heapq.heappush(free_at, start + seconds_per_call)
+    return starts
+
+def order_for_expiry(calls, workers, seconds_per_call=DEFAULT_SECONDS_PER_CALL, now=None,
+                     margin=EXPIRY_MARGIN_SEC):
+    """
+    Moves calls whose signed URL would expire before their projected start
+    (call["expires_at"], see signed_urls.with_expiry) to the front,
+    earliest expiry first. Everything else keeps its existing (e.g. LPT) order.
+    Returns (ordered_calls, at_risk_count).
+    """
+    starts = projected_starts(calls, workers, seconds_per_call, now)
+    at_risk, rest = [], []
+    for call, start in zip(calls, starts):
+        expires_at = call.get("expires_at")
+        if expires_at is not None and start > expires_at - margin:
+            at_risk.append(call)
+        else:
+            rest.append(call)
+    at_risk.sort(key=lambda c: c["expires_at"])
+    return at_risk + rest, len(at_risk)
+
+# =========================
+# RUN ESTIMATES
+# =========================
+
+class RunEstimator:
+    """
+    Thread-safe estimate of remaining run time from observed processing
+    seconds per audio-minute. Calls without a known duration are timed
+    separately so they do not skew the per-minute rate. plan() sets the
+    backlog once; record() takes each finished call off it, so estimates
+    cost O(1) however large the sheet.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.audio_minutes = 0.0
+        self.timed_seconds = 0.0       # Processing seconds of calls with a known duration
+        self.untimed_calls = 0
+        self.untimed_seconds = 0.0     # Processing seconds of calls without one
+        self.calls = 0
+        self.remaining_minutes = 0.0   # Backlog: audio minutes and unknown-duration calls not yet finished
+        self.remaining_timed = 0
+        self.remaining_untimed = 0
+        self._lock = threading.Lock()
+
+    def plan(self, calls):
+        """Sets the backlog to `calls` (everything still to finish)."""
+        durations = [call_duration(c) for c in calls]
+        with self._lock:
+            self.remaining_minutes = sum(d for d in durations if d) / 60
+            self.remaining_timed = sum(1 for d in durations if d)
+            self.remaining_untimed = len(durations) - self.remaining_timed
+
+    def record(self, call, elapsed_sec):
+        """Records wall-clock processing time for a finished call and takes it off the backlog."""
+        duration = call_duration(call)
+        with self._lock:
+            self.calls += 1
+            if duration:
+                self.audio_minutes += duration / 60
+                self.timed_seconds += elapsed_sec
+                self.remaining_minutes = max(self.remaining_minutes - duration / 60, 0.0)
+                self.remaining_timed = max(self.remaining_timed - 1, 0)
+            else:
+                self.untimed_calls += 1
+                self.untimed_seconds += elapsed_sec
+                self.remaining_untimed = max(self.remaining_untimed - 1, 0)
+
+    def seconds_per_audio_minute(self):
+        with self._lock:
+            if self.audio_minutes <= 0:
+                return None
+            return self.timed_seconds / self.audio_minutes
+
+    def estimate_remaining(self):
+        """Returns estimated seconds to finish the backlog, or None before any data."""
+        with self._lock:
+            if self.calls == 0:
+                return None
+            per_call = (self.timed_seconds + self.untimed_seconds) / self.calls
+            per_untimed = self.untimed_seconds / self.untimed_calls if self.untimed_calls else per_call
+            if self.audio_minutes > 0:
+                seconds = (self.remaining_minutes * self.timed_seconds / self.audio_minutes
+                           + self.remaining_untimed * per_untimed)
+            else:
+                seconds = (self.remaining_timed + self.remaining_untimed) * per_call
+        return round(seconds / self.workers, 1)
@@ -0,0 +1,62 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+import json
+
+from prompts import EXTRACT_CONTEXT_PROMPT
+
+# =========================
+# CANONICAL VARIABLE SCHEMA
+# =========================
+
+def _variables_from_prompt(prompt):
+    """Reads the VARIABLE LIST JSON array out of the extraction prompt (single source of truth)."""
+    block = prompt[prompt.index("VARIABLE LIST:"):]
+    return json.loads(block[block.index("["):block.index("]") + 1])
+
+CANONICAL_VARIABLES = _variables_from_prompt(EXTRACT_CONTEXT_PROMPT)
+VARIABLE_INDEX = {name: i for i, name in enumerate(CANONICAL_VARIABLES)}
+
+STATUSES = ["Excellent", "Moderate", "Needs Improvement", "Not Present"]
+
+# Common model spellings -> canonical status
+_STATUS_ALIASES = {
+    "excellent": "Excellent",
+    "moderate": "Moderate",
+    "needs improvement": "Needs Improvement",
+    "need improvement": "Needs Improvement",
+    "needs improvements": "Needs Improvement",
+    "improvement needed": "Needs Improvement",
+    "not present": "Not Present",
+    "notpresent": "Not Present",
+    "not applicable": "Not Present",
+    "absent": "Not Present",
+    "na": "Not Present",
+    "n a": "Not Present",
+}
+
+def _key(text):
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+_VARIABLE_KEYS = {_key(name): name for name in CANONICAL_VARIABLES}
+
+# =========================
+# NORMALIZATION
+# =========================
+
+def normalize_status(raw):
+    """Maps a raw status cell to a canonical status, or None if unrecognised."""
+    return _STATUS_ALIASES.get(_key(raw))
+
+def normalize_variable(raw):
+    """
+    Maps a raw variable cell to its canonical name, or None if unrecognised.
+    Ignores case, punctuation, markdown and leading row numbers ("12. Pacing of call").
+    """
+    key = _key(raw)
+    if key in _VARIABLE_KEYS:
+        return _VARIABLE_KEYS[key]
+    stripped = re.sub(r"^\d+ ", "", key)
+    return _VARIABLE_KEYS.get(stripped)
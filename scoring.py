@@ -0,0 +1,210 @@
+# =========================
+# IMPORTS
+# =========================
+
+import sys
+import time
+import numpy as np
+
+from schema import CANONICAL_VARIABLES, VARIABLE_INDEX, STATUSES
+from table_parser import iter_report_calls
+from result_store import RESULTS_DIR
+from records import iter_records
+
+# =========================
+# STATUS CODES
+# =========================
+
+# Matrix cells hold small status codes; MISSING marks a variable that was not extracted
+EXCELLENT, MODERATE, NEEDS_IMPROVEMENT, NOT_PRESENT = range(len(STATUSES))
+MISSING = -1
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+GOOD_THRESHOLD = 40        # Same cut-off as compute_summary
+MATRIX_BATCH = 1000        # Records stacked per block when loading stored results
+
+# 5-band scale from the summary_stats_100calls.txt notes: (lower bound %, label), highest first
+FIVE_BAND_SCALE = [(80, "Excellent"), (60, "Good"), (40, "Moderate"), (20, "Bad"), (0, "Poor")]
+
+# =========================
+# LOADING
+# =========================
+
+def results_to_matrix(results):
+    """
+    Builds a call x variable status matrix from result dicts (the result_store
+    / CallResult.to_dict() shape) by walking each call's variable rows.
+    Returns (call_ids, codes) where codes is an int8 array of shape (n_calls, 64).
+    """
+    codes = np.full((len(results), len(CANONICAL_VARIABLES)), MISSING, dtype=np.int8)
+    call_ids = []
+    for row, r in enumerate(results):
+        call_ids.append(r["index"])
+        for v in r["variables"]:
+            col = VARIABLE_INDEX.get(v["variable"])
+            code = STATUS_CODES.get(v["status"])
+            if col is not None and code is not None:
+                codes[row, col] = code
+    return call_ids, codes
+
+def statuses_to_matrix(statuses):
+    """Stacks int8 status arrays (records.encode_variables order) into a (n_calls, 64) matrix."""
+    buf = b"".join(s.tobytes() for s in statuses)
+    return np.frombuffer(buf, dtype=np.int8).reshape(-1, len(CANONICAL_VARIABLES)).copy()
+
+def records_to_matrix(records, id_field="index"):
+    """
+    Builds a call x variable status matrix from records.CallResult records.
+    Their status arrays already hold these codes in canonical order, so rows
+    are copied as raw bytes. Call IDs are each record's `id_field`.
+    Returns (call_ids, codes) like results_to_matrix.
+    """
+    return [getattr(r, id_field) for r in records], statuses_to_matrix(r.statuses for r in records)
+
+def load_report_matrix(paths):
+    """
+    Loads archived summary report files into one status matrix.
+    Returns (call_ids, codes); call_ids are (path, call_index) pairs since call
+    indices repeat across runs.
+    """
+    call_ids = []
+    rows = []
+    for path in paths:
+        for index, parsed in iter_report_calls(path):
+            row = np.full(len(CANONICAL_VARIABLES), MISSING, dtype=np.int8)
+            for v in parsed["variables"]:
+                row[VARIABLE_INDEX[v["variable"]]] = STATUS_CODES[v["status"]]
+            call_ids.append((path, index))
+            rows.append(row)
+    codes = np.vstack(rows) if rows else np.empty((0, len(CANONICAL_VARIABLES)), dtype=np.int8)
+    return call_ids, codes
+
+def load_results_matrix(results_dir=RESULTS_DIR):
+    """
+    Loads stored per-call results (result_store) into one status matrix,
+    streaming them as records and stacking MATRIX_BATCH at a time with
+    records_to_matrix, so only codes, call IDs and recording URLs are kept.
+    Returns (call_ids, codes, urls).
+    """
+    call_ids, urls, blocks = [], [], []
+    batch = []
+
+    def flush():
+        ids, codes = records_to_matrix(batch, id_field="call_id")
+        call_ids.extend(ids)
+        urls.extend(r.url for r in batch)
+        blocks.append(codes)
+        batch.clear()
+
+    for record in iter_records(results_dir):
+        batch.append(record)
+        if len(batch) >= MATRIX_BATCH:
+            flush()
+    if batch:
+        flush()
+    codes = np.vstack(blocks) if blocks else np.empty((0, len(CANONICAL_VARIABLES)), dtype=np.int8)
+    return call_ids, codes, urls
+
+def save_matrix(path, call_ids, codes):
+    """Caches a status matrix as .npz so large histories load without re-parsing reports."""
+    np.savez_compressed(path, codes=codes, call_ids=np.array([str(c) for c in call_ids]))
+
+def load_matrix(path):
+    data = np.load(path)
+    return list(data["call_ids"]), data["codes"]
+
+# =========================
+# VECTORIZED SCORING
+# =========================
+
+def status_counts(codes):
+    """Returns an (n_calls, 4) array of per-status counts."""
+    return np.stack([(codes == code).sum(axis=1) for code in range(len(STATUSES))], axis=1)
+
+def score_matrix(codes, weights=None, good_threshold=GOOD_THRESHOLD, bands=None):
+    """
+    Scores every call at once.
+
+    - excellent_percentage: Excellent / (extracted - Not Present), optionally
+      with per-variable weights (array of 64, default all 1).
+    - call_type: GOOD/BAD at good_threshold, ERROR when nothing was extracted
+      (same rule as compute_summary).
+    - grade: band label per call when `bands` ([(lower_bound, label), ...],
+      highest first) is given.
+
+    Returns a dict of arrays, one entry per call.
+    """
+    if weights is None:
+        weights = np.ones(codes.shape[1], dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    extracted = codes != MISSING
+    considered = extracted & (codes != NOT_PRESENT)
+    excellent = codes == EXCELLENT
+
+    considered_w = considered @ weights
+    excellent_w = excellent @ weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(considered_w > 0, excellent_w / considered_w * 100, 0.0)
+    pct = np.round(pct, 2)
+
+    has_variables = extracted.any(axis=1)
+    call_type = np.where(~has_variables, "ERROR", np.where(pct >= good_threshold, "GOOD", "BAD"))
+
+    scores = {
+        "excellent_percentage": pct,
+        "call_type": call_type,
+        "total_possible": extracted.sum(axis=1),
+        "considered": considered.sum(axis=1),
+    }
+
+    if bands:
+        bounds = np.array([lower for lower, _ in bands][::-1], dtype=np.float64)
+        labels = np.array([label for _, label in bands][::-1] + ["ERROR"])
+        band_idx = np.digitize(pct, bounds[1:])
+        scores["grade"] = np.where(has_variables, labels[band_idx], "ERROR")
+
+    return scores
+
+def distribution(scores, bins=10):
+    """Summarises scored calls: classification counts, grade counts and a score histogram."""
+    types, type_counts = np.unique(scores["call_type"], return_counts=True)
+    valid = scores["call_type"] != "ERROR"
+    hist, edges = np.histogram(scores["excellent_percentage"][valid], bins=bins, range=(0, 100))
+
+    summary = {
+        "calls": len(scores["call_type"]),
+        "call_types": dict(zip(types.tolist(), type_counts.tolist())),
+        "average_score": round(float(scores["excellent_percentage"].mean()), 2) if len(valid) else 0.0,
+        "histogram": list(zip(edges[:-1].tolist(), hist.tolist())),
+    }
+    if "grade" in scores:
+        grades, grade_counts = np.unique(scores["grade"], return_counts=True)
+        summary["grades"] = dict(zip(grades.tolist(), grade_counts.tolist()))
+    return summary
+
+def variable_excellence(codes):
+    """Per-variable share of Excellent among calls where the variable was evaluated."""
+    considered = (codes != MISSING) & (codes != NOT_PRESENT)
+    excellent = (codes == EXCELLENT).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(considered.sum(axis=0) > 0, excellent / considered.sum(axis=0), np.nan)
+
+
+if __name__ == "__main__":
+    # Usage: python scoring.py output/summary_report_100calls.txt [more report files...]
+    start = time.perf_counter()
+    call_ids, codes = load_report_matrix(sys.argv[1:])
+    loaded = time.perf_counter()
+    scores = score_matrix(codes, bands=FIVE_BAND_SCALE)
+    summary = distribution(scores)
+    scored = time.perf_counter()
+
+    print(f"Loaded {codes.shape[0]} calls x {codes.shape[1]} variables in {(loaded - start) * 1000:.1f} ms, "
+          f"scored in {(scored - loaded) * 1000:.2f} ms")
+    print(f"Call types    : {summary['call_types']}")
+    print(f"Grades        : {summary.get('grades')}")
+    print(f"Average score : {summary['average_score']}%")
+    print("Histogram     :")
+    for lower, count in summary["histogram"]:
+        print(f"  {lower:>5.0f}-{lower + 10:<5.0f} {'#' * count} {count}")
@@ -0,0 +1,383 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import re
+import sys
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+
+from identity import canonical_call_id
+from table_parser import REPORT_HEADER_RE, VariableTableParser
+from result_store import RESULTS_DIR, iter_results
+
+# =========================
+# CONFIGURATION
+# =========================
+
+DB_PATH = "output/search.db"
+SPEAKERS = ("Agent", "Customer")   # Transcript line prefixes indexed as the speaker
+HIGHLIGHT = ("[", "]")             # Marks around matched terms in snippets
+SNIPPET_TOKENS = 16                # Tokens of context per snippet
+DEFAULT_LIMIT = 20
+
+_SPEAKER_RE = re.compile(rf"^\s*({'|'.join(SPEAKERS)})\s*:\s*(.*)$", re.I)
+
+_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+    text,
+    call_id UNINDEXED,
+    source UNINDEXED,
+    speaker UNINDEXED,
+    variable UNINDEXED,
+    status UNINDEXED,
+    line UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS indexed (
+    call_id    TEXT NOT NULL,
+    source     TEXT NOT NULL,
+    digest     TEXT NOT NULL,
+    first_row  INTEGER,
+    last_row   INTEGER,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (call_id, source)
+);
+"""
+
+# =========================
+# PASSAGES
+# =========================
+
+def transcript_passages(transcript):
+    """Yields (speaker, line_no, text) per transcript line; unlabelled lines keep the last speaker."""
+    speaker = None
+    for line_no, line in enumerate((transcript or "").splitlines(), 1):
+        match = _SPEAKER_RE.match(line)
+        if match:
+            speaker, line = match.group(1).capitalize(), match.group(2)
+        if line.strip():
+            yield speaker, line_no, line.strip()
+
+def evidence_passages(variables):
+    """Yields (variable, status, evidence) for every row with a real evidence quote."""
+    for v in variables or []:
+        evidence = str(v.get("evidence", "")).replace("\n", " ").strip()
+        if evidence and evidence.upper() not in ("NA", "N/A"):
+            yield v.get("variable", "Unknown"), v.get("status", ""), evidence
+
+# =========================
+# INDEX
+# =========================
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over transcript lines (by speaker) and per-variable evidence.
+    Each call's transcript and evidence are indexed separately and replaced as a
+    unit, so re-indexing a call is cheap and unchanged calls are skipped by digest.
+    One connection is shared by all threads behind a lock; WAL lets the pipeline
+    and the query CLI use the same file concurrently. Sharded runs write one
+    index per shard output directory, folded together by merge_from.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def _replace(self, call_id, source, rows):
+        """Replaces one call's rows for a source. rows: [(text, speaker, variable, status, line)]. Returns rows written or 0 if unchanged."""
+        call_id = str(call_id)
+        digest = hashlib.sha1(repr(rows).encode("utf-8")).hexdigest()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                old = self._db.execute(
+                    "SELECT digest, first_row, last_row FROM indexed WHERE call_id = ? AND source = ?",
+                    (call_id, source),
+                ).fetchone()
+                if old and old["digest"] == digest:
+                    self._db.execute("COMMIT")
+                    return 0
+                if old and old["first_row"] is not None:
+                    self._db.execute("DELETE FROM passages WHERE rowid BETWEEN ? AND ?",
+                                     (old["first_row"], old["last_row"]))
+
+                first = last = None
+                for row in rows:
+                    last = self._db.execute(
+                        "INSERT INTO passages (text, call_id, source, speaker, variable, status, line) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (row[0], call_id, source) + tuple(row[1:]),
+                    ).lastrowid
+                    first = first or last
+                self._db.execute(
+                    "INSERT OR REPLACE INTO indexed (call_id, source, digest, first_row, last_row, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (call_id, source, digest, first, last, time.time()),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def index_transcript(self, call_id, transcript):
+        rows = [(text, speaker, None, None, line) for speaker, line, text in transcript_passages(transcript)]
+        return self._replace(call_id, "transcript", rows)
+
+    def index_evidence(self, call_id, variables):
+        rows = [(evidence, None, variable, status, None) for variable, status, evidence in evidence_passages(variables)]
+        return self._replace(call_id, "evidence", rows)
+
+    def merge_from(self, path):
+        """
+        Copies every call indexed in another index file (e.g. a shard's) into
+        this one; calls whose passages are unchanged are skipped by digest.
+        Returns the number of (call, source) entries updated.
+        """
+        other = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        updated = 0
+        try:
+            for call_id, source, digest, first, last in other.execute(
+                    "SELECT call_id, source, digest, first_row, last_row FROM indexed"):
+                with self._lock:
+                    mine = self._db.execute("SELECT digest FROM indexed WHERE call_id = ? AND source = ?",
+                                            (call_id, source)).fetchone()
+                if mine and mine["digest"] == digest:
+                    continue
+                rows = [] if first is None else [tuple(row) for row in other.execute(
+                    "SELECT text, speaker, variable, status, line FROM passages "
+                    "WHERE rowid BETWEEN ? AND ? ORDER BY rowid", (first, last))]
+                self._replace(call_id, source, rows)
+                updated += 1
+        finally:
+            other.close()
+        return updated
+
+    def is_indexed(self, call_id, source):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM indexed WHERE call_id = ? AND source = ?", (str(call_id), source)
+            ).fetchone() is not None
+
+    def search(self, query, source=None, speaker=None, variable=None, limit=DEFAULT_LIMIT):
+        """
+        Runs an FTS5 query (words, "quoted phrases", prefix*, AND/OR/NOT, NEAR).
+        Returns hits, best first: {call_id, source, speaker, variable, status, line, snippet}.
+        Raises ValueError on bad syntax.
+        """
+        sql = (
+            "SELECT call_id, source, speaker, variable, status, line, "
+            "snippet(passages, 0, ?, ?, '...', ?) AS snippet "
+            "FROM passages WHERE passages MATCH ?"
+        )
+        params = [HIGHLIGHT[0], HIGHLIGHT[1], SNIPPET_TOKENS, query]
+        sql, params = _filtered(sql, params, source=source, speaker=speaker, variable=variable)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        try:
+            with self._lock:
+                rows = self._db.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Bad search query {query!r}: {e}")
+        return [dict(row) for row in rows]
+
+    def call_counts(self, query, source=None, speaker=None, variable=None):
+        """Returns [(call_id, matching passages)] for every matching call, most matches first."""
+        sql = "SELECT call_id, COUNT(*) AS n FROM passages WHERE passages MATCH ?"
+        params = [query]
+        sql, params = _filtered(sql, params, source=source, speaker=speaker, variable=variable)
+        sql += " GROUP BY call_id ORDER BY n DESC, call_id"
+        try:
+            with self._lock:
+                return [(row["call_id"], row["n"]) for row in self._db.execute(sql, params)]
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Bad search query {query!r}: {e}")
+
+    def stats(self):
+        with self._lock:
+            calls = self._db.execute("SELECT COUNT(DISTINCT call_id) FROM indexed").fetchone()[0]
+            passages = self._db.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+        return {"calls": calls, "passages": passages}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _filtered(sql, params, **filters):
+    """Appends equality filters on the unindexed columns (case-insensitive)."""
+    for column, value in filters.items():
+        if value:
+            sql += f" AND {column} = ? COLLATE NOCASE"
+            params.append(value)
+    return sql, params
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_index(path=None):
+    """The process-wide index the pipeline writes to (opened on first use at DB_PATH)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = SearchIndex(path or DB_PATH)
+        return _shared
+
+def index_result(r, source):
+    """
+    Indexes one finished call's transcript or evidence into the shared index.
+    Called from the report writers; an index failure is logged, never fatal.
+    """
+    call_id = r.get("call_id", r["index"])
+    try:
+        if source == "transcript":
+            get_index().index_transcript(call_id, r.get("transcript", ""))
+        else:
+            get_index().index_evidence(call_id, r.get("variables"))
+    except (sqlite3.Error, OSError) as e:
+        print(f"[WARN] Search index update failed for call {call_id}: {e}")
+
+# =========================
+# BACKFILL
+# =========================
+
+def _iter_transcript_file(filepath):
+    """Streams an archived transcripts file and yields (call_id, transcript) per block."""
+    call_id = url = None
+    lines = None
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("CALL INDEX:"):
+                call_id = url = None
+                lines = None
+            elif line.startswith("Call ID    :"):
+                call_id = line.split(":", 1)[1].strip()
+            elif line.startswith("Audio URL  :"):
+                url = line.split(":", 1)[1].strip()
+            elif lines is None and line == "TRANSCRIPT":
+                lines = []
+            elif lines is not None and line.startswith("End of Transcript for Call"):
+                if lines and set(lines[-1]) == {"-"}:
+                    lines.pop()
+                if lines and set(lines[0]) == {"-"}:
+                    lines.pop(0)
+                yield call_id or canonical_call_id(url or ""), "\n".join(lines)
+                lines = None
+            elif lines is not None:
+                lines.append(line)
+
+def _iter_report_file(filepath):
+    """Streams an archived summary report and yields (call_id, variable rows) per CALL block."""
+    call_id = url = parser = None
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            if REPORT_HEADER_RE.match(line):
+                if parser is not None:
+                    yield call_id or canonical_call_id(url or ""), parser.finish()["variables"]
+                call_id = url = None
+                parser = VariableTableParser()
+            elif parser is None:
+                continue
+            elif line.startswith("Call ID    :"):
+                call_id = line.split(":", 1)[1].strip()
+            elif line.startswith("URL        :"):
+                url = line.split(":", 1)[1].strip()
+            elif line.startswith("|"):
+                parser.feed(line)
+    if parser is not None:
+        yield call_id or canonical_call_id(url or ""), parser.finish()["variables"]
+
+def build_index(index, results_dir=RESULTS_DIR, transcript_files=(), report_files=()):
+    """
+    Brings the index up to date with stored results and archived report files.
+    Calls whose content is unchanged are skipped, so re-running is cheap.
+    Archived files only fill in calls with no indexed entry yet (stored results win).
+    """
+    start = time.perf_counter()
+    updated = skipped = 0
+
+    for r in iter_results(results_dir):
+        call_id = r.get("call_id", r["index"])
+        for written in (index.index_transcript(call_id, r.get("transcript", "")),
+                        index.index_evidence(call_id, r.get("variables"))):
+            updated += bool(written)
+            skipped += not written
+
+    for path in transcript_files:
+        for call_id, transcript in _iter_transcript_file(path):
+            if index.is_indexed(call_id, "transcript"):
+                skipped += 1
+                continue
+            updated += bool(index.index_transcript(call_id, transcript))
+    for path in report_files:
+        for call_id, variables in _iter_report_file(path):
+            if index.is_indexed(call_id, "evidence"):
+                skipped += 1
+                continue
+            updated += bool(index.index_evidence(call_id, variables))
+
+    print(f"[INDEX] {updated} call sections indexed, {skipped} unchanged "
+          f"in {time.perf_counter() - start:.1f}s ({index.stats()})")
+    return updated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text search over call transcripts and evidence quotes.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index stored results and archived transcript/report files")
+    build.add_argument("--results", default=RESULTS_DIR, help="Stored per-call results directory")
+    build.add_argument("--transcripts", nargs="*", default=[], help="Archived call_transcripts*.txt files")
+    build.add_argument("--reports", nargs="*", default=[], help="Archived summary_report*.txt files")
+
+    search = sub.add_parser("search", help="Find calls containing words or a phrase")
+    search.add_argument("query", help='FTS5 query, e.g. call later, "call me later", competitor*')
+    search.add_argument("--phrase", action="store_true", help="Treat the whole query as one exact phrase")
+    search.add_argument("--source", choices=("transcript", "evidence"))
+    search.add_argument("--speaker", choices=SPEAKERS)
+    search.add_argument("--variable", help="Only evidence of this variable")
+    search.add_argument("--limit", type=int, default=DEFAULT_LIMIT)
+    search.add_argument("--calls", action="store_true", help="List every matching call ID with its match count")
+
+    args = parser.parse_args()
+    index = SearchIndex(args.db)
+    if args.command == "build":
+        build_index(index, args.results, args.transcripts, args.reports)
+        sys.exit(0)
+
+    query = '"' + args.query.replace('"', '""') + '"' if args.phrase else args.query
+    start = time.perf_counter()
+    try:
+        if args.calls:
+            counts = index.call_counts(query, args.source, args.speaker, args.variable)
+            elapsed = (time.perf_counter() - start) * 1000
+            for call_id, n in counts:
+                print(f"{call_id}\t{n}")
+            print(f"[SEARCH] {len(counts)} calls in {elapsed:.1f} ms")
+        else:
+            hits = index.search(query, args.source, args.speaker, args.variable, args.limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            for hit in hits:
+                where = (f"{hit['speaker'] or '?'} line {hit['line']}" if hit["source"] == "transcript"
+                         else f"{hit['variable']} ({hit['status']})")
+                print(f"{hit['call_id']:<20} {where:<45} {hit['snippet']}")
+            print(f"[SEARCH] {len(hits)} hits in {elapsed:.1f} ms")
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(2)
@@ -0,0 +1,166 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+# Importing src initialises Vertex AI and the model client once; every job reuses them
+import src
+from job_queue import JobQueue
+from result_store import RESULTS_DIR, load_result, result_path
+from signed_urls import url_expires_at
+
+# =========================
+# CONFIGURATION
+# =========================
+
+HOST = "127.0.0.1"
+PORT = 8080
+WORKERS = src.BATCH_SIZE       # Jobs scored concurrently
+IDLE_POLL_SEC = 2              # Queue poll interval when there is nothing to do
+OUTPUT_DIR = "output"
+
+SUMMARY_REPORT = f"{OUTPUT_DIR}/summary_report_service.txt"
+TRANSCRIPTS_FILE = f"{OUTPUT_DIR}/call_transcripts_service.txt"
+PROCESSED_LOG_FILE = f"{OUTPUT_DIR}/processed_calls_log.txt"
+
+# =========================
+# WORKERS
+# =========================
+
+def score_job(job):
+    """Runs one queued job through process_call and persists it like a batch run would."""
+    call = {
+        "index": job["job_id"],
+        "call_id": job["call_id"],
+        "audio_url": job["url"],
+        "meta": job["meta"],
+        "expires_at": url_expires_at(job["url"], issued_at=job["submitted_at"]),
+    }
+    r = src.process_call(call)
+    src.run_usage.record_call(r.call_id, r.usage)
+    data = r.to_dict()
+    src.save_result(data, RESULTS_DIR)
+    src.save_transcript(data, TRANSCRIPTS_FILE)
+    src.save_summary_report(data, SUMMARY_REPORT)
+    src.mark_processed(r.call_id, PROCESSED_LOG_FILE)
+    return r
+
+def worker_loop(queue, stop):
+    while not stop.is_set():
+        job = queue.claim()
+        if job is None:
+            stop.wait(IDLE_POLL_SEC)
+            continue
+
+        waited = job["started_at"] - job["submitted_at"]
+        print(f"[SERVICE] Job {job['job_id']} ({job['call_id']}, {job['lane']}) started after {waited:.0f}s in queue")
+        try:
+            r = score_job(job)
+            queue.complete(job["call_id"], r.summary.call_type, r.error)
+            print(f"[SERVICE] Job {job['job_id']} done: {r.summary.call_type} "
+                  f"({r.summary.excellent_percentage}%)")
+        except Exception as e:
+            queue.fail(job["call_id"], f"CRASH: {e}")
+            print(f"[SERVICE] Job {job['job_id']} crashed: {e}")
+
+# =========================
+# HTTP API
+# =========================
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    POST /calls                 {"url": ..., "meta": {...}} or {"calls": [{"url", "meta"}, ...]}
+    GET  /calls/<call_id>       job status
+    GET  /calls/<call_id>/result  stored result (scorecard, variables, transcript); 409 until the
+                                  job's latest run has stored one (e.g. a resubmitted failed job)
+    GET  /stats                 job counts per status
+    """
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/calls":
+            return self._json(404, {"error": "not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError:
+            return self._json(400, {"error": "body must be JSON"})
+
+        if not isinstance(body, dict):
+            return self._json(400, {"error": "body must be a JSON object"})
+        entries = body.get("calls") or [body]
+        if not isinstance(entries, list) or not all(isinstance(e, dict) and e.get("url") for e in entries):
+            return self._json(400, {"error": "every call needs a 'url'"})
+
+        jobs = []
+        for entry in entries:
+            job, created = self.server.queue.submit(entry["url"], entry.get("meta"))
+            jobs.append({"call_id": job["call_id"], "status": job["status"], "created": created})
+        self._json(202, {"calls": jobs})
+
+    def do_GET(self):
+        parts = [p for p in urlsplit(self.path).path.split("/") if p]
+
+        if parts == ["stats"]:
+            return self._json(200, self.server.queue.counts())
+
+        if len(parts) in (2, 3) and parts[0] == "calls":
+            job = self.server.queue.get(parts[1])
+            if job is None:
+                return self._json(404, {"error": f"unknown call {parts[1]}"})
+            if len(parts) == 2:
+                return self._json(200, job)
+            if parts[2] == "result":
+                if job["result_at"] is None or not os.path.exists(result_path(job["call_id"], RESULTS_DIR)):
+                    return self._json(409, {"error": f"call is {job['status']}", "status": job["status"]})
+                return self._json(200, load_result(job["call_id"], RESULTS_DIR))
+
+        self._json(404, {"error": "not found"})
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host=HOST, port=PORT, workers=WORKERS):
+    """Runs the API and the worker pool until interrupted."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    queue = JobQueue(max_workers=workers)   # Jobs are claimed by lanes.py priority lanes and tenant shares
+    stop = threading.Event()
+    threads = [threading.Thread(target=worker_loop, args=(queue, stop), daemon=True) for _ in range(workers)]
+    for t in threads:
+        t.start()
+
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.queue = queue
+    print(f"[SERVICE] Listening on http://{host}:{port} with {workers} workers ({queue.counts()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[SERVICE] Shutting down; running jobs resume on next start")
+    finally:
+        stop.set()
+        server.server_close()
+        for t in threads:
+            t.join(timeout=1)
+        queue.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running call scoring service with a durable queue.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers)
@@ -0,0 +1,229 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import sys
+import time
+import shutil
+import hashlib
+import argparse
+import subprocess
+
+from ingestion import iter_calls
+from identity import load_processed
+from result_store import list_call_ids, result_path
+from reports import regenerate_reports
+from search_index import SearchIndex
+
+# =========================
+# CONFIGURATION
+# =========================
+
+SHARD_ROOT = "output/shards"       # Each shard writes its own output partition here
+MERGED_DIR = "output"              # Merged results, reports and resume log
+PROGRESS_INTERVAL_SEC = 15         # Coordinator progress line interval
+PIPELINE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src.py")
+
+PROCESSED_LOG = "processed_calls_log.txt"
+DUPLICATES_LOG = "duplicate_calls_log.txt"
+SEARCH_DB = "search.db"            # Each shard indexes into <its output>/search.db; merged into MERGED_DIR
+RENDER_CACHE = "rendered"          # Render cache for the merged reports, under MERGED_DIR
+
+# src.py splits MAX_RUN_COST_USD / MAX_RUN_TOKENS evenly across shards (each shard gets 1/N),
+# so the run as a whole stays within the configured budget.
+
+# =========================
+# PARTITIONING
+# =========================
+
+def shard_of(call_id, shards):
+    """Deterministic shard for a call ID (stable across machines, runs and sheet order)."""
+    return int(hashlib.sha1(str(call_id).encode("utf-8")).hexdigest()[:8], 16) % shards
+
+def parse_shard(spec):
+    """Parses "i/N" (0-based shard i of N). Raises ValueError when malformed."""
+    index, _, count = spec.partition("/")
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}' (expected i/N with 0 <= i < N)")
+    return index, count
+
+def shard_dir(index, shards, root=SHARD_ROOT):
+    return os.path.join(root, f"{index}-of-{shards}")
+
+def shard_sizes(sheet, shards, resume_logs=(), root=SHARD_ROOT):
+    """
+    Counts calls per shard by streaming the sheet (duplicate recordings counted
+    once). Returns (sizes, already_done): already_done counts the calls each
+    shard will skip because they are in `resume_logs` or its own resume log.
+    """
+    sizes = [0] * shards
+    already_done = [0] * shards
+    logged = [load_processed(list(resume_logs) + [os.path.join(shard_dir(i, shards, root), PROCESSED_LOG)])
+              for i in range(shards)]
+    seen = set()
+    for call in iter_calls(sheet):
+        if call["call_id"] not in seen:
+            seen.add(call["call_id"])
+            shard = shard_of(call["call_id"], shards)
+            sizes[shard] += 1
+            ids, indices = logged[shard]
+            if call["call_id"] in ids or call["index"] in indices:
+                already_done[shard] += 1
+    return sizes, already_done
+
+def _count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+def _logged_counts(shards, root=SHARD_ROOT):
+    return [_count_lines(os.path.join(shard_dir(i, shards, root), PROCESSED_LOG)) for i in range(shards)]
+
+# =========================
+# COORDINATOR
+# =========================
+
+def run_shards(sheet, shards, root=SHARD_ROOT, merged_dir=MERGED_DIR):
+    """
+    Runs every shard of a sheet as a separate src.py process on this machine,
+    printing overall progress until all exit, then merges their outputs.
+    Previously merged calls are skipped through the merged resume log.
+    Returns the list of shard exit codes.
+    """
+    resume_log = os.path.join(merged_dir, PROCESSED_LOG)
+    sizes, already_done = shard_sizes(sheet, shards, [resume_log], root)
+    logged_at_start = _logged_counts(shards, root)
+    procs = []
+    for index in range(shards):
+        out_dir = shard_dir(index, shards, root)
+        os.makedirs(out_dir, exist_ok=True)
+        cmd = [sys.executable, PIPELINE_SCRIPT, "--sheet", sheet, "--output", out_dir,
+               "--shard", f"{index}/{shards}", "--resume-log", resume_log]
+        log = open(os.path.join(out_dir, "run.log"), "a", encoding="utf-8")
+        procs.append((subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT), log))
+        print(f"[SHARDS] Started shard {index}/{shards} ({sizes[index]} calls, "
+              f"{already_done[index]} already processed) -> {out_dir}")
+
+    total = sum(sizes)
+    while any(proc.poll() is None for proc, _ in procs):
+        time.sleep(PROGRESS_INTERVAL_SEC)
+        print(f"[SHARDS] {format_progress(shards, sizes, already_done, logged_at_start, root)} of {total}")
+
+    codes = []
+    for index, (proc, log) in enumerate(procs):
+        log.close()
+        codes.append(proc.returncode)
+        if proc.returncode != 0:
+            print(f"[SHARDS] Shard {index}/{shards} exited with {proc.returncode} "
+                  f"(see {os.path.join(shard_dir(index, shards, root), 'run.log')})")
+
+    merge_shards(shards, root, merged_dir)
+    return codes
+
+def format_progress(shards, sizes, already_done, logged_at_start, root=SHARD_ROOT):
+    """
+    One progress line: per shard, calls skipped as already processed at start
+    plus the entries its resume log gained since then.
+    """
+    logged = _logged_counts(shards, root)
+    done = [min(already_done[i] + logged[i] - logged_at_start[i], sizes[i]) for i in range(shards)]
+    per_shard = ", ".join(f"s{i} {done[i]}/{sizes[i]}" for i in range(shards))
+    return f"{sum(done)} done, {sum(sizes) - sum(done)} remaining ({per_shard})"
+
+# =========================
+# MERGE
+# =========================
+
+def _append_new_lines(src_path, dst_path, seen):
+    if not os.path.exists(src_path):
+        return 0
+    added = 0
+    with open(src_path, encoding="utf-8") as src, open(dst_path, "a", encoding="utf-8") as dst:
+        for line in src:
+            if line.strip() and line not in seen:
+                seen.add(line)
+                dst.write(line)
+                added += 1
+    return added
+
+def _unchanged(src_path, dst_path):
+    """True if dst is a copy2 of src (same size and modification time)."""
+    if not os.path.exists(dst_path):
+        return False
+    a, b = os.stat(src_path), os.stat(dst_path)
+    return a.st_size == b.st_size and a.st_mtime_ns == b.st_mtime_ns
+
+def _read_lines(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line for line in f if line.strip()}
+
+def merge_shards(shards, root=SHARD_ROOT, merged_dir=MERGED_DIR):
+    """
+    Folds shard partitions (from this machine or copied from other hosts) into
+    merged_dir: new or changed stored results are copied in, resume and
+    duplicate logs are unioned, shard search indexes are merged into one, and
+    the reports and stats are regenerated from the merged results.
+    Safe to re-run; only new lines and changed results are added.
+    """
+    merged_results = os.path.join(merged_dir, "results")
+    os.makedirs(merged_results, exist_ok=True)
+    resume_log = os.path.join(merged_dir, PROCESSED_LOG)
+    duplicates_log = os.path.join(merged_dir, DUPLICATES_LOG)
+    resume_seen = _read_lines(resume_log)
+    duplicates_seen = _read_lines(duplicates_log)
+
+    index_db = SearchIndex(os.path.join(merged_dir, SEARCH_DB))
+    copied = logged = reindexed = 0
+    for index in range(shards):
+        part = shard_dir(index, shards, root)
+        if not os.path.isdir(part):
+            print(f"[MERGE] Shard {index}/{shards}: no output at {part}, skipped")
+            continue
+        part_results = os.path.join(part, "results")
+        for call_id in list_call_ids(part_results):
+            src_path, dst_path = result_path(call_id, part_results), result_path(call_id, merged_results)
+            if not _unchanged(src_path, dst_path):
+                shutil.copy2(src_path, dst_path)
+                copied += 1
+        logged += _append_new_lines(os.path.join(part, PROCESSED_LOG), resume_log, resume_seen)
+        _append_new_lines(os.path.join(part, DUPLICATES_LOG), duplicates_log, duplicates_seen)
+        if os.path.exists(os.path.join(part, SEARCH_DB)):
+            reindexed += index_db.merge_from(os.path.join(part, SEARCH_DB))
+    index_db.close()
+
+    summary = regenerate_reports(merged_results, merged_dir, os.path.join(merged_dir, RENDER_CACHE))
+    print(f"[MERGE] {copied} new or changed results from {shards} shards, {logged} new resume entries, "
+          f"{reindexed} search index entries, {summary['calls']} calls in merged reports")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a call sheet as N deterministic shards and merge them.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run all shards as local processes, then merge")
+    run.add_argument("sheet")
+    run.add_argument("--shards", type=int, default=os.cpu_count() or 2)
+
+    merge = sub.add_parser("merge", help="Merge shard outputs (e.g. copied back from other hosts)")
+    merge.add_argument("--shards", type=int, required=True)
+
+    progress = sub.add_parser("progress", help="Show progress of running shards")
+    progress.add_argument("sheet")
+    progress.add_argument("--shards", type=int, required=True)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        codes = run_shards(args.sheet, args.shards)
+        sys.exit(0 if all(code == 0 for code in codes) else 1)
+    elif args.command == "merge":
+        merge_shards(args.shards)
+    else:
+        # Counted from the resume logs as they are now, so nothing is added on top
+        sizes, done = shard_sizes(args.sheet, args.shards, [os.path.join(MERGED_DIR, PROCESSED_LOG)])
+        print(f"[SHARDS] {format_progress(args.shards, sizes, done, _logged_counts(args.shards))} of {sum(sizes)}")
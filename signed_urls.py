@@ -0,0 +1,119 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import time
+import requests
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qsl
+
+# =========================
+# CONFIGURATION
+# =========================
+
+URL_TOKEN_TTL_SEC = None       # Token lifetime when the URL does not say (e.g. 6 * 3600); counted from the sheet export
+EXPIRY_MARGIN_SEC = 300        # URLs expiring within this margin are refreshed before download
+REFRESH_ENDPOINT = os.getenv("RECORDING_REFRESH_URL")   # GET <endpoint>?callId=<id> -> {"url": "<fresh signed url>"}
+REFRESH_TIMEOUT = 15
+
+EXPIRY_PARAMS = ("expires", "Expires", "exp")        # Absolute expiry as epoch seconds
+EXPIRED_STATUS_CODES = {401, 403, 410}               # What the recording host returns for a stale token
+                                                     # (not 404: a missing recording must not trigger refreshes)
+
+_refresh_hook = None
+
+class URLExpiredError(ValueError):
+    """The recording host rejected the URL (HTML page or 4xx), most likely a stale token."""
+
+# =========================
+# EXPIRY
+# =========================
+
+def url_expires_at(url, issued_at=None):
+    """
+    Returns when a signed URL stops working (epoch seconds), or None if unknown.
+    Reads an explicit expiry parameter, an S3-style X-Amz-Date + X-Amz-Expires
+    pair, or falls back to issued_at + URL_TOKEN_TTL_SEC.
+    """
+    params = dict(parse_qsl(urlsplit(url).query))
+    for name in EXPIRY_PARAMS:
+        if params.get(name, "").isdigit():
+            return float(params[name])
+
+    if params.get("X-Amz-Date") and params.get("X-Amz-Expires", "").isdigit():
+        try:
+            signed = datetime.strptime(params["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+            return signed.timestamp() + int(params["X-Amz-Expires"])
+        except ValueError:
+            pass
+
+    if URL_TOKEN_TTL_SEC and issued_at:
+        return issued_at + URL_TOKEN_TTL_SEC
+    return None
+
+def with_expiry(calls, issued_at=None):
+    """Lazily sets call["expires_at"] (None when unknown) on each call as it passes through."""
+    for call in calls:
+        call["expires_at"] = url_expires_at(call["audio_url"], issued_at)
+        yield call
+
+def seconds_left(call, now=None):
+    """Seconds until the call's URL expires, or None if unknown."""
+    expires_at = call.get("expires_at")
+    if expires_at is None:
+        return None
+    return expires_at - (now or time.time())
+
+def needs_refresh(call, now=None, margin=EXPIRY_MARGIN_SEC):
+    left = seconds_left(call, now)
+    return left is not None and left < margin
+
+# =========================
+# REFRESH HOOK
+# =========================
+
+def set_refresh_hook(hook):
+    """
+    Registers hook(call_id, stale_url) -> fresh_url (or None).
+    The hook replaces the REFRESH_ENDPOINT lookup.
+    """
+    global _refresh_hook
+    _refresh_hook = hook
+
+def _refresh_from_endpoint(call_id, stale_url):
+    response = requests.get(REFRESH_ENDPOINT, params={"callId": call_id}, timeout=REFRESH_TIMEOUT)
+    if response.status_code != 200:
+        return None
+    return response.json().get("url")
+
+def refresh_url(call, reason=""):
+    """
+    Asks the refresh hook (or REFRESH_ENDPOINT) for a fresh signed URL for the call.
+    On success updates call["audio_url"] / call["expires_at"] and returns the new
+    URL; returns None when no refresh source is configured or it fails.
+    """
+    hook = _refresh_hook or (_refresh_from_endpoint if REFRESH_ENDPOINT else None)
+    if hook is None:
+        return None
+    try:
+        fresh = hook(call["call_id"], call["audio_url"])
+    except Exception as e:
+        print(f"    [REFRESH] Call {call['call_id']}: refresh failed ({e})")
+        return None
+    if not fresh:
+        return None
+
+    print(f"    [REFRESH] Call {call['call_id']}: new signed URL{f' ({reason})' if reason else ''}")
+    call["audio_url"] = fresh
+    call["expires_at"] = url_expires_at(fresh, issued_at=time.time())
+    return fresh
+
+def looks_expired(status_code, body_head):
+    """True if a download response is the host's stale-token answer rather than audio."""
+    if status_code in EXPIRED_STATUS_CODES:
+        return True
+    if status_code != 200:
+        return False
+    text = body_head[:500].decode("utf-8", errors="ignore").lower()
+    return "<html" in text or "<!doctype" in text
@@ -4,18 +4,42 @@
 
 import os
 import time
+import argparse
 import requests
-import pandas as pd
 import pytz
 import threading
 from datetime import datetime
+from itertools import chain
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 import vertexai
 from vertexai.generative_models import GenerativeModel, Part, GenerationConfig
 
-from prompts import TRANSCRIPTION_PROMPT, EXTRACT_CONTEXT_PROMPT
+from prompts import TRANSCRIPTION_PROMPT, EXTRACT_CONTEXT_PROMPT, EXTRACT_STRUCTURED_PROMPT, LONG_CALL_SEGMENT_NOTE
+from quality import TranscriptQualityAnalyzer, analyze_transcript
+from schema import CANONICAL_VARIABLES
+from table_parser import VariableTableParser, parse_variable_table
+from structured_extraction import RESPONSE_SCHEMA, decode_structured_output
+from grading import load_policy, grade_variables
+from ingestion import iter_calls
+from identity import CallDeduplicator, PROCESSED_ID_PREFIX, load_processed
+from result_store import RESULTS_DIR, save_result
+from records import CallResult
+from sharding import shard_of, parse_shard
+from lanes import FairScheduler
+from reports import render_transcript, render_summary_report, stats_record, StatsAggregator
+import search_index
+from search_index import index_result
+from memory_guard import MemoryGuard
+from hedging import Hedger
+from usage import RunUsage, usage_from_response, record_stage_usage, estimate_cost
+from scheduler import probe_calls, order_longest_first, order_for_expiry, call_duration, RunEstimator
+from signed_urls import URLExpiredError, with_expiry, needs_refresh, refresh_url, looks_expired
+from audio_preprocess import preprocess_in_pool, shutdown_pool, measure_duration, cut_segment
+from chunked_transcription import (
+    LONG_CALL_THRESHOLD_SEC, SEGMENT_WORKERS, plan_segments, stitch_transcripts
+)
 
 # =========================
 # CONFIGURATION
@@ -28,16 +52,59 @@ MODEL_NAME = "gemini-2.5-flash"
 # Processing Config
 BATCH_SIZE = 5             # Number of concurrent calls to process
 MAX_RETRIES_GEMINI = 3     # Retries for each Gemini API call
-
-EXPECTED_VARIABLES = 64    # Expected number of variables from the prompt
+SCHEDULE_LONGEST_FIRST = True  # Probe recording durations and start the longest calls first
+PREPROCESS_AUDIO = False   # Trim silence, downmix to mono and re-encode before upload (needs ffmpeg)
+LONG_CALL_MODE = True      # Transcribe calls over LONG_CALL_THRESHOLD_SEC in parallel segments (needs ffmpeg)
+STREAM_TRANSCRIPTION = True  # Stream transcripts and abort early on hallucination (see quality.py)
+STREAM_EXTRACTION = True   # Stream the variable table and parse rows as they arrive
+EXTRACTION_MODE = "table"  # "table" (pipe table prompt) or "structured" (schema-constrained JSON)
+
+EXPECTED_VARIABLES = len(CANONICAL_VARIABLES)  # 64 variables listed in the extraction prompt
+GRADING_POLICY = "five_band"  # Policy in grading_policies/ used for the grade shown next to GOOD/BAD
+CALL_METADATA_COLUMNS = {}  # Extra sheet columns carried on each call, e.g. {"agent": "agent_name", "campaign": "campaign"}
 MIN_AUDIO_SIZE = 10240     # 10KB minimum audio file size
 
+# Budget Config (None = unlimited). New calls stop starting once projected spend would exceed these.
+# A --shard i/N run gets 1/N of each, so N shards together stay within the budget.
+MAX_RUN_COST_USD = None
+MAX_RUN_TOKENS = None
+
+# Priority lanes / fair sharing across tenants (see lanes.py for the lane table)
+USE_LANES = False          # Route calls through lanes.FairScheduler instead of plain schedule order
+LANE_LOOKAHEAD = 500       # Calls buffered into the lanes ahead of the workers when streaming a sheet
+                           # (lanes only see calls inside this window; a list input is buffered whole)
+
+# Full-text search over finished calls (query with `python search_index.py search ...`)
+SEARCH_INDEX = True        # Index transcript lines and evidence quotes in output/search.db as calls finish
+MINE_PHRASES = False       # Update the phrase library (phrase_mining.py, embedding calls) after each run
+
+# Memory: results are folded into streaming stats once persisted, so only in-flight calls are held.
+# SCHEDULE_LONGEST_FIRST still lists the (small) call rows up front; turn it off for constant memory.
+MAX_RSS_MB = None          # Hold back new calls while process RSS is above this many MB (None = no ceiling)
+
+# Slow Gemini requests: a duplicate is sent once a request outlasts recent latencies (see hedging.py
+# for the percentile, hedge budget and per-request deadline)
+HEDGE_REQUESTS = True
+
 vertexai.init(project=PROJECT_ID, location=LOCATION)
 model = GenerativeModel(MODEL_NAME)
 
 # Thread lock for safe file writes
 file_write_lock = threading.Lock()
 
+# Shared keep-alive connection pool for recording downloads (reused across calls and service jobs)
+http_session = requests.Session()
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=BATCH_SIZE * 2))
+http_session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=BATCH_SIZE * 2))
+
+grading_policy = load_policy(GRADING_POLICY)
+
+# Run-level token/cost rollup and budget
+run_usage = RunUsage(max_cost_usd=MAX_RUN_COST_USD, max_tokens=MAX_RUN_TOKENS)
+
+# Learns per-stage request latencies and hedges the slow tail (None = plain blocking requests)
+hedger = Hedger() if HEDGE_REQUESTS else None
+
 # =========================
 # UTILS & HELPERS
 # =========================
@@ -47,24 +114,138 @@ def get_ist_time():
     ist = pytz.timezone('Asia/Kolkata')
     return datetime.now(ist).strftime("%Y-%m-%d %H:%M:%S IST")
 
-def call_gemini(prompt=None, parts=None):
+class TranscriptAborted(Exception):
+    """Raised when a streamed response is cancelled by an online quality check."""
+
+    def __init__(self, reason, partial_text):
+        super().__init__(reason)
+        self.reason = reason
+        self.partial_text = partial_text
+
+def _open_stream(contents, config):
+    """Starts a streamed request and waits for its first chunk. Returns (responses, first_chunk)."""
+    responses = model.generate_content(contents, generation_config=config, stream=True)
+    return responses, next(responses, None)
+
+def _close_stream(stream):
+    """Cancels a stream that lost a hedge race."""
+    close = getattr(stream[0], "close", None)
+    if close:
+        close()
+
+def _billed_tokens(response):
+    """Tokens billed so far for a response, or for an opened stream (responses, first_chunk)."""
+    if isinstance(response, tuple):
+        response = response[1]
+    return usage_from_response(response)["total_tokens"] if response is not None else 0
+
+def _send(request, stage, discard=None):
+    """
+    Runs one model request: hedged and under a deadline when HEDGE_REQUESTS is on.
+    Returns (response, abandoned duplicates). Abandoned requests are closed
+    when they return and their billed tokens show up in the hedging report.
+    """
+    if hedger is None:
+        return request(), 0
+    return hedger.run(request, stage=stage, discard=discard, usage_of=_billed_tokens)
+
+def _record_abandoned(usage, stage, winner_usage, abandoned, prompt_only=False):
+    """
+    Charges abandoned hedge duplicates to the call (and so to the run budget)
+    up front, since they may return after the call is done. They sent the
+    same prompt as the winner, so they are billed like it; a duplicate stream
+    is closed at its first chunk, so only its prompt counts. The hedger
+    reports what they were actually billed once they return.
+    """
+    for _ in range(abandoned):
+        lost = dict(winner_usage)
+        if prompt_only:
+            lost["output_tokens"] = 0
+            lost["thinking_tokens"] = 0
+            lost["total_tokens"] = lost["prompt_tokens"]
+            lost["cost_usd"] = estimate_cost(lost)
+        record_stage_usage(usage, f"{stage or 'model'}_hedge", lost)
+
+def _stream_gemini(stream, checker, stage=None, usage=None, hedge_stage=None, abandoned=0):
+    """
+    Consumes a stream opened by _open_stream, feeding every chunk to `checker`.
+    Cancels the request as soon as the checker reports a problem. With hedging
+    on, the rest of the stream is read under the hedger's idle timeout and deadline.
+    """
+    responses, first_chunk = stream
+    rest = hedger.read_stream(responses, hedge_stage) if hedger is not None else responses
+    chunks = []
+    last_chunk = None
+    try:
+        for chunk in chain([first_chunk] if first_chunk is not None else [], rest):
+            last_chunk = chunk
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # chunk without text (e.g. final metadata-only chunk)
+            chunks.append(text)
+
+            reason = checker.feed(text)
+            if reason:
+                raise TranscriptAborted(reason, "".join(chunks))
+    finally:
+        # Usage metadata is cumulative, so the last chunk seen covers the whole (partial) request
+        if last_chunk is not None:
+            response_usage = usage_from_response(last_chunk)
+            record_stage_usage(usage, stage, response_usage)
+            _record_abandoned(usage, stage, response_usage, abandoned, prompt_only=True)
+        close = getattr(rest, "close", None)
+        if close:
+            close()
+
+    return "".join(chunks).strip()
+
+def call_gemini(prompt=None, parts=None, stage=None, usage=None, stream_check=None, response_schema=None):
     """
     Calls Vertex AI with retry logic (exponential backoff).
     Returns plain text response.
+    If `usage` is a dict, token counts of every response are rolled into it under `stage`.
+    If `stream_check` is given (a factory returning a fresh checker per attempt), the
+    response is streamed and cancelled early when the checker flags it; aborted
+    attempts are retried immediately and the last one raises TranscriptAborted.
+    If `response_schema` is given, output is constrained to JSON matching it.
+    Requests that run past the stage's learned latency are hedged (see hedging.py).
     """
-    config = GenerationConfig(
-        temperature=0,
-        max_output_tokens=16384   # FIX #6: Increased from 8192
-    )
-
+    if response_schema:
+        config = GenerationConfig(
+            temperature=0,
+            max_output_tokens=16384,
+            response_mime_type="application/json",
+            response_schema=response_schema
+        )
+    else:
+        config = GenerationConfig(
+            temperature=0,
+            max_output_tokens=16384   # FIX #6: Increased from 8192
+        )
+
+    contents = parts if parts else prompt
     last_error = None
     for attempt in range(1, MAX_RETRIES_GEMINI + 1):
         try:
-            response = model.generate_content(
-                parts if parts else prompt,
-                generation_config=config
-            )
+            if stream_check:
+                # The checker is created once a stream has won, so callers' last checker is the winner's
+                hedge_stage = f"{stage or 'model'} (stream)"
+                stream, abandoned = _send(lambda: _open_stream(contents, config), hedge_stage, discard=_close_stream)
+                return _stream_gemini(stream, stream_check(), stage=stage, usage=usage,
+                                      hedge_stage=hedge_stage, abandoned=abandoned)
+
+            response, abandoned = _send(lambda: model.generate_content(contents, generation_config=config), stage)
+            response_usage = usage_from_response(response)
+            record_stage_usage(usage, stage, response_usage)
+            _record_abandoned(usage, stage, response_usage, abandoned)
             return response.text.strip()
+        except TranscriptAborted as e:
+            last_error = e
+            if attempt < MAX_RETRIES_GEMINI:
+                print(f"      [ABORT] Gemini attempt {attempt} cancelled mid-stream: {e.reason}. Retrying now...")
+            else:
+                print(f"      [FAIL] Gemini output rejected on all {MAX_RETRIES_GEMINI} attempts: {e.reason}")
         except Exception as e:
             last_error = e
             if attempt < MAX_RETRIES_GEMINI:
@@ -86,23 +267,16 @@ def download_and_validate_audio(audio_url):
     Returns (audio_bytes, mime_type) on success.
     Raises ValueError on validation failure.
     """
-    response = requests.get(audio_url, timeout=60)
+    response = http_session.get(audio_url, timeout=60)
+    audio_bytes = response.content
 
-    # FIX #3a: Check HTTP status
+    # FIX #3a/#3b: A 4xx or an HTML page instead of audio means the signed URL went stale
+    if looks_expired(response.status_code, audio_bytes):
+        raise URLExpiredError(f"HTTP {response.status_code} — server returned an error page instead of audio "
+                              f"(token may have expired)")
     if response.status_code != 200:
         raise ValueError(f"HTTP {response.status_code} — server did not return audio")
 
-    audio_bytes = response.content
-
-    # FIX #3b: Check if server returned HTML instead of audio (expired token / error page)
-    content_type = response.headers.get("Content-Type", "")
-    try:
-        first_bytes = audio_bytes[:500].decode("utf-8", errors="ignore").lower()
-        if "<html" in first_bytes or "<!doctype" in first_bytes:
-            raise ValueError(f"Server returned HTML instead of audio (token may have expired)")
-    except Exception:
-        pass  # binary data = likely actual audio, which is fine
-
     # FIX #3c: Check minimum file size
     if len(audio_bytes) < MIN_AUDIO_SIZE:
         raise ValueError(f"Audio too small ({len(audio_bytes)} bytes) — likely empty/corrupt")
@@ -113,98 +287,170 @@ def download_and_validate_audio(audio_url):
 
     return audio_bytes, mime_type
 
+def fetch_audio(call):
+    """
+    Downloads a call's audio, refreshing its signed URL first when it is about
+    to expire, and once more if the host rejects it (see signed_urls.py).
+    """
+    if needs_refresh(call):
+        refresh_url(call, reason="expiring")
+    try:
+        return download_and_validate_audio(call["audio_url"])
+    except URLExpiredError as e:
+        if not refresh_url(call, reason=str(e)):
+            raise
+        return download_and_validate_audio(call["audio_url"])
+
 # =========================
 # TRANSCRIPT QUALITY CHECK
 # =========================
 
-def check_transcript_quality(transcript):
+def check_transcript_quality(transcript, duration_sec=None):
     """
     Detects hallucinated/garbage transcripts.
-    Returns (is_good, reason).
+    Returns (is_good, reason). See quality.analyze_transcript for the structured scores.
     """
-    if not transcript or len(transcript.strip()) < 20:
-        return False, "EMPTY_TRANSCRIPT"
-
-    # Check for repetitive hallucination
-    words = transcript.split()
-    if len(words) > 20:
-        word_counts = Counter(words)
-        most_common_word, most_common_count = word_counts.most_common(1)[0]
-        repetition_ratio = most_common_count / len(words)
-        if repetition_ratio > 0.5:
-            return False, f"HALLUCINATED_REPEAT ('{most_common_word}' repeated {most_common_count}/{len(words)} times)"
-
-    # Check for diarization (must have Agent: or Customer: labels)
-    has_agent = "Agent:" in transcript or "agent:" in transcript.lower()
-    has_customer = "Customer:" in transcript or "customer:" in transcript.lower()
-    if not has_agent and not has_customer:
-        return False, "NO_DIARIZATION (no Agent:/Customer: labels found)"
-
-    return True, "OK"
+    analysis = analyze_transcript(transcript, duration_sec=duration_sec)
+    if analysis["is_good"]:
+        return True, "OK"
+    return False, "; ".join(analysis["reasons"])
 
 # =========================
 # CORE LOGIC
 # =========================
 
-def transcribe_audio(audio_url):
+def _stream_checker(duration_sec):
+    """Returns a per-attempt quality analyzer factory for streamed transcription (or None)."""
+    if not STREAM_TRANSCRIPTION:
+        return None
+    return lambda: TranscriptQualityAnalyzer(duration_sec=duration_sec)
+
+def transcribe_long_audio(audio_bytes, duration_sec, usage=None):
+    """
+    Transcribes a long recording as overlapping segments in parallel and
+    stitches them back together. Latency is bounded by segment length.
+    Raises ValueError if the audio cannot be cut.
+    """
+    segments = plan_segments(duration_sec)
+    print(f"      [LONG CALL] {duration_sec:.0f}s audio -> {len(segments)} segments")
+
+    def transcribe_segment(position, start, length):
+        segment_bytes = cut_segment(audio_bytes, start, length)
+        note = LONG_CALL_SEGMENT_NOTE.format(
+            segment=position + 1, total=len(segments), start=f"{int(start) // 60:02d}:{int(start) % 60:02d}"
+        )
+        parts = [
+            Part.from_text(TRANSCRIPTION_PROMPT + note),
+            Part.from_data(segment_bytes, mime_type="audio/mpeg")
+        ]
+        return call_gemini(parts=parts, stage="transcription", usage=usage,
+                           stream_check=_stream_checker(length))
+
+    with ThreadPoolExecutor(max_workers=SEGMENT_WORKERS) as executor:
+        futures = [
+            executor.submit(transcribe_segment, position, start, length)
+            for position, (start, length) in enumerate(segments)
+        ]
+        segment_transcripts = [f.result() for f in futures]
+
+    return stitch_transcripts(segment_transcripts)
+
+def transcribe_audio(audio_url, usage=None, audio_info=None, duration_sec=None, quality=None, call=None):
     """
     Transcribes audio URL with validation.
     Returns (transcript, error_reason).
     - On success: (transcript_text, None)
     - On failure: (None, error_description)
+    If `audio_info` is a dict, preprocessing stats (before/after duration and size) are stored in it.
+    `duration_sec` (e.g. from the probe pre-pass) decides whether long-call segmenting is used.
+    If `quality` is a dict, the transcript's structured quality scores are stored in it.
+    Passing the `call` dict lets an expiring or rejected signed URL be refreshed.
     """
+    # A duration guessed from file size (bitrate unknown) is too rough to judge transcript density by
+    density_sec = None if call and (call.get("probe") or {}).get("source") == "size" else duration_sec
     try:
         # FIX #3 + #4: Validate audio before sending
-        audio_bytes, mime_type = download_and_validate_audio(audio_url)
-
-        parts = [
-            Part.from_text(TRANSCRIPTION_PROMPT),
-            Part.from_data(audio_bytes, mime_type=mime_type)
-        ]
-        transcript = call_gemini(parts=parts)
+        audio_bytes, mime_type = fetch_audio(call) if call else download_and_validate_audio(audio_url)
+
+        # Optional: shrink the upload on the preprocessing process pool
+        if PREPROCESS_AUDIO:
+            audio_bytes, mime_type, info = preprocess_in_pool(audio_bytes)
+            if audio_info is not None:
+                audio_info.update(info)
+            duration_sec = info["processed_sec"] or duration_sec
+            density_sec = info["processed_sec"] or density_sec
+
+        transcript = None
+        if LONG_CALL_MODE and (duration_sec is None or duration_sec > LONG_CALL_THRESHOLD_SEC):
+            # Probe estimates can be rough; measure the actual audio before segmenting
+            measured_sec = measure_duration(audio_bytes)
+            density_sec = measured_sec or density_sec
+            measured = measured_sec or duration_sec
+            if measured and measured > LONG_CALL_THRESHOLD_SEC:
+                try:
+                    transcript = transcribe_long_audio(audio_bytes, measured, usage=usage)
+                except ValueError as e:
+                    print(f"      [LONG CALL] Segmenting failed ({e}); falling back to single request")
+
+        if transcript is None:
+            parts = [
+                Part.from_text(TRANSCRIPTION_PROMPT),
+                Part.from_data(audio_bytes, mime_type=mime_type)
+            ]
+            transcript = call_gemini(parts=parts, stage="transcription", usage=usage,
+                                     stream_check=_stream_checker(density_sec))
 
         # Quality check on the transcript
-        is_good, reason = check_transcript_quality(transcript)
-        if not is_good:
-            return transcript, f"BAD_TRANSCRIPT: {reason}"
+        analysis = analyze_transcript(transcript, duration_sec=density_sec)
+        if quality is not None:
+            quality.update(analysis["scores"])
+        if not analysis["is_good"]:
+            return transcript, f"BAD_TRANSCRIPT: {'; '.join(analysis['reasons'])}"
 
         return transcript, None
 
+    except TranscriptAborted as ta:
+        return ta.partial_text, f"BAD_TRANSCRIPT: {ta.reason} (aborted while streaming)"
     except ValueError as ve:
         return None, f"AUDIO_VALIDATION_FAILED: {str(ve)}"
     except Exception as e:
         return None, f"TRANSCRIPTION_ERROR: {str(e)}"
 
-def extract_variable_analysis(transcript):
+def extract_variable_analysis(transcript, usage=None, parse_info=None, mode=None):
     """
     Extracts variables by parsing the TEXT TABLE returned by the prompt.
     Does NOT rely on JSON.
+    Rows are validated against the canonical schema (see table_parser.py); if
+    `parse_info` is a dict, missing/unknown/duplicate/invalid rows are reported in it.
+    With mode="structured" (default: EXTRACTION_MODE) the model instead returns
+    schema-constrained JSON that is decoded straight into rows.
     """
-    prompt = EXTRACT_CONTEXT_PROMPT + "\n\nTRANSCRIPT:\n" + transcript
-    raw_text = call_gemini(prompt=prompt)
-
-    variables = []
+    mode = mode or EXTRACTION_MODE
 
-    # Parse the pipe-separated table
-    lines = raw_text.splitlines()
-    for line in lines:
-        if "|" not in line:
-            continue
+    if mode == "structured":
+        prompt = EXTRACT_STRUCTURED_PROMPT + "\n\nTRANSCRIPT:\n" + transcript
+        raw_text = call_gemini(prompt=prompt, stage="extraction", usage=usage, response_schema=RESPONSE_SCHEMA)
+        parsed = decode_structured_output(raw_text)
+    elif STREAM_EXTRACTION:
+        prompt = EXTRACT_CONTEXT_PROMPT + "\n\nTRANSCRIPT:\n" + transcript
+        # Parse rows as they stream in; each retry gets a fresh parser, the last one wins
+        parsers = []
 
-        # Remove outer pipes and split
-        cols = [c.strip() for c in line.strip("|").split("|")]
+        def new_parser():
+            parsers.append(VariableTableParser())
+            return parsers[-1]
 
-        # Skip header or malformed lines
-        if len(cols) < 3 or cols[0].lower() == "variable" or "---" in cols[0]:
-            continue
+        call_gemini(prompt=prompt, stage="extraction", usage=usage, stream_check=new_parser)
+        parsed = parsers[-1].finish()
+    else:
+        prompt = EXTRACT_CONTEXT_PROMPT + "\n\nTRANSCRIPT:\n" + transcript
+        raw_text = call_gemini(prompt=prompt, stage="extraction", usage=usage)
+        parsed = parse_variable_table(raw_text)
 
-        variables.append({
-            "variable": cols[0],
-            "status": cols[1],
-            "evidence": cols[2] if len(cols) > 2 else "NA"
-        })
+    if parse_info is not None:
+        parse_info.update({k: v for k, v in parsed.items() if k != "variables"})
 
-    return variables
+    return parsed["variables"]
 
 def compute_summary(variables):
     """Calculates scores based on extracted variables, excluding 'Not Present'."""
@@ -240,13 +486,18 @@ def compute_summary(variables):
 def process_call(call):
     """
     Process a single call through the full pipeline.
-    Returns result dict with status information.
+    Returns a records.CallResult with status information.
     """
     timestamp = get_ist_time()
     print(f"  [{timestamp}] Processing Call {call['index']}...")
+    call_usage = {}
+    audio_info = {}
+    quality = {}
+    parse_info = {}
 
     # Step 1: Transcribe
-    transcript, error_reason = transcribe_audio(call["audio_url"])
+    transcript, error_reason = transcribe_audio(call["audio_url"], usage=call_usage, audio_info=audio_info,
+                                                duration_sec=call_duration(call), quality=quality, call=call)
 
     # FIX #2: Don't pass errors forward silently
     if error_reason:
@@ -255,61 +506,35 @@ def process_call(call):
         # If we got a bad transcript (hallucination), still save it for reference
         saved_transcript = transcript if transcript else f"[FAILED] {error_reason}"
 
-        return {
-            "index": call["index"],
-            "url": call["audio_url"],
-            "timestamp": timestamp,
-            "transcript": saved_transcript,
-            "variables": [],
-            "summary": {"counts": {}, "excellent_percentage": 0, "call_type": "ERROR",
-                         "total_possible": 0, "considered": 0},
-            "error": error_reason,
-            "is_complete": False
-        }
+        return CallResult.failed(call, timestamp, saved_transcript, error_reason,
+                                 usage=call_usage, audio=audio_info, quality=quality)
 
     # Step 2: Extract variables
     try:
-        variables = extract_variable_analysis(transcript)
+        variables = extract_variable_analysis(transcript, usage=call_usage, parse_info=parse_info)
     except Exception as e:
         print(f"    [WARN] Call {call['index']}: Variable extraction failed: {e}")
-        return {
-            "index": call["index"],
-            "url": call["audio_url"],
-            "timestamp": timestamp,
-            "transcript": transcript,
-            "variables": [],
-            "summary": {"counts": {}, "excellent_percentage": 0, "call_type": "ERROR",
-                         "total_possible": 0, "considered": 0},
-            "error": f"VARIABLE_EXTRACTION_FAILED: {str(e)}",
-            "is_complete": False
-        }
+        return CallResult.failed(call, timestamp, transcript, f"VARIABLE_EXTRACTION_FAILED: {str(e)}",
+                                 usage=call_usage, audio=audio_info, quality=quality)
 
     # Step 3: Compute summary
     summary = compute_summary(variables)
+    summary["grade"] = grade_variables(variables, grading_policy)
 
     # Check completeness
     is_complete = len(variables) >= EXPECTED_VARIABLES
     if not is_complete:
         print(f"    [WARN] Call {call['index']}: Only {len(variables)}/{EXPECTED_VARIABLES} variables extracted")
+    if parse_info.get("unknown_variables") or parse_info.get("invalid_statuses") or parse_info.get("duplicates"):
+        print(f"    [WARN] Call {call['index']}: Dropped {len(parse_info['unknown_variables'])} unknown, "
+              f"{len(parse_info['invalid_statuses'])} invalid-status and {len(parse_info['duplicates'])} duplicate rows")
 
-    return {
-        "index": call["index"],
-        "url": call["audio_url"],
-        "timestamp": timestamp,
-        "transcript": transcript,
-        "variables": variables,
-        "summary": summary,
-        "error": None,
-        "is_complete": is_complete
-    }
+    return CallResult.from_call(call, timestamp, transcript, variables, summary, is_complete=is_complete,
+                                usage=call_usage, audio=audio_info, quality=quality, parse=parse_info)
 
-def load_calls(excel_path):
-    df = pd.read_excel(excel_path)
-    return [
-        {"index": i + 1, "audio_url": url}
-        for i, url in enumerate(df["recording_url"])
-        if pd.notna(url)
-    ]
+def load_calls(sheet_path):
+    """Loads every call from an .xlsx/.csv/.jsonl sheet (see ingestion.iter_calls for streaming)."""
+    return list(iter_calls(sheet_path, column_map=CALL_METADATA_COLUMNS))
 
 # =========================
 # THREAD-SAFE FILE WRITERS
@@ -317,87 +542,65 @@ def load_calls(excel_path):
 
 def save_transcript(r, filepath):
     """Append a single transcript to the transcripts file (thread-safe)."""
+    block = render_transcript(r)
     with file_write_lock:
         with open(filepath, "a", encoding="utf-8") as f:
-            f.write(f"{'#'*40}\n")
-            f.write(f"CALL INDEX: {r['index']}\n")
-            f.write(f"{'#'*40}\n")
-            f.write(f"CALL METADATA\n")
-            f.write(f"==========================\n")
-            f.write(f"Timestamp  : {r['timestamp']}\n")
-            f.write(f"Audio URL  : {r['url']}\n")
-            f.write(f"Result     : {r['summary']['call_type']} ({r['summary']['excellent_percentage']}%)\n")
-            if r.get("error"):
-                f.write(f"Error      : {r['error']}\n")
-            f.write(f"==========================\n\n")
-            f.write(f"TRANSCRIPT\n")
-            f.write(f"--------------------------\n")
-            f.write(r['transcript'])
-            f.write(f"\n--------------------------\n")
-            f.write(f"End of Transcript for Call {r['index']}\n\n")
-            f.write(f"{'='*80}\n\n")
+            f.write(block)
+    if SEARCH_INDEX:
+        index_result(r, "transcript")
 
 def save_summary_report(r, filepath):
     """Append a single summary report (thread-safe)."""
+    block = render_summary_report(r)
     with file_write_lock:
         with open(filepath, "a", encoding="utf-8") as f:
-            f.write(f"\n{'='*80}\n")
-            f.write(f"CALL {r['index']} ANALYSIS REPORT\n")
-            f.write(f"{'='*80}\n")
-            f.write(f"Time (IST) : {r['timestamp']}\n")
-            f.write(f"URL        : {r['url']}\n")
-            f.write(f"Result     : {r['summary']['call_type']} ({r['summary']['excellent_percentage']}%)\n")
-            if r.get("error"):
-                f.write(f"Error      : {r['error']}\n")
-            f.write("\n")
-
-            header = f"| {'Variable':<40} | {'Status':<20} | {'Evidence'} |\n"
-            divider = f"|{'-'*42}|{'-'*22}|{'-'*50}|\n"
-
-            f.write(divider)
-            f.write(header)
-            f.write(divider)
-
-            for v in r["variables"]:
-                evidence = str(v.get('evidence', 'NA')).replace('\n', ' ')
-                variable = str(v.get('variable', 'Unknown'))
-                status = str(v.get('status', 'Unknown'))
-                f.write(f"| {variable:<40} | {status:<20} | {evidence}\n")
-
-            f.write(divider)
-
-            # Metrics
-            summary = r['summary']
-            counts = summary['counts']
-
-            f.write(f"\nSCORING METRICS:\n")
-            f.write(f"{'-'*20}\n")
-            f.write(f"Total Variables        : {summary['total_possible']}\n")
-            f.write(f"Not Present            : {counts.get('Not Present', 0)}\n")
-            f.write(f"Total Evaluated (Net)  : {summary['considered']}\n")
-            f.write(f"{'-'*20}\n")
-            f.write(f"Excellent              : {counts.get('Excellent', 0)}\n")
-            f.write(f"Moderate               : {counts.get('Moderate', 0)}\n")
-            f.write(f"Needs Improvement      : {counts.get('Needs Improvement', 0)}\n")
-            f.write(f"{'-'*20}\n")
-            f.write(f"Final Percentage Score : {summary['excellent_percentage']}%\n")
-            f.write(f"Call Classification    : {summary['call_type']}\n")
-            f.write(f"\n\n")
-
-def mark_processed(index, filepath):
-    """Mark a call index as processed (thread-safe)."""
+            f.write(block)
+    if SEARCH_INDEX:
+        index_result(r, "evidence")
+
+def mark_processed(call_id, filepath):
+    """Mark a call ID as processed (thread-safe)."""
     with file_write_lock:
         with open(filepath, "a") as f:
-            f.write(f"{index}\n")
+            f.write(f"{PROCESSED_ID_PREFIX}{call_id}\n")
 
 # =========================
 # BATCH PROCESSOR
 # =========================
 
-def process_batch(calls_batch, transcript_file, summary_file, log_file):
+def collect_result(future, call, transcript_file, summary_file, log_file, results_dir=RESULTS_DIR, aggregator=None):
+    """
+    Saves a finished call's result (thread-safe writers) and returns its CallResult.
+    The record is serialized once and the dict shared by the writers and, when
+    given, the reports.StatsAggregator. A crashed worker is turned into an ERROR result.
+    """
+    try:
+        r = future.result()
+        run_usage.record_call(r.call_id, r.usage)
+
+        # Immediately save results (thread-safe); the stored result lets reports.py re-render later
+        data = r.to_dict()
+        save_result(data, results_dir)
+        save_transcript(data, transcript_file)
+        save_summary_report(data, summary_file)
+        mark_processed(r.call_id, log_file)
+
+        status = "✓" if r.is_complete else f"⚠ ({r.error or 'INCOMPLETE'})"
+        print(f"  Call {r.index} completed {status}")
+
+    except Exception as e:
+        print(f"  [FATAL] Call {call['index']} crashed: {e}")
+        r = CallResult.failed(call, get_ist_time(), f"[CRASHED] {str(e)}", f"CRASH: {str(e)}")
+        data = r.to_dict()
+
+    if aggregator is not None:
+        aggregator.add(stats_record(data))
+    return r
+
+def process_batch(calls_batch, transcript_file, summary_file, log_file, results_dir=RESULTS_DIR):
     """
     Process a batch of calls concurrently using ThreadPoolExecutor.
-    Returns list of result dicts.
+    Returns list of CallResult records.
     """
     results = []
 
@@ -409,32 +612,99 @@ def process_batch(calls_batch, transcript_file, summary_file, log_file):
 
         for future in as_completed(future_to_call):
             call = future_to_call[future]
-            try:
-                r = future.result()
-
-                # Immediately save results (thread-safe)
-                save_transcript(r, transcript_file)
-                save_summary_report(r, summary_file)
-                mark_processed(r['index'], log_file)
-
-                status = "✓" if r['is_complete'] else f"⚠ ({r.get('error', 'INCOMPLETE')})"
-                print(f"  Call {r['index']} completed {status}")
-
-                results.append(r)
-
-            except Exception as e:
-                print(f"  [FATAL] Call {call['index']} crashed: {e}")
-                results.append({
-                    "index": call["index"],
-                    "url": call["audio_url"],
-                    "timestamp": get_ist_time(),
-                    "transcript": f"[CRASHED] {str(e)}",
-                    "variables": [],
-                    "summary": {"counts": {}, "excellent_percentage": 0, "call_type": "ERROR",
-                                "total_possible": 0, "considered": 0},
-                    "error": f"CRASH: {str(e)}",
-                    "is_complete": False
-                })
+            results.append(collect_result(future, call, transcript_file, summary_file, log_file, results_dir))
+
+    return results
+
+def process_queue(calls, transcript_file, summary_file, log_file, max_workers=BATCH_SIZE, estimator=None,
+                  results_dir=RESULTS_DIR, scheduler=None, aggregator=None, keep_results=True, memory_guard=None):
+    """
+    Process calls through a fixed pool of workers in the given order.
+    Unlike process_batch there is no barrier between batches: a new call starts
+    as soon as a worker frees up, so an LPT-ordered list keeps every worker busy.
+    `calls` may also be a lazy iterator (e.g. ingestion.iter_calls), in which
+    case work starts as soon as the first row is read.
+    With a lanes.FairScheduler, calls are buffered into its priority lanes
+    (all of a list, LANE_LOOKAHEAD at a time from an iterator) and it picks
+    which call each free worker starts; a lane's calls further down a streamed sheet are not seen until the window
+    reaches them, so its bounded wait only holds within the window.
+    Stops starting new calls once the run budget would be exceeded.
+    For constant memory, pass a reports.StatsAggregator and keep_results=False:
+    each result is folded into the aggregator once it is persisted and then
+    dropped. A memory_guard.MemoryGuard holds back new calls while RSS is over
+    its ceiling.
+    Returns list of CallResult records (empty when keep_results is False).
+    """
+    results = []
+    finished = 0
+    total = len(calls) if hasattr(calls, "__len__") else None
+    pending = iter(calls)
+    submitted = 0
+    source_done = False
+    stopped = False
+    in_flight = {}
+    if estimator and total is not None:
+        estimator.plan(calls)
+    # A list is already in memory, so the lanes see all of it; a stream is buffered a window at a time
+    lookahead = LANE_LOOKAHEAD if total is None else max(total, 1)
+
+    def next_call():
+        nonlocal source_done
+        if scheduler is None:
+            call = next(pending, None)
+            source_done = call is None
+            return call
+        while not source_done and scheduler.pending() < lookahead:
+            call = next(pending, None)
+            if call is None:
+                source_done = True
+            else:
+                scheduler.add(call)
+        return scheduler.next_call()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # Fill free worker slots in schedule order
+            while not stopped and len(in_flight) < max_workers:
+                if memory_guard and not memory_guard.admit(len(in_flight)):
+                    break
+                if run_usage.calls_within_budget(len(in_flight) + 1) <= len(in_flight):
+                    left = f"{total - submitted} remaining" if total is not None else "remaining"
+                    print(f"\n[BUDGET] Run budget reached — not starting {left} calls.")
+                    stopped = True
+                    break
+                call = next_call()
+                if call is None:
+                    break
+                submitted += 1
+                in_flight[executor.submit(process_call, call)] = (call, time.time())
+
+            # Nothing running means nothing was startable: the queue is drained (or the budget hit)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                call, started = in_flight.pop(future)
+                if scheduler:
+                    scheduler.finished(call)
+                r = collect_result(future, call, transcript_file, summary_file, log_file, results_dir, aggregator)
+                finished += 1
+                if keep_results:
+                    results.append(r)
+
+                if estimator:
+                    estimator.record(call, time.time() - started)
+                    if total is None:
+                        print(f"  Progress: {finished} done")
+                        continue
+                    eta = estimator.estimate_remaining()
+                    if eta is not None:
+                        print(f"  Progress: {finished}/{total} done, ETA ~{eta / 60:.1f} min")
+
+    if scheduler is not None and not stopped and scheduler.pending():
+        raise RuntimeError(f"{scheduler.pending()} queued calls could never start: "
+                           f"no lane had a free slot (check lanes.LANES reservations against max_workers)")
 
     return results
 
@@ -444,9 +714,18 @@ def process_batch(calls_batch, transcript_file, summary_file, log_file):
 
 if __name__ == "__main__":
 
-    # Input/Output Config
-    INPUT_EXCEL = "calls_4.xlsx"
-    OUTPUT_DIR = "output"
+    # Input/Output Config (overridable so sharding.py can run one partition per process or host)
+    parser = argparse.ArgumentParser(description="Transcribe and score a sheet of sales calls.")
+    parser.add_argument("--sheet", default="calls_4.xlsx", help=".xlsx, .csv or .jsonl call sheet")
+    parser.add_argument("--output", default="output", help="Output directory")
+    parser.add_argument("--shard", help="Only process shard i/N of the sheet (by call ID)")
+    parser.add_argument("--resume-log", action="append", default=[],
+                        help="Extra processed-calls log to skip (e.g. the merged log of earlier sharded runs)")
+    args = parser.parse_args()
+
+    INPUT_EXCEL = args.sheet
+    OUTPUT_DIR = args.output
+    SHARD = parse_shard(args.shard) if args.shard else None
     TRANSCRIPT_DIR = f"{OUTPUT_DIR}/transcripts"
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -456,54 +735,96 @@ if __name__ == "__main__":
     SUMMARY_REPORT = f"{OUTPUT_DIR}/summary_reportcalls.txt"
     ALL_TRANSCRIPTS_FILE = f"{OUTPUT_DIR}/call_transcripts.txt"
     PROCESSED_LOG_FILE = f"{OUTPUT_DIR}/processed_calls_log.txt"
+    DUPLICATES_LOG_FILE = f"{OUTPUT_DIR}/duplicate_calls_log.txt"
+    CALL_RESULTS_DIR = f"{OUTPUT_DIR}/results"
 
-    calls = load_calls(INPUT_EXCEL)
+    # Each output directory (so each shard) keeps its own search index; sharding.py merges them
+    search_index.DB_PATH = f"{OUTPUT_DIR}/search.db"
+    if SHARD:
+        if run_usage.max_cost_usd is not None:
+            run_usage.max_cost_usd /= SHARD[1]
+        if run_usage.max_tokens is not None:
+            run_usage.max_tokens /= SHARD[1]
 
     # ---------------------------------------------------------
     # RESUME LOGIC: Filter out calls that are already done
     # ---------------------------------------------------------
-    processed_indices = set()
-    if os.path.exists(PROCESSED_LOG_FILE):
-        with open(PROCESSED_LOG_FILE, "r") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        processed_indices.add(int(line.strip()))
-                    except ValueError:
-                        continue
-
-    print(f"Total calls in Sheet  : {len(calls)}")
-    print(f"Already processed     : {len(processed_indices)}")
+    # The log holds call IDs; older logs hold sheet row indices, which are still honoured
+    processed_ids, processed_indices = load_processed([PROCESSED_LOG_FILE] + args.resume_log)
 
-    calls_to_process = [c for c in calls if c["index"] not in processed_indices]
-    print(f"Remaining to process  : {len(calls_to_process)}\n")
+    print(f"Already processed     : {len(processed_ids) + len(processed_indices)}")
 
-    if not calls_to_process:
-        print("All calls have been processed. Exiting.")
-        exit()
+    # Rows are read lazily; only longest-first scheduling needs the whole sheet up front.
+    # Recordings already processed (or repeated in this sheet) are linked in the duplicates log
+    dedup = CallDeduplicator(processed_ids, duplicates_log=DUPLICATES_LOG_FILE, source=INPUT_EXCEL)
+    calls_to_process = with_expiry(dedup.filter(
+        c for c in iter_calls(INPUT_EXCEL, column_map=CALL_METADATA_COLUMNS)
+        if c["index"] not in processed_indices
+        and (SHARD is None or shard_of(c["call_id"], SHARD[1]) == SHARD[0])
+    ), issued_at=os.path.getmtime(INPUT_EXCEL))
 
     # ---------------------------------------------------------
-    # PASS 1: Main processing in batches
+    # PRE-PASS: Probe durations and order longest-first
     # ---------------------------------------------------------
-    print(f"{'='*60}")
-    print(f"PASS 1: Processing {len(calls_to_process)} calls (batch size: {BATCH_SIZE})")
-    print(f"{'='*60}\n")
+    if SCHEDULE_LONGEST_FIRST:
+        calls_to_process = list(calls_to_process)
+        print(f"Duplicates skipped    : {dedup.duplicates}")
+        print(f"Remaining to process  : {len(calls_to_process)}\n")
 
-    all_results = []
+        if not calls_to_process:
+            print("All calls have been processed. Exiting.")
+            exit()
 
-    # Split into batches
-    for batch_start in range(0, len(calls_to_process), BATCH_SIZE):
-        batch = calls_to_process[batch_start:batch_start + BATCH_SIZE]
-        batch_num = (batch_start // BATCH_SIZE) + 1
-        total_batches = (len(calls_to_process) + BATCH_SIZE - 1) // BATCH_SIZE
+        print(f"Probing {len(calls_to_process)} recordings for duration...")
+        probe_calls(calls_to_process)
+        calls_to_process = order_longest_first(calls_to_process)
 
-        print(f"\n--- Batch {batch_num}/{total_batches} (Calls: {[c['index'] for c in batch]}) ---")
+        # Calls whose signed URL would expire before their turn go first
+        calls_to_process, at_risk = order_for_expiry(calls_to_process, workers=BATCH_SIZE)
+        if at_risk:
+            print(f"Expiring URLs         : {at_risk} calls moved ahead of their turn")
 
-        batch_results = process_batch(batch, ALL_TRANSCRIPTS_FILE, SUMMARY_REPORT, PROCESSED_LOG_FILE)
-        all_results.extend(batch_results)
+        probed = [call_duration(c) for c in calls_to_process if call_duration(c)]
+        print(f"Probed durations      : {len(probed)}/{len(calls_to_process)} "
+              f"({sum(probed) / 60:.1f} audio minutes)\n")
 
     # ---------------------------------------------------------
+    # PASS 1: Main processing
+    # ---------------------------------------------------------
+    print(f"{'='*60}")
+    if SCHEDULE_LONGEST_FIRST:
+        print(f"PASS 1: Processing {len(calls_to_process)} calls (workers: {BATCH_SIZE})")
+    else:
+        print(f"PASS 1: Streaming calls from {INPUT_EXCEL} (workers: {BATCH_SIZE})")
+    if SHARD:
+        print(f"Shard {SHARD[0]}/{SHARD[1]} of {INPUT_EXCEL} -> {OUTPUT_DIR}")
+    print(f"{'='*60}\n")
 
+    estimator = RunEstimator(workers=BATCH_SIZE)
+    lane_scheduler = FairScheduler(max_workers=BATCH_SIZE) if USE_LANES else None
+    memory_guard = MemoryGuard(MAX_RSS_MB)
+    run_stats = StatsAggregator()
+    process_queue(calls_to_process, ALL_TRANSCRIPTS_FILE, SUMMARY_REPORT, PROCESSED_LOG_FILE,
+                  estimator=estimator, results_dir=CALL_RESULTS_DIR, scheduler=lane_scheduler,
+                  aggregator=run_stats, keep_results=False, memory_guard=memory_guard)
+    lane_lines = lane_scheduler.wait_report() if lane_scheduler else []
+    if lane_lines:
+        print("\nLANE QUEUE WAITS")
+        for line in lane_lines:
+            print(f"  {line}")
+
+    if PREPROCESS_AUDIO:
+        shutdown_pool()
+        if run_stats.audio_calls:
+            print(f"\nPreprocessing: {run_stats.audio_original_sec / 60:.1f} -> "
+                  f"{run_stats.audio_processed_sec / 60:.1f} audio minutes across {run_stats.audio_calls} calls")
+
+    if not SCHEDULE_LONGEST_FIRST and dedup.duplicates:
+        print(f"\nDuplicate recordings skipped: {dedup.duplicates} (linked in {DUPLICATES_LOG_FILE})")
+
+    rate = estimator.seconds_per_audio_minute()
+    if rate is not None:
+        print(f"\nObserved throughput: {rate:.1f}s processing per audio-minute")
 
     # ---------------------------------------------------------
     # FINAL SUMMARY
@@ -512,12 +833,13 @@ if __name__ == "__main__":
     print("PIPELINE COMPLETE — FINAL SUMMARY")
     print(f"{'='*60}")
 
-    total = len(all_results)
-    good = sum(1 for r in all_results if r['summary']['call_type'] == 'GOOD')
-    bad = sum(1 for r in all_results if r['summary']['call_type'] == 'BAD')
-    errors = sum(1 for r in all_results if r['summary']['call_type'] == 'ERROR')
-    complete = sum(1 for r in all_results if r['is_complete'])
-    incomplete = sum(1 for r in all_results if not r['is_complete'] and r['summary']['call_type'] != 'ERROR')
+    # Built from streaming aggregates: no per-call result is held for the summary
+    total = run_stats.score_count
+    good = run_stats.types.get("GOOD", 0)
+    bad = run_stats.types.get("BAD", 0)
+    errors = run_stats.types.get("ERROR", 0)
+    complete = run_stats.complete
+    incomplete = run_stats.incomplete
 
     print(f"Total Processed  : {total}")
     print(f"GOOD Calls       : {good}")
@@ -527,32 +849,52 @@ if __name__ == "__main__":
     print(f"Incomplete       : {incomplete}")
 
     if errors > 0:
-        print(f"\n⚠ ERROR Calls (could not be fixed after {RETRY_ROUNDS} retry rounds):")
-        for r in all_results:
-            if r['summary']['call_type'] == 'ERROR':
-                print(f"  - Call {r['index']}: {r.get('error', 'Unknown error')}")
+        print(f"\n⚠ ERROR Calls (failed after {MAX_RETRIES_GEMINI} Gemini attempts):")
+        for call_id, error in run_stats.errors:
+            print(f"  - Call {call_id}: {error}")
+        if errors > len(run_stats.errors):
+            print(f"  ... and {errors - len(run_stats.errors)} more")
 
     if incomplete > 0:
         print(f"\n⚠ Incomplete Calls (fewer than {EXPECTED_VARIABLES} variables):")
-        for r in all_results:
-            if not r['is_complete'] and r['summary']['call_type'] != 'ERROR':
-                print(f"  - Call {r['index']}: {r['summary']['total_possible']} variables extracted")
+        for call_id, extracted in run_stats.incomplete_calls:
+            print(f"  - Call {call_id}: {extracted} variables extracted")
+        if incomplete > len(run_stats.incomplete_calls):
+            print(f"  ... and {incomplete - len(run_stats.incomplete_calls)} more")
 
     # Save final stats
-    scores = [r['summary']['excellent_percentage'] for r in all_results]
-    avg_score = round(sum(scores) / len(scores), 2) if scores else 0
-
+    avg_score = run_stats.average_score()
     stats_file = f"{OUTPUT_DIR}/summary_stats.txt"
-    with open(stats_file, "w") as f:
-        f.write(f"Good Calls: {good}\n")
-        f.write(f"Bad Calls: {bad}\n")
-        f.write(f"Error Calls: {errors}\n")
-        f.write(f"Complete Calls (64 vars): {complete}\n")
-        f.write(f"Incomplete Calls: {incomplete}\n")
-        f.write(f"Final Scores: {scores}\n")
-        f.write(f"Average Final Percentage Score: {avg_score}%\n")
-        f.write(f"Total Scores Count: {len(scores)}\n")
+    usage_lines = run_usage.format_report()
+    run_stats.write(stats_file, usage_lines=usage_lines)
+    with open(stats_file, "a") as f:
+        if lane_lines:
+            f.write("\n#Lanes\n")
+            for line in lane_lines:
+                f.write(f"{line}\n")
+        f.write("\n#Memory\n")
+        for line in memory_guard.report():
+            f.write(f"{line}\n")
+        if hedger:
+            f.write("\n#Hedging\n")
+            for line in hedger.report():
+                f.write(f"{line}\n")
 
     print(f"\nAverage Score    : {avg_score}%")
+    print("\nUSAGE")
+    for line in usage_lines:
+        print(f"  {line}")
+    print("\nMEMORY")
+    for line in memory_guard.report():
+        print(f"  {line}")
+    if hedger:
+        print("\nHEDGING")
+        for line in hedger.report():
+            print(f"  {line}")
+    if MINE_PHRASES:
+        from phrase_mining import update_library
+        print("\nPHRASE LIBRARY")
+        update_library(CALL_RESULTS_DIR)
+
     print(f"\nResults saved to: {OUTPUT_DIR}/")
     print("Pipeline completed successfully!")
\ No newline at end of file
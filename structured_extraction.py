@@ -0,0 +1,74 @@
+# =========================
+# IMPORTS
+# =========================
+
+import json
+
+from schema import CANONICAL_VARIABLES, STATUSES, normalize_status
+
+# =========================
+# RESPONSE SCHEMA
+# =========================
+
+def build_response_schema():
+    """
+    Builds the constrained-output schema: one required key per canonical
+    variable, each an object with an enum status and a free-text evidence quote.
+    """
+    row = {
+        "type": "object",
+        "properties": {
+            "status": {"type": "string", "enum": STATUSES},
+            "evidence": {"type": "string"},
+        },
+        "required": ["status", "evidence"],
+    }
+    return {
+        "type": "object",
+        "properties": {name: row for name in CANONICAL_VARIABLES},
+        "required": list(CANONICAL_VARIABLES),
+    }
+
+RESPONSE_SCHEMA = build_response_schema()
+
+# =========================
+# DECODING
+# =========================
+
+def decode_structured_output(text):
+    """
+    Decodes a structured extraction response straight into variable rows.
+    Returns the same dict shape as table_parser.parse_variable_table, so both
+    extraction modes are interchangeable downstream.
+    Raises ValueError if the response is not a JSON object.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Structured output is not valid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"Structured output is a {type(data).__name__}, expected an object")
+
+    variables = []
+    missing = []
+    invalid = []
+    for name in CANONICAL_VARIABLES:
+        row = data.get(name)
+        if not isinstance(row, dict):
+            missing.append(name)
+            continue
+        status = normalize_status(str(row.get("status", "")))
+        if status is None:
+            invalid.append((name, str(row.get("status"))))
+            missing.append(name)
+            continue
+        evidence = str(row.get("evidence") or "NA").replace("\n", " ").strip() or "NA"
+        variables.append({"variable": name, "status": status, "evidence": evidence})
+
+    return {
+        "variables": variables,
+        "missing_variables": missing,
+        "unknown_variables": [key for key in data if key not in RESPONSE_SCHEMA["properties"]],
+        "invalid_statuses": invalid,
+        "duplicates": [],
+    }
@@ -0,0 +1,163 @@
+# =========================
+# IMPORTS
+# =========================
+
+import sys
+import json
+import time
+import hmac
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import signed_urls
+from signed_urls import with_expiry
+from scheduler import order_for_expiry
+
+# =========================
+# CONFIGURATION
+# =========================
+
+HOST = "127.0.0.1"
+PORT = 8765
+TOKEN_TTL_SEC = 60             # Lifetime of URLs signed by the stub
+SECRET = b"stub-secret"
+EXPIRED_MODE = "html"          # "html" (200 + login page, like the real host) or "403"
+STUB_FRAMES = 40               # ~1 s of 128 kbps MP3, above MIN_AUDIO_SIZE
+
+# One MPEG-1 Layer III frame (128 kbps, 44.1 kHz): 4-byte header + zero payload
+_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+# =========================
+# SIGNED URLS
+# =========================
+
+def _token(call_id, expires):
+    return hmac.new(SECRET, f"{call_id}:{expires}".encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+def signed_url(call_id, ttl=TOKEN_TTL_SEC, host=HOST, port=PORT):
+    """A recording URL in the same shape as the real host's, plus an explicit expiry."""
+    expires = int(time.time() + ttl)
+    query = urlencode({"callId": call_id, "type": "rec", "token": _token(call_id, expires), "expires": expires})
+    return f"http://{host}:{port}/file/recording?{query}"
+
+# =========================
+# SERVER
+# =========================
+
+class StubRecordingHandler(BaseHTTPRequestHandler):
+    """
+    /file/recording?callId=&token=&expires=  -> MP3 bytes, or the stale-token answer
+    /refresh?callId=                         -> {"url": <freshly signed URL>}
+    """
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        self.server.hits[parts.path] = self.server.hits.get(parts.path, 0) + 1
+
+        if parts.path == "/refresh":
+            host, port = self.server.server_address
+            return self._send(200, "application/json",
+                              json.dumps({"url": signed_url(params.get("callId", ""), host=host, port=port)}).encode())
+
+        if parts.path != "/file/recording":
+            return self._send(404, "text/plain", b"not found")
+
+        expires = params.get("expires", "0")
+        valid = (
+            expires.isdigit() and int(expires) > time.time()
+            and hmac.compare_digest(params.get("token", ""), _token(params.get("callId", ""), expires))
+        )
+        if valid:
+            return self._send(200, "audio/mpeg", _FRAME * STUB_FRAMES)
+        if EXPIRED_MODE == "403":
+            return self._send(403, "text/plain", b"token expired")
+        return self._send(200, "text/html", b"<!DOCTYPE html><html><body>Session expired. Please log in.</body></html>")
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(host=HOST, port=PORT):
+    """Starts the stub in a daemon thread. Returns the server (server.shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), StubRecordingHandler)
+    server.hits = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# =========================
+# SELF-CHECK
+# =========================
+
+def run_selfcheck(port):
+    """
+    Exercises expiry parsing, expiry-aware ordering, refresh-before-download and
+    refresh-on-reject against the stub, through the pipeline's own
+    src.fetch_audio / download_and_validate_audio (so it needs src's imports).
+    """
+    from src import fetch_audio
+
+    server = start_server(port=port)
+    signed_urls.REFRESH_ENDPOINT = f"http://{HOST}:{port}/refresh"
+    try:
+        calls = list(with_expiry([
+            {"index": 1, "call_id": "fresh", "audio_url": signed_url("fresh", ttl=3600, port=port)},
+            {"index": 2, "call_id": "soon", "audio_url": signed_url("soon", ttl=120, port=port)},
+            {"index": 3, "call_id": "stale", "audio_url": signed_url("stale", ttl=-10, port=port)},
+        ]))
+
+        ordered, at_risk = order_for_expiry(calls, workers=1, seconds_per_call=90)
+        print(f"[STUB] Order by expiry risk: {[c['call_id'] for c in ordered]} ({at_risk} at risk)")
+
+        # Hide the stale URL's expiry so it is only caught when the host rejects it
+        calls[2]["expires_at"] = None
+        for call in calls:
+            refreshes = server.hits.get("/refresh", 0)
+            audio, _ = fetch_audio(call)
+            refreshed = server.hits.get("/refresh", 0) - refreshes
+            print(f"[STUB] {call['call_id']:<6} -> {len(audio)} bytes"
+                  f"{f' after {refreshed} refresh' if refreshed else ''}")
+
+        # A missing recording is an error, not a stale token: no refresh
+        refreshes = server.hits.get("/refresh", 0)
+        try:
+            fetch_audio({"index": 4, "call_id": "gone", "expires_at": None,
+                         "audio_url": f"http://{HOST}:{port}/file/missing"})
+            missing_ok = False
+        except ValueError as e:
+            missing_ok = not isinstance(e, signed_urls.URLExpiredError) \
+                and server.hits.get("/refresh", 0) == refreshes
+            print(f"[STUB] gone   -> {e}")
+
+        print(f"[STUB] Requests served: {server.hits}")
+        ok = at_risk >= 2 and server.hits.get("/refresh") == 2 and missing_ok
+    finally:
+        server.shutdown()
+    return ok
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub of the recording host (signed, expiring URLs).")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--check", action="store_true", help="Run the refresh/expiry self-check and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(0 if run_selfcheck(args.port) else 1)
+
+    server = start_server(port=args.port)
+    print(f"[STUB] Serving on http://{HOST}:{args.port} (refresh: /refresh?callId=...)")
+    print(f"[STUB] Example URL: {signed_url('1764677140.2065693', port=args.port)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
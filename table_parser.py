@@ -0,0 +1,145 @@
+# =========================
+# IMPORTS
+# =========================
+
+import re
+import sys
+import time
+
+from schema import CANONICAL_VARIABLES, VARIABLE_INDEX, normalize_status, normalize_variable
+
+REPORT_HEADER_RE = re.compile(r"^CALL (\d+) ANALYSIS REPORT")
+
+# =========================
+# STREAMING TABLE PARSER
+# =========================
+
+class VariableTableParser:
+    """
+    Incremental parser for the pipe-separated variable table.
+
+    Text can be fed in arbitrary chunks (streamed model output or a whole
+    response); each complete line is parsed once. Rows are validated against
+    the canonical variable schema:
+    - statuses are normalised ("excellent", "Needs improvement" -> canonical)
+    - pipes inside the evidence quote stay part of the evidence
+    - duplicate variable rows keep the first occurrence
+    - unknown variables, unrecognised statuses and missing variables are reported
+
+    feed() returns None so the parser can also be used as call_gemini's stream_check.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.unknown_variables = []
+        self.invalid_statuses = []
+        self.duplicates = []
+        self._carry = ""
+
+    def feed(self, text):
+        lines = (self._carry + text).split("\n")
+        self._carry = lines.pop()
+        for line in lines:
+            self._parse_line(line)
+        return None
+
+    def finish(self):
+        """Parses any trailing partial line and returns the parse result."""
+        if self._carry:
+            self._parse_line(self._carry)
+            self._carry = ""
+        return self.result()
+
+    def _parse_line(self, line):
+        if "|" not in line:
+            return
+
+        # Variable names never contain pipes, so split at most twice: anything after
+        # the status column (pipes included) is the evidence quote
+        cols = [c.strip() for c in line.strip().strip("|").split("|", 2)]
+        if len(cols) < 2 or not cols[0] or cols[0].lower() == "variable" or set(cols[0]) <= set("-: "):
+            return
+
+        status = normalize_status(cols[1])
+        if status is None:
+            self.invalid_statuses.append((cols[0], cols[1]))
+            return
+
+        variable = normalize_variable(cols[0])
+        if variable is None:
+            self.unknown_variables.append(cols[0])
+            return
+
+        if variable in self.rows:
+            self.duplicates.append(variable)
+            return
+
+        evidence = cols[2] if len(cols) > 2 and cols[2] else "NA"
+        self.rows[variable] = {"variable": variable, "status": status, "evidence": evidence}
+
+    def result(self):
+        """
+        Returns {"variables", "missing_variables", "unknown_variables",
+        "invalid_statuses", "duplicates"}. Variables come back in canonical order.
+        """
+        variables = sorted(self.rows.values(), key=lambda v: VARIABLE_INDEX[v["variable"]])
+        return {
+            "variables": variables,
+            "missing_variables": [name for name in CANONICAL_VARIABLES if name not in self.rows],
+            "unknown_variables": self.unknown_variables,
+            "invalid_statuses": self.invalid_statuses,
+            "duplicates": self.duplicates,
+        }
+
+
+def parse_variable_table(text):
+    """Parses a complete extraction response. Returns the same dict as VariableTableParser.result()."""
+    parser = VariableTableParser()
+    parser.feed(text)
+    return parser.finish()
+
+# =========================
+# ARCHIVED REPORT RE-PARSING
+# =========================
+
+def iter_report_calls(filepath):
+    """
+    Streams an archived summary report file and yields (call_index, parse_result)
+    per CALL block, without loading the whole file.
+    """
+    index = None
+    parser = None
+    with open(filepath, encoding="utf-8") as f:
+        for line in f:
+            match = REPORT_HEADER_RE.match(line)
+            if match:
+                if parser is not None:
+                    yield index, parser.finish()
+                index = int(match.group(1))
+                parser = VariableTableParser()
+            elif parser is not None and line.startswith("|"):
+                parser.feed(line)
+    if parser is not None:
+        yield index, parser.finish()
+
+
+if __name__ == "__main__":
+    # Usage: python table_parser.py output/summary_report_100calls.txt [more files...]
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        calls = rows = complete = 0
+        problems = []
+        for index, parsed in iter_report_calls(path):
+            calls += 1
+            rows += len(parsed["variables"])
+            if not parsed["missing_variables"]:
+                complete += 1
+            elif parsed["variables"]:
+                problems.append((index, parsed))
+        elapsed = time.perf_counter() - start
+
+        print(f"{path}: {calls} calls, {rows} rows, {complete} complete in {elapsed * 1000:.1f} ms")
+        for index, parsed in problems:
+            print(f"  - Call {index}: {len(parsed['missing_variables'])} missing, "
+                  f"{len(parsed['unknown_variables'])} unknown, {len(parsed['invalid_statuses'])} invalid status, "
+                  f"{len(parsed['duplicates'])} duplicate")
@@ -0,0 +1,54 @@
+import numpy as np
+
+from grading import load_policy, diff_policies, format_diff_report
+from schema import CANONICAL_VARIABLES
+from scoring import EXCELLENT, MODERATE
+
+
+def _matrix(excellent_shares):
+    """One call per share: that fraction of variables Excellent, the rest Moderate."""
+    n = len(CANONICAL_VARIABLES)
+    codes = np.full((len(excellent_shares), n), MODERATE, dtype=np.int8)
+    for row, share in enumerate(excellent_shares):
+        codes[row, :round(share * n)] = EXCELLENT
+    return codes
+
+
+def test_different_label_sets_compare_on_class():
+    old, new = load_policy("default"), load_policy("five_band")
+    codes = _matrix([0.9, 0.7, 0.5, 0.1])
+    call_ids = list(range(len(codes)))
+
+    changes, transitions, relabelled = diff_policies(call_ids, codes, old, new)
+
+    # Same equal weights and GOOD threshold: only the labels differ
+    assert changes == []
+    assert relabelled == 4
+    assert transitions == {"GOOD -> GOOD": 3, "BAD -> BAD": 1}
+    assert any(line.startswith("Label only") for line in format_diff_report(changes, transitions, old, new, 4, relabelled))
+
+
+def test_different_label_sets_still_report_class_changes():
+    old, new = load_policy("default"), load_policy("behaviour_weighted")
+    codes = np.full((1, len(CANONICAL_VARIABLES)), MODERATE, dtype=np.int8)
+    behaviour = [CANONICAL_VARIABLES.index(name) for name in new["groups"]["behaviour"]]
+    codes[0, behaviour] = EXCELLENT   # 23/64 = 36% unweighted (BAD), behaviour counted twice -> 53% (GOOD)
+
+    changes, transitions, relabelled = diff_policies(["c1"], codes, old, new)
+
+    assert [(c["old_type"], c["new_type"]) for c in changes] == [("BAD", "GOOD")]
+    assert relabelled == 0
+    assert transitions == {"BAD -> GOOD": 1}
+
+
+def test_same_label_set_counts_band_changes():
+    old, new = load_policy("five_band"), load_policy("behaviour_weighted")
+    codes = _matrix([0.0, 1.0])       # c2: all Excellent under any weights
+    behaviour = [CANONICAL_VARIABLES.index(name) for name in new["groups"]["behaviour"]]
+    codes[0, behaviour] = EXCELLENT   # c1: 36% (Bad) unweighted, 53% (Moderate) with behaviour doubled
+
+    changes, transitions, relabelled = diff_policies(["c1", "c2"], codes, old, new)
+
+    assert [c["call"] for c in changes] == ["c1"]
+    assert (changes[0]["old_grade"], changes[0]["new_grade"]) == ("Bad", "Moderate")
+    assert relabelled == 0
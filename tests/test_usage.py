@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from usage import usage_from_response, estimate_cost, RunUsage, PRICE_PER_M_OUTPUT, PRICE_PER_M_TEXT_INPUT
+
+
+def _response(prompt, output, thoughts, total):
+    return SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=prompt, candidates_token_count=output, thoughts_token_count=thoughts,
+        total_token_count=total, prompt_tokens_details=[],
+    ))
+
+
+def test_thinking_tokens_are_recorded_and_billed_as_output():
+    usage = usage_from_response(_response(prompt=1000, output=200, thoughts=800, total=2000))
+
+    assert usage["output_tokens"] == 200
+    assert usage["thinking_tokens"] == 800
+    assert usage["total_tokens"] == 2000
+    expected = (1000 * PRICE_PER_M_TEXT_INPUT + (200 + 800) * PRICE_PER_M_OUTPUT) / 1_000_000
+    assert usage["cost_usd"] == round(expected, 6)
+
+
+def test_cost_without_thinking_is_unchanged():
+    usage = usage_from_response(_response(prompt=1000, output=200, thoughts=None, total=1200))
+
+    assert usage["thinking_tokens"] == 0
+    assert usage["cost_usd"] == round((1000 * PRICE_PER_M_TEXT_INPUT + 200 * PRICE_PER_M_OUTPUT) / 1_000_000, 6)
+
+
+def test_total_falls_back_to_the_sum_including_thinking():
+    usage = usage_from_response(_response(prompt=10, output=20, thoughts=30, total=None))
+
+    assert usage["total_tokens"] == 60
+
+
+def test_budget_counts_thinking_spend():
+    call = usage_from_response(_response(prompt=1000, output=200, thoughts=800, total=2000))
+    run = RunUsage(max_cost_usd=call["cost_usd"] * 1.5)
+    run.record_call(1, {"total": call})
+
+    assert run.total["thinking_tokens"] == 800
+    assert run.calls_within_budget(5) == 0
+
+
+def test_stored_usage_without_thinking_still_prices():
+    legacy = {"prompt_tokens": 100, "audio_tokens": 0, "output_tokens": 10}
+
+    assert estimate_cost(legacy) == round((100 * PRICE_PER_M_TEXT_INPUT + 10 * PRICE_PER_M_OUTPUT) / 1_000_000, 6)
@@ -0,0 +1,187 @@
+# =========================
+# IMPORTS
+# =========================
+
+import heapq
+import threading
+
+# =========================
+# PRICING CONFIG
+# =========================
+
+# USD per 1M tokens for gemini-2.5-flash (Vertex AI list price)
+PRICE_PER_M_TEXT_INPUT = 0.30
+PRICE_PER_M_AUDIO_INPUT = 1.00
+PRICE_PER_M_OUTPUT = 2.50         # Also charged for thinking tokens
+
+OUTLIERS_KEPT = 20         # Most expensive calls remembered for the report (memory stays flat)
+
+USAGE_FIELDS = ("requests", "prompt_tokens", "audio_tokens", "output_tokens", "thinking_tokens", "total_tokens")
+
+# =========================
+# PER-REQUEST USAGE
+# =========================
+
+def empty_usage():
+    """Returns a zeroed usage dict."""
+    usage = {field: 0 for field in USAGE_FIELDS}
+    usage["cost_usd"] = 0.0
+    return usage
+
+def estimate_cost(usage):
+    """Estimates USD cost of a usage dict from the pricing config (thinking is billed as output)."""
+    text_tokens = max(usage["prompt_tokens"] - usage["audio_tokens"], 0)
+    cost = (
+        text_tokens * PRICE_PER_M_TEXT_INPUT
+        + usage["audio_tokens"] * PRICE_PER_M_AUDIO_INPUT
+        + (usage["output_tokens"] + usage.get("thinking_tokens", 0)) * PRICE_PER_M_OUTPUT
+    ) / 1_000_000
+    return round(cost, 6)
+
+def usage_from_response(response):
+    """
+    Reads token counts from a generate_content response.
+    Missing metadata (e.g. blocked responses) counts as zero tokens.
+    Thinking tokens are kept apart from output_tokens (candidates only).
+    """
+    usage = empty_usage()
+    usage["requests"] = 1
+
+    meta = getattr(response, "usage_metadata", None)
+    if meta is None:
+        return usage
+
+    usage["prompt_tokens"] = getattr(meta, "prompt_token_count", 0) or 0
+    usage["output_tokens"] = getattr(meta, "candidates_token_count", 0) or 0
+    usage["thinking_tokens"] = getattr(meta, "thoughts_token_count", 0) or 0
+    usage["total_tokens"] = getattr(meta, "total_token_count", 0) or (
+        usage["prompt_tokens"] + usage["output_tokens"] + usage["thinking_tokens"]
+    )
+
+    # Audio tokens are reported per modality inside the prompt details
+    for detail in getattr(meta, "prompt_tokens_details", None) or []:
+        modality = str(getattr(detail, "modality", "")).upper()
+        if "AUDIO" in modality:
+            usage["audio_tokens"] += getattr(detail, "token_count", 0) or 0
+
+    usage["cost_usd"] = estimate_cost(usage)
+    return usage
+
+def add_usage(total, usage):
+    """Adds usage counts into total (in place) and returns total."""
+    for field in USAGE_FIELDS:
+        total[field] += usage.get(field, 0)
+    total["cost_usd"] = round(total["cost_usd"] + usage.get("cost_usd", 0.0), 6)
+    return total
+
+def record_stage_usage(call_usage, stage, usage):
+    """Rolls a single request's usage into a per-call {stage: usage, 'total': usage} dict."""
+    if call_usage is None:
+        return
+    add_usage(call_usage.setdefault(stage, empty_usage()), usage)
+    add_usage(call_usage.setdefault("total", empty_usage()), usage)
+
+# =========================
+# RUN-LEVEL ACCOUNTING & BUDGET
+# =========================
+
+class RunUsage:
+    """
+    Thread-safe run-level rollup of per-call usage with an optional budget.
+    The budget is checked before new work starts: a call is only started when
+    spend so far plus the average per-call spend for everything in flight stays
+    under the limit.
+    """
+
+    def __init__(self, max_cost_usd=None, max_tokens=None):
+        self.max_cost_usd = max_cost_usd
+        self.max_tokens = max_tokens
+        self.total = empty_usage()
+        self.by_stage = {}
+        self.calls = 0
+        self._top = []         # Min-heap of (cost, seq, index, usage): the OUTLIERS_KEPT costliest calls
+        self._lock = threading.Lock()
+
+    def record_call(self, index, call_usage):
+        """Adds a finished call's usage dict (as built by record_stage_usage)."""
+        if not call_usage:
+            return
+        total = call_usage.get("total", empty_usage())
+        with self._lock:
+            self.calls += 1
+            add_usage(self.total, total)
+            entry = (total["cost_usd"], self.calls, index, total)
+            if len(self._top) < OUTLIERS_KEPT:
+                heapq.heappush(self._top, entry)
+            elif entry[0] > self._top[0][0]:
+                heapq.heapreplace(self._top, entry)
+            for stage, usage in call_usage.items():
+                if stage == "total":
+                    continue
+                add_usage(self.by_stage.setdefault(stage, empty_usage()), usage)
+
+    def average_per_call(self):
+        """Returns (avg_cost_usd, avg_tokens) over finished calls."""
+        with self._lock:
+            n = self.calls
+            if n == 0:
+                return 0.0, 0
+            return self.total["cost_usd"] / n, self.total["total_tokens"] / n
+
+    def calls_within_budget(self, requested):
+        """
+        Returns how many of `requested` new calls can start without the
+        projected spend going over budget. Before any call has finished there
+        is nothing to project from, so the first batch always runs.
+        """
+        if self.max_cost_usd is None and self.max_tokens is None:
+            return requested
+
+        avg_cost, avg_tokens = self.average_per_call()
+        with self._lock:
+            spent_cost = self.total["cost_usd"]
+            spent_tokens = self.total["total_tokens"]
+
+        if self.max_cost_usd is not None and spent_cost >= self.max_cost_usd:
+            return 0
+        if self.max_tokens is not None and spent_tokens >= self.max_tokens:
+            return 0
+
+        allowed = requested
+        if self.max_cost_usd is not None and avg_cost > 0:
+            allowed = min(allowed, int((self.max_cost_usd - spent_cost) // avg_cost))
+        if self.max_tokens is not None and avg_tokens > 0:
+            allowed = min(allowed, int((self.max_tokens - spent_tokens) // avg_tokens))
+        return max(allowed, 0)
+
+    def outliers(self, top_n=5):
+        """Returns the top_n (index, usage) pairs by cost."""
+        with self._lock:
+            ranked = sorted(self._top, key=lambda entry: (-entry[0], entry[1]))
+        return [(index, usage) for _, _, index, usage in ranked[:top_n]]
+
+    def format_report(self, top_n=5):
+        """Renders the run usage rollup as report lines."""
+        lines = []
+        lines.append(f"Gemini Requests: {self.total['requests']}")
+        lines.append(f"Prompt Tokens: {self.total['prompt_tokens']} (audio: {self.total['audio_tokens']})")
+        lines.append(f"Output Tokens: {self.total['output_tokens']} (thinking: {self.total['thinking_tokens']})")
+        lines.append(f"Total Tokens: {self.total['total_tokens']}")
+        lines.append(f"Estimated Cost (USD): {self.total['cost_usd']:.4f}")
+
+        for stage, usage in sorted(self.by_stage.items()):
+            lines.append(
+                f"  [{stage}] requests={usage['requests']} prompt={usage['prompt_tokens']} "
+                f"audio={usage['audio_tokens']} output={usage['output_tokens']} "
+                f"thinking={usage['thinking_tokens']} cost=${usage['cost_usd']:.4f}"
+            )
+
+        top = self.outliers(top_n)
+        if top:
+            lines.append(f"Top {len(top)} Calls by Cost:")
+            for index, usage in top:
+                lines.append(
+                    f"  - Call {index}: ${usage['cost_usd']:.4f} "
+                    f"({usage['total_tokens']} tokens, {usage['output_tokens']} output)"
+                )
+        return lines